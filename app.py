@@ -2,32 +2,105 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-from crypt import methods
-from email.policy import default
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+import zlib
+from datetime import datetime, timedelta, timezone
+from flask import Flask, render_template, request, Response, abort, current_app, get_flashed_messages, jsonify, make_response, stream_with_context
+from werkzeug.http import is_resource_modified
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-from flask_migrate import Migrate
-import sys
+import click
+from routing import RoutingSQLAlchemy
+from instrumentation import QueryMetrics
+from cache import PageCache
+from formatting import DateTimeFormatter
+from templating import TemplateCaches
+from matching import Matchmaker
+from assets import Assets
+from compression import Compression
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Engine
+import sqlite3
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Extensions are bound to the app by create_app(); models and queries only
+# need them inside an app context.
+db = RoutingSQLAlchemy()
+query_metrics = QueryMetrics()
+page_cache = PageCache()
+template_caches = TemplateCaches()
+matchmaker = Matchmaker()
+assets = Assets()
+compression = Compression()
+
+def create_app(config='config'):
+  # Builds the app. Serve it with e.g. `gunicorn 'app:create_app()'`; the
+  # flask command finds the factory on its own (FLASK_APP=app).
+  # Blueprints, forms and CLI modules are imported here rather than at the
+  # top of the module, and Flask-Migrate (which pulls in alembic) only when
+  # running under the flask command, so a worker only loads what it serves.
+  app = Flask(__name__)
+  app.config.from_object(config)
+  # after_request hooks run last-registered first; compression goes last
+  compression.init_app(app)
+  db.init_app(app)
+  query_metrics.init_app(app)
+  page_cache.init_app(app)
+  template_caches.init_app(app)
+  matchmaker.init_app(app)
+  assets.init_app(app)
+  app.jinja_env.filters['datetime'] = format_datetime
+
+  from venues import bp as venues_bp
+  from artists import bp as artists_bp
+  from shows import bp as shows_bp
+  app.register_blueprint(venues_bp)
+  app.register_blueprint(artists_bp)
+  app.register_blueprint(shows_bp)
+  app.add_url_rule('/', 'index', index)
+  app.add_url_rule('/api/<any(venues, artists, shows):table>', 'api_list', api_list)
+  app.register_error_handler(404, not_found_error)
+  app.register_error_handler(500, server_error)
+
+  if click.get_current_context(silent=True) is not None:
+    from flask_migrate import Migrate
+    from importer import import_command
+    from exporter import export_command
+    from stats import stats_command
+    from partitions import partitions_command
+    from deletion import delete_command
+    from templating import templates_command
+    from assets import assets_command
+    Migrate(app, db)
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(stats_command)
+    app.cli.add_command(partitions_command)
+    app.cli.add_command(delete_command)
+    app.cli.add_command(templates_command)
+    app.cli.add_command(assets_command)
+
+  if not app.debug:
+    file_handler = FileHandler('error.log')
+    file_handler.setFormatter(
+        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
+  return app
 
 # TODO: connect to a local postgresql database
 
+# sqlite only enforces foreign keys, and so ON DELETE CASCADE, when asked to
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+  if isinstance(dbapi_connection, sqlite3.Connection):
+    dbapi_connection.execute('PRAGMA foreign_keys = ON')
+
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
@@ -49,50 +122,66 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String(600), nullable=True)
     website = db.Column(db.String(120), nullable=True)
     genres = db.Column(db.ARRAY(db.String(120)))
-    shows = db.relationship('Show', backref='venues', lazy=True, cascade="all, delete")
+    # Set on insert and on every update through the ORM; rows added by COPY
+    # get the server default. The page versions (see the Versions section)
+    # are the latest of these columns.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now(), index=True)
+    # shows are deleted by the database (ON DELETE CASCADE), not loaded and
+    # deleted one by one
+    shows = db.relationship('Show', backref='venues', lazy=True, cascade="all, delete", passive_deletes=True)
 
     def __repr__(self):
         return f'<Venue {self.name} {self.city} {self.state}>'
     #set up properties for Venue schema
     # see https://www.programiz.com/python-programming/property
     # see https://github.com/richie-edwards/Fyyur/blob/master/app.py
+    # Both show lists come from one shows/artists query that is run once and
+    # memoized on the instance; the counts come from the lists and the
+    # venue's stats row. Only the most recent VENUE_PAST_SHOWS_LIMIT past
+    # shows are fetched. The scoped session is removed at the end of every
+    # request, so the memo never outlives the request.
+    _show_listing = None
+
+    def load_shows(self, now=None):
+      if self._show_listing is None:
+        now = now or datetime.now()
+        query = venue_shows_query(self.id, now, current_app.config['VENUE_PAST_SHOWS_LIMIT'])
+        self._show_listing = split_shows(query, self.total_shows)
+      return self._show_listing
+
+    @property
+    def total_shows(self):
+      return self.stats.upcoming_shows + self.stats.past_shows if self.stats else None
+
     @property 
     def upcoming_shows(self):
-      upcoming_shows = []
-      for show in self.shows:
-        artist = Artist.query.get(show.artist_id)
-        if show.start_time > datetime.now():
-          upcoming_shows.append({
-          "artist_id": show.artist_id,
-          "artist_name": artist.name,
-          "artist_image_link": artist.image_link,
-          "start_time": show.start_time
-          })
-      return upcoming_shows
+      return self.load_shows()[0]
     
     @property
     def num_upcoming_shows(self):
-      return len(self.upcoming_shows)
+      return self.load_shows()[2]
 
     @property
     def past_shows(self):
-      past_shows = []
-      for show in self.shows:
-        artist = Artist.query.get(show.artist_id)
-        if show.start_time < datetime.now():
-          past_shows.append({
-          "artist_id": show.artist_id,
-          "artist_name": artist.name,
-          "artist_image_link": artist.image_link,
-          "start_time": show.start_time
-          })
-      return past_shows
+      return self.load_shows()[1]
 
     @property
     def num_past_shows(self):
-      return len(self.past_shows)
+      return self.load_shows()[3]
+
+    @property
+    def next_show_time(self):
+      upcoming_shows = self.upcoming_shows
+      return upcoming_shows[0].start_time if upcoming_shows else None
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
+# /venues groups and pages areas by area_of(Venue); the expressions here
+# must match it exactly
+db.Index('ix_venues_state_city',
+         db.func.coalesce(Venue.state, db.literal_column("''")),
+         db.func.coalesce(Venue.city, db.literal_column("''")))
+
 class Artist(db.Model):
     __tablename__ = 'artists'
 
@@ -109,478 +198,759 @@ class Artist(db.Model):
     website = db.Column(db.String(500), nullable=True)
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120), nullable=True)
-    shows = db.relationship('Show', backref='artists', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now(), index=True)
+    shows = db.relationship('Show', backref='artists', lazy=True, cascade="all, delete", passive_deletes=True)
 
     def __repr__(self):
         return f'<Artist {self.name} >'
     #set up properties for Artist schema
     # see https://www.programiz.com/python-programming/property
     # see https://github.com/richie-edwards/Fyyur/blob/master/app.py
+    # Same single-query listing as Venue, joined to venues instead. Only the
+    # most recent ARTIST_PAST_SHOWS_LIMIT past shows are fetched so the page
+    # cost stays flat for artists with a long back catalogue; the past count
+    # comes from the stats row and still covers every show.
+    _show_listing = None
+
+    def load_shows(self, now=None):
+      if self._show_listing is None:
+        now = now or datetime.now()
+        query = artist_shows_query(self.id, now, current_app.config['ARTIST_PAST_SHOWS_LIMIT'])
+        self._show_listing = split_shows(query, self.total_shows)
+      return self._show_listing
+
+    @property
+    def total_shows(self):
+      return self.stats.upcoming_shows + self.stats.past_shows if self.stats else None
+
     @property 
     def upcoming_shows(self):
-      upcoming_shows = []
-      for show in self.shows:
-        venue = Venue.query.get(show.venue_id)
-        if show.start_time > datetime.now():
-          upcoming_shows.append({
-          "venue_id": show.venue_id,
-          "venue_name": venue.name,
-          "venue_image_link": venue.image_link,
-          "start_time": show.start_time
-          })
-      return upcoming_shows
+      return self.load_shows()[0]
     
     @property
     def num_upcoming_shows(self):
-      return len(self.upcoming_shows)
+      return self.load_shows()[2]
 
     @property
     def past_shows(self):
-      past_shows = []
-      for show in self.shows:
-        venue = Venue.query.get(show.venue_id)
-        if show.start_time < datetime.now():
-          past_shows.append({
-          "venue_id": show.venue_id,
-          "venue_name": venue.name,
-          "venue_image_link": venue.image_link,
-          "start_time": show.start_time
-          })
-      return past_shows
+      return self.load_shows()[1]
 
     @property
     def num_past_shows(self):
-      return len(self.past_shows)
+      return self.load_shows()[3]
+
+    @property
+    def next_show_time(self):
+      upcoming_shows = self.upcoming_shows
+      return upcoming_shows[0].start_time if upcoming_shows else None
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
+    # On PostgreSQL shows is range partitioned by month of start_time, with a
+    # primary key of (id, start_time); see the partition migration and
+    # partitions.py.
     start_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    # length in minutes, at most MAX_SHOW_MINUTES; a venue or an artist can
+    # not have two shows that overlap (see book_show)
+    duration = db.Column(db.Integer, nullable=False, default=120, server_default='120')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now(), index=True)
+
+    @property
+    def end_time(self):
+      return self.start_time + timedelta(minutes=self.duration)
+
+# Show counts per venue and artist, kept up to date as shows are created and
+# deleted instead of counted from shows on every page. The upcoming/past split
+# is as of the last `flask stats roll`; once next_show_time has passed the
+# row is stale until the next roll, and readers count that row's upcoming
+# shows live (see upcoming_shows_count). upcoming_shows + past_shows is the
+# owner's total and never goes stale.
+class VenueStats(db.Model):
+    __tablename__ = 'venue_stats'
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    past_shows = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime, nullable=True, index=True)
+    # when the counts last changed
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           server_default=db.func.now(), index=True)
+
+class ArtistStats(db.Model):
+    __tablename__ = 'artist_stats'
+
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True)
+    upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+    past_shows = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime, nullable=True, index=True)
+    # when the counts last changed
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           server_default=db.func.now(), index=True)
+
+# When venues or artists were last deleted, one row per table. Deleted rows
+# leave no updated_at behind, so the list page versions read this instead.
+class Deletion(db.Model):
+    __tablename__ = 'deletions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+Venue.stats = db.relationship(VenueStats, uselist=False, lazy='joined', cascade='all, delete-orphan')
+Artist.stats = db.relationship(ArtistStats, uselist=False, lazy='joined', cascade='all, delete-orphan')
+
+# (owner model, its stats table, the owner column on shows)
+SHOW_STATS = (
+  (Venue, VenueStats.__table__, Show.venue_id),
+  (Artist, ArtistStats.__table__, Show.artist_id),
+)
+
+def stats_key(table):
+  # venue_stats.venue_id or artist_stats.artist_id
+  return table.primary_key.columns[0]
+
+@event.listens_for(Venue, 'after_insert')
+@event.listens_for(Artist, 'after_insert')
+def create_show_stats(mapper, connection, owner):
+  table = VenueStats.__table__ if isinstance(owner, Venue) else ArtistStats.__table__
+  connection.execute(table.insert().values({stats_key(table): owner.id}))
+
+@event.listens_for(Show, 'after_insert')
+def count_new_show(mapper, connection, show):
+  count_show(connection, show.venue_id, show.artist_id, show.start_time, 1)
+
+@event.listens_for(Show, 'after_delete')
+def count_deleted_show(mapper, connection, show):
+  count_show(connection, show.venue_id, show.artist_id, show.start_time, -1)
+
+# A venue or artist deleted through the session takes its shows with it by
+# ON DELETE CASCADE, which the Show events above never see, so the stats of
+# the other side of those shows are recounted here (delete_owners does the
+# same for bulk deletes).
+@event.listens_for(Venue, 'before_delete')
+@event.listens_for(Artist, 'before_delete')
+def find_show_partners(mapper, connection, owner):
+  owner_column, partner = (Show.venue_id, Show.artist_id) if isinstance(owner, Venue) else (Show.artist_id, Show.venue_id)
+  owner._show_partners = connection.execute(
+    db.select(partner).where(owner_column == owner.id).distinct()).scalars().all()
+
+@event.listens_for(Venue, 'after_delete')
+@event.listens_for(Artist, 'after_delete')
+def recount_show_partners(mapper, connection, owner):
+  partners = {'artist_ids' if isinstance(owner, Venue) else 'venue_ids': owner._show_partners}
+  now = datetime.now()
+  roll_show_stats(connection, now, **partners)
+  record_deletion(connection, owner.__tablename__, now)
+
+# Changed venues and artists are reloaded into the match index on next use.
+# They are marked once the change is committed: marked during the flush, a
+# lookup made before the commit would reload the old row and clear the mark.
+@event.listens_for(Venue, 'after_insert')
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Venue, 'after_delete')
+def touch_venue_match(mapper, connection, venue):
+  touch_match_on_commit(orm.object_session(venue), 'venues', venue.id)
+
+@event.listens_for(Artist, 'after_insert')
+@event.listens_for(Artist, 'after_update')
+@event.listens_for(Artist, 'after_delete')
+def touch_artist_match(mapper, connection, artist):
+  touch_match_on_commit(orm.object_session(artist), 'artists', artist.id)
+
+def touch_match_on_commit(session, table, id):
+  session.info.setdefault('match_touched', set()).add((table, id))
+
+@event.listens_for(db.session, 'after_commit')
+def touch_committed_matches(session):
+  for table, id in session.info.pop('match_touched', ()):
+    matchmaker.touch(table, id)
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_rolled_back_matches(session):
+  session.info.pop('match_touched', None)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Queries.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  if isinstance(value, str):
-    date = dateutil.parser.parse(value)
+def split_shows_query(query, now, past_limit=None):
+  # Upcoming shows and the most recent past shows of a shows query as one
+  # UNION ALL, each half bounded on start_time. On the monthly partitioned
+  # shows table the upcoming half only scans the current and future
+  # partitions, and the past half reads newest partitions first and stops
+  # after past_limit rows.
+  upcoming = query.filter(Show.start_time > now)\
+    .add_columns(Show.start_time, db.true().label('upcoming'))
+  past = query.filter(Show.start_time <= now)\
+    .add_columns(Show.start_time, db.false().label('upcoming'))\
+    .order_by(Show.start_time.desc()).limit(past_limit)
+  listing = db.union_all(upcoming.subquery().select(), past.subquery().select()).subquery()
+  return db.session.query(listing).order_by(listing.c.start_time)
+
+def venue_shows_query(venue_id, now, past_limit=None):
+  # every show at the venue together with the artist columns its tile needs,
+  # fetched in a single statement instead of one Artist lookup per show
+  return split_shows_query(
+    db.session.query(
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link')
+    ).join(Artist, Artist.id == Show.artist_id)
+    .filter(Show.venue_id == venue_id), now, past_limit)
+
+def artist_shows_query(artist_id, now, past_limit=None):
+  # every show by the artist together with the venue columns its tile needs
+  return split_shows_query(
+    db.session.query(
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Venue.image_link.label('venue_image_link')
+    ).join(Venue, Venue.id == Show.venue_id)
+    .filter(Show.artist_id == artist_id), now, past_limit)
+
+def area_of(model):
+  # (state, city) with a missing value as '', so rows without one are
+  # listed together under an empty area rather than left out of the
+  # grouping and keyset comparisons; literals like location_of(), to match
+  # ix_venues_state_city
+  empty = db.literal_column("''")
+  return db.func.coalesce(model.state, empty), db.func.coalesce(model.city, empty)
+
+def location_of(model):
+  # "City, ST" spelled exactly like the trigram expression indexes; the
+  # separator has to be a literal rather than a bound parameter for the
+  # planner to match the indexed expression
+  return model.city.op('||')(db.literal_column("', '")).op('||')(model.state)
+
+def escape_like(term):
+  # escape LIKE wildcards with "!" so a literal % or _ in the term still
+  # matches itself
+  return term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+def search_query(model, search_term, limit):
+  # ids and names of venues or artists whose name or location contains the
+  # term, best trigram similarity first. The ILIKE filters are served by the
+  # pg_trgm GIN indexes, so no sequential scan is needed.
+  pattern = '%' + escape_like(search_term) + '%'
+  location = location_of(model)
+  rank = db.func.greatest(
+    db.func.similarity(model.name, search_term),
+    db.func.similarity(location, search_term))
+  return db.session.query(model.id, model.name)\
+    .filter(db.or_(
+      model.name.ilike(pattern, escape='!'),
+      location.ilike(pattern, escape='!')))\
+    .order_by(rank.desc(), model.name)\
+    .limit(limit)
+
+def venue_areas_query(now, after=None, limit=None):
+  # venues in the next `limit` (city, state) areas after `after`, ordered by
+  # area then name, each with its number of upcoming shows
+  state, city = area_of(Venue)
+  areas = db.session.query(state.label('state'), city.label('city')).distinct()
+  if after is not None:
+    areas = areas.filter(db.tuple_(state, city) > after)
+  areas = areas.order_by(state, city).limit(limit).subquery()
+  return db.session.query(
+      Venue.id,
+      Venue.name,
+      city.label('city'),
+      state.label('state'),
+      upcoming_shows_count(Venue, now).label('num_upcoming_shows')
+    ).select_from(Venue)\
+    .join(areas, db.and_(areas.c.state == state, areas.c.city == city))\
+    .outerjoin(VenueStats, VenueStats.venue_id == Venue.id)\
+    .order_by(state, city, Venue.name, Venue.id)
+
+def artists_query(now):
+  # every artist with its number of upcoming shows
+  return db.session.query(
+      Artist.id,
+      Artist.name,
+      upcoming_shows_count(Artist, now).label('num_upcoming_shows')
+    ).outerjoin(ArtistStats, ArtistStats.artist_id == Artist.id)\
+    .order_by(Artist.id)
+
+def upcoming_shows_count(model, now):
+  # the upcoming show count from the stats row joined to `model`. Rows whose
+  # next show has started since the last roll are counted from shows
+  # instead, so the number is right between runs of `flask stats roll`.
+  stats, owner = (VenueStats, Show.venue_id) if model is Venue else (ArtistStats, Show.artist_id)
+  live = db.session.query(db.func.count(Show.id))\
+    .filter(owner == model.id, Show.start_time > now).scalar_subquery()
+  fresh = db.or_(stats.next_show_time == None, stats.next_show_time > now)
+  return db.case((fresh, db.func.coalesce(stats.upcoming_shows, 0)), else_=live)
+
+def count_show(connection, venue_id, artist_id, start_time, delta):
+  # add (delta=1) or remove (delta=-1) one show from its venue's and artist's
+  # stats rows, on the connection that is flushing the show
+  now = datetime.now()
+  for model, table, owner in SHOW_STATS:
+    key = stats_key(table)
+    owner_id = venue_id if model is Venue else artist_id
+    next_show = table.c.next_show_time
+    if start_time > now:
+      values = {'upcoming_shows': table.c.upcoming_shows + delta}
+      if delta > 0:
+        values['next_show_time'] = db.case(
+          (db.or_(next_show == None, next_show > start_time), start_time), else_=next_show)
+      else:
+        values['next_show_time'] = db.case(
+          (next_show == start_time, next_show_time_query(owner, key, now)), else_=next_show)
+    else:
+      values = {'past_shows': table.c.past_shows + delta}
+    values['updated_at'] = now
+    connection.execute(table.update().where(key == owner_id).values(values))
+
+def next_show_time_query(owner, owner_id, now):
+  return db.select(db.func.min(Show.start_time))\
+    .where(owner == owner_id, Show.start_time > now).scalar_subquery()
+
+def roll_show_stats(connection, now, venue_ids=None, artist_ids=None):
+  # recount the stats rows whose next show has started, or with ids given,
+  # those venues' and artists' rows. Returns the number of rows recounted.
+  rolled = 0
+  for model, table, owner in SHOW_STATS:
+    key = stats_key(table)
+    ids = venue_ids if model is Venue else artist_ids
+    if venue_ids is not None or artist_ids is not None:
+      if not ids:
+        continue
+      where = key.in_(ids)
+    else:
+      where = table.c.next_show_time <= now
+    def count(condition):
+      return db.select(db.func.count(Show.id))\
+        .where(owner == key, condition).scalar_subquery()
+    rolled += connection.execute(table.update().where(where).values(
+      upcoming_shows=count(Show.start_time > now),
+      past_shows=count(Show.start_time <= now),
+      next_show_time=next_show_time_query(owner, key, now),
+      updated_at=now)).rowcount
+  return rolled
+
+def refresh_show_stats(connection, now):
+  # rebuild every stats row from shows, e.g. after a bulk import that
+  # bypassed the ORM. Returns the number of rows written.
+  refreshed = 0
+  for model, table, owner in SHOW_STATS:
+    upcoming = Show.start_time > now
+    counts = db.select(
+        model.id,
+        db.func.coalesce(db.func.sum(db.case((upcoming, 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((Show.start_time <= now, 1), else_=0)), 0),
+        db.func.min(db.case((upcoming, Show.start_time))),
+        db.literal(now, db.DateTime))\
+      .select_from(model).outerjoin(Show, owner == model.id).group_by(model.id)
+    connection.execute(table.delete())
+    refreshed += connection.execute(table.insert().from_select(
+      [stats_key(table), table.c.upcoming_shows, table.c.past_shows, table.c.next_show_time,
+       table.c.updated_at],
+      counts)).rowcount
+  return refreshed
+
+def shows_page_query(after=None, since=None, until=None):
+  # shows with their venue and artist names in one statement, ordered by the
+  # (start_time, id) keyset. `after` is the (start_time, id) of the last row
+  # on the previous page.
+  query = db.session.query(
+      Show.id,
+      Show.start_time,
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link')
+    ).join(Venue, Venue.id == Show.venue_id)\
+    .join(Artist, Artist.id == Show.artist_id)
+  if since is not None:
+    query = query.filter(Show.start_time >= since)
+  if until is not None:
+    query = query.filter(Show.start_time < until)
+  if after is not None:
+    query = query.filter(db.tuple_(Show.start_time, Show.id) > after)
+  return query.order_by(Show.start_time, Show.id)
+
+def booking_conflicts(venue_id, artist_id, start_time, duration):
+  # shows of the venue or the artist that overlap the slot
+  end_time = start_time + timedelta(minutes=duration)
+  return [show for show in booking_candidates_query(venue_id, artist_id, start_time, end_time)
+          if show.start_time + timedelta(minutes=show.duration) > start_time]
+
+def booking_candidates_query(venue_id, artist_id, start_time, end_time):
+  # Shows of the venue or the artist that may overlap the slot. A show that
+  # starts more than MAX_SHOW_MINUTES before the slot has ended by then, so
+  # only a short start_time window of each (owner, start_time) index is
+  # read, in the one or two partitions it falls into.
+  earliest = start_time - timedelta(minutes=current_app.config['MAX_SHOW_MINUTES'])
+  return db.session.query(
+      Show.venue_id,
+      Venue.name.label('venue_name'),
+      Show.artist_id,
+      Artist.name.label('artist_name'),
+      Show.start_time,
+      Show.duration
+    ).join(Venue, Venue.id == Show.venue_id)\
+    .join(Artist, Artist.id == Show.artist_id)\
+    .filter(db.or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+            Show.start_time > earliest, Show.start_time < end_time)\
+    .order_by(Show.start_time)
+
+def lock_bookings(venue_id, artist_id):
+  # Transaction-level advisory locks on the venue and the artist, so two
+  # concurrent bookings cannot both pass the conflict check. Venue first,
+  # then artist, so lockers never wait on each other in a cycle. An
+  # exclusion constraint can't do this job on the partitioned shows table.
+  if db.engine.dialect.name == 'postgresql':
+    db.session.execute(db.select(db.func.pg_advisory_xact_lock(VENUE_BOOKING_LOCK, venue_id)))
+    db.session.execute(db.select(db.func.pg_advisory_xact_lock(ARTIST_BOOKING_LOCK, artist_id)))
+
+# advisory lock namespaces for lock_bookings
+VENUE_BOOKING_LOCK = 1
+ARTIST_BOOKING_LOCK = 2
+
+def check_duration(duration):
+  # booking_conflicts only looks MAX_SHOW_MINUTES back, so a longer show
+  # could be double booked; raises ValueError
+  longest = current_app.config['MAX_SHOW_MINUTES']
+  if not isinstance(duration, int) or not 1 <= duration <= longest:
+    raise ValueError('duration must be 1 to %d minutes' % longest)
+
+def book_show(venue_id, artist_id, start_time, duration):
+  # adds the show unless it overlaps another show of the venue or the
+  # artist. Returns (show, conflicts); committing is left to the caller,
+  # and the locks are held until then.
+  check_duration(duration)
+  lock_bookings(venue_id, artist_id)
+  conflicts = booking_conflicts(venue_id, artist_id, start_time, duration)
+  if conflicts:
+    return None, conflicts
+  show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time, duration=duration)
+  db.session.add(show)
+  db.session.flush()
+  return show, []
+
+def conflict_message(conflict, venue_id):
+  start = conflict.start_time.strftime('%Y-%m-%d %H:%M')
+  if conflict.venue_id == venue_id:
+    return '%s is already booked for %s at %s.' % (conflict.venue_name, conflict.artist_name, start)
+  return '%s is already playing %s at %s.' % (conflict.artist_name, conflict.venue_name, start)
+
+def venue_page_key(venue_id):
+  return 'venue:%d' % int(venue_id)
+
+def artist_page_key(artist_id):
+  return 'artist:%d' % int(artist_id)
+
+def venue_page_keys(venue_id):
+  # the venue's page plus the pages of every artist who has played there,
+  # since their show tiles carry the venue's name and image
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  return [venue_page_key(venue_id)] + [artist_page_key(id) for id, in artist_ids]
+
+def artist_page_keys(artist_id):
+  # the artist's page plus the pages of every venue they have played
+  venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  return [artist_page_key(artist_id)] + [venue_page_key(id) for id, in venue_ids]
+
+def record_deletion(connection, table_name, now):
+  deletions = Deletion.__table__
+  updated = connection.execute(deletions.update()
+    .where(deletions.c.table_name == table_name).values(deleted_at=now)).rowcount
+  if not updated:
+    connection.execute(deletions.insert().values(table_name=table_name, deleted_at=now))
+
+# Page versions: the time of the latest change to anything a page shows,
+# read in one statement. Time moving a show from upcoming to past changes
+# the pages that list it, so the start of the latest show that has begun
+# counts as a change too. Detail pages follow their own row, its stats row
+# and the rows on its show tiles; list pages follow whole tables through
+# the updated_at indexes.
+
+def latest(column, *where):
+  return db.select(db.func.max(column)).where(*where).scalar_subquery()
+
+def venue_version_query(venue_id, now):
+  return db.select(db.func.greatest(
+      Venue.updated_at,
+      VenueStats.updated_at,
+      latest(Artist.updated_at, Artist.id == Show.artist_id, Show.venue_id == venue_id),
+      latest(Show.start_time, Show.venue_id == venue_id, Show.start_time <= now), type_=db.DateTime))\
+    .select_from(Venue).outerjoin(VenueStats, VenueStats.venue_id == Venue.id)\
+    .where(Venue.id == venue_id)
+
+def artist_version_query(artist_id, now):
+  return db.select(db.func.greatest(
+      Artist.updated_at,
+      ArtistStats.updated_at,
+      latest(Venue.updated_at, Venue.id == Show.venue_id, Show.artist_id == artist_id),
+      latest(Show.start_time, Show.artist_id == artist_id, Show.start_time <= now), type_=db.DateTime))\
+    .select_from(Artist).outerjoin(ArtistStats, ArtistStats.artist_id == Artist.id)\
+    .where(Artist.id == artist_id)
+
+def venues_version_query(now):
+  return db.select(db.func.greatest(
+    latest(Venue.updated_at),
+    latest(VenueStats.updated_at),
+    latest(Deletion.deleted_at, Deletion.table_name == Venue.__tablename__),
+    latest(Show.start_time, Show.start_time <= now), type_=db.DateTime))
+
+def artists_version_query(now):
+  return db.select(db.func.greatest(
+    latest(Artist.updated_at),
+    latest(ArtistStats.updated_at),
+    latest(Deletion.deleted_at, Deletion.table_name == Artist.__tablename__),
+    latest(Show.start_time, Show.start_time <= now), type_=db.DateTime))
+
+def shows_version_query(now):
+  # shows are only deleted with their venue or artist, which recounts the
+  # stats rows of the other side
+  return db.select(db.func.greatest(
+    latest(Show.updated_at),
+    latest(Venue.updated_at),
+    latest(Artist.updated_at),
+    latest(VenueStats.updated_at),
+    latest(ArtistStats.updated_at),
+    latest(Show.start_time, Show.start_time <= now), type_=db.DateTime))
+
+def delete_owners(model, ids):
+  # Deletes venues or artists by id in one statement. Their shows and stats
+  # rows go with them through ON DELETE CASCADE without being loaded, and
+  # the stats of the artists or venues they had shows with are recounted in
+  # one UPDATE. Returns the number deleted and the page cache keys to
+  # invalidate once committed.
+  if model is Venue:
+    owner, partner, owner_key, partner_key = Show.venue_id, Show.artist_id, venue_page_key, artist_page_key
   else:
-    date = value
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
-
-app.jinja_env.filters['datetime'] = format_datetime
+    owner, partner, owner_key, partner_key = Show.artist_id, Show.venue_id, artist_page_key, venue_page_key
+  partners = [id for id, in db.session.query(partner).filter(owner.in_(ids)).distinct()]
+  deleted = model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+  partner_ids = {'artist_ids' if model is Venue else 'venue_ids': partners}
+  now = datetime.now()
+  roll_show_stats(db.session.connection(), now, **partner_ids)
+  if deleted:
+    record_deletion(db.session.connection(), model.__tablename__, now)
+  # bulk deletes skip the ORM events that keep the match index current
+  for id in ids:
+    touch_match_on_commit(db.session(), model.__tablename__, id)
+  return deleted, [owner_key(id) for id in ids] + [partner_key(id) for id in partners]
+
+def api_query(model, fields, since=None, until=None):
+  # the requested columns of every row of `model` in id order. since/until
+  # bound show start times; for venues and artists they keep only those with
+  # a show in that window.
+  query = db.session.query(*[getattr(model, field) for field in fields])
+  shows = db.session.query(Show.id) if model is not Show else query
+  if since is not None:
+    shows = shows.filter(Show.start_time >= since)
+  if until is not None:
+    shows = shows.filter(Show.start_time < until)
+  if model is Show:
+    return shows.order_by(Show.id)
+  if since is not None or until is not None:
+    owner = Show.venue_id if model is Venue else Show.artist_id
+    query = query.filter(shows.filter(owner == model.id).exists())
+  return query.order_by(model.id)
+
+def candidate_rows(table, ids=None):
+  # (id, name, city, state, genres, seeking, show count) of every venue or
+  # artist, or of those with the given ids, for the match index
+  if table == 'venues':
+    model, stats, key, seeking = Venue, VenueStats, VenueStats.venue_id, Venue.seeking_talent
+  else:
+    model, stats, key, seeking = Artist, ArtistStats, ArtistStats.artist_id, Artist.seeking_venue
+  query = db.session.query(
+      model.id, model.name, model.city, model.state, model.genres, seeking,
+      db.func.coalesce(stats.upcoming_shows + stats.past_shows, 0)
+    ).outerjoin(stats, key == model.id)
+  if ids is not None:
+    query = query.filter(model.id.in_(ids))
+  for id, name, city, state, genres, seeking, shows in query.yield_per(5000):
+    if model is Artist:
+      genres = split_genres(genres)
+    yield id, name, city, state, genres, seeking, shows
+
+def booking_partners(model, owner_id):
+  # ids of the artists who have played the venue, or the venues the artist
+  # has played
+  owner, partner = (Show.venue_id, Show.artist_id) if model is Venue else (Show.artist_id, Show.venue_id)
+  return [id for id, in db.session.query(partner).filter(owner == owner_id).distinct()]
+
+def split_shows(rows, total=None):
+  # split rows from split_shows_query into (upcoming, past, num_upcoming,
+  # num_past) using the flag the query computed against its captured "now",
+  # so a show can never land in both lists. Past shows come most recent first.
+  # `total` is the owner's show count from its stats row; past lists may be
+  # cut short, upcoming lists never are.
+  upcoming_shows = []
+  past_shows = []
+  for row in rows:
+    if row.upcoming:
+      upcoming_shows.append(row)
+    else:
+      past_shows.append(row)
+  past_shows.reverse()
+  num_upcoming = len(upcoming_shows)
+  num_past = len(past_shows)
+  if total is not None:
+    num_past = max(num_past, total - num_upcoming)
+  return upcoming_shows, past_shows, num_upcoming, num_past
 
 #----------------------------------------------------------------------------#
-# Controllers.
+# Filters.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
-def index():
-  return render_template('pages/home.html')
+format_datetime = DateTimeFormatter(locale='en')
 
+def split_genres(value):
+  # artist genres are stored as a Postgres array literal such as "{Jazz,Soul}"
+  return value.strip('}{').split(',') if value else []
 
-#  Venues
-#  ----------------------------------------------------------------
+def parse_datetime_arg(name):
+  # optional ISO 8601 query-string argument; raises ValueError when malformed
+  value = request.args.get(name)
+  if not value:
+    return None
+  return datetime.fromisoformat(value)
 
-@app.route('/venues')
-def venues():
-  # TODO: replace with real venues data.
-  # num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
-  data = []
-  venues = Venue.query.all()
-  unique_city_states = set()
-  for venue in venues:
-      #get unique 'city' and 'state' tuple values by adding all results to a Set()
-      unique_city_states.add((venue.city, venue.state))
-  for city_state in unique_city_states:
-    #Iterate through and return venues in the respective 'city'/'state'
-    city = city_state[0]
-    state = city_state[1]
-    venues_in_city = Venue.query.filter_by(city=city, state=state).all()
-    data.append({
-      "city": city,
-      "state": state,
-      "venues": venues_in_city
-      })
-
-  return render_template('pages/venues.html', areas=data);
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-  # TODO: implement search on venues with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-  search_term = request.form.get('search_term', '')
-  venues = Venue.query.filter(Venue.name.ilike('%' + search_term + '%')).all()
-  data = []
-  for venue in venues:
-    data.append({
-      "id": venue.id,
-      "name": venue.name
-    })
-  response = {
-    "count": len(data),
-    "data": data
-  }
-  return render_template('pages/search_venues.html', results=response, search_term=search_term)
-
-@app.route('/venues/<int:venue_id>', methods=['GET'])
-def show_venue(venue_id):
-  # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data = Venue.query.get(venue_id)
-  data.upcoming_shows_count = data.num_upcoming_shows
-  data.past_shows_count = data.num_past_shows
-  return render_template('pages/show_venue.html', venue=data)
-
-#  Create Venue
-#  ----------------------------------------------------------------
+#----------------------------------------------------------------------------#
+# Conditional requests.
+#----------------------------------------------------------------------------#
 
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-  form = VenueForm()
-  return render_template('forms/new_venue.html', form=form)
+# Detail and list pages carry an ETag and a Last-Modified date made from
+# their version, and Cache-Control: no-cache so browsers revalidate them on
+# every visit. A client whose copy is current gets an empty 304 instead of
+# the page. Pages rendered with a flash message get no validators.
+# see https://developer.mozilla.org/en-US/docs/Web/HTTP/Conditional_requests
+
+def page_validators(version):
+  # (etag, last_modified) of the page at this URL as of `version`, a naive
+  # local datetime, or None when the page can't be revalidated
+  if version is None or get_flashed_messages():
+    return None
+  etag = '%08x-%x' % (zlib.crc32(request.full_path.encode('utf-8')), int(version.timestamp() * 1000000))
+  return etag, version.astimezone(timezone.utc)
+
+def is_current(validators):
+  # whether the copy named by If-None-Match or If-Modified-Since is current
+  return validators is not None and not is_resource_modified(
+    request.environ, validators[0], last_modified=validators[1])
+
+def with_validators(response, validators):
+  response = make_response(response)
+  if validators is not None:
+    response.set_etag(validators[0])
+    response.last_modified = validators[1]
+    response.cache_control.no_cache = True
+  return response
+
+def not_modified(validators):
+  return with_validators(Response(status=304), validators)
 
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-  try:
-    # TODO: insert form data as a new Venue record in the db, instead
-    form = VenueForm(request.form)
-    name = form.name.data
-    city = form.city.data
-    state = form.state.data
-    address = form.address.data
-    phone = form.phone.data
-    genres = form.genres.data
-    seeking_talent = form.seeking_talent.data
-    facebook_link = form.facebook_link.data
-    website = form.website_link.data
-    image_link = form.image_link.data
-    seeking_description = form.seeking_description.data
-
-    venue = Venue(name=name, city=city, state=state, address=address,
-                    phone=phone, genres=genres, facebook_link=facebook_link,
-                    website=website, image_link=image_link,
-                    seeking_talent=seeking_talent,
-                    seeking_description=seeking_description)
-    db.session.add(venue)
-    db.session.commit()
-    # TODO: modify data to be the data object returned from db insertion
-    if venue:
-      data = {
-        "name": venue.name,
-        "genres": venue.genres,
-        "address": venue.address,
-        "city": venue.city,
-        "state": venue.state,
-        "phone": venue.phone,
-        "website": venue.website,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_description,
-        "seeking_description": venue.seeking_description,
-        "image_link": venue.image_link,
-      }
-    # on successful db insert, flash success
-    flash('Venue ' + data.name + ' was successfully listed!')
-  except:
-    db.session.rollback()
-    # TODO: on unsuccessful db insert, flash an error instead.
-    flash('An error occurred. Venue ' + form.name.data + ' could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
 
+def index():
   return render_template('pages/home.html')
 
-@app.route('/venues/<int:venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-  # TODO: Complete this endpoint for taking a venue_id, and using
-  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-  error = False
-  try:
-      venue = Venue.query.get(venue_id)
-      db.session.delete(venue)
-      db.session.commit()
-  except:
-      db.session.rollback()
-      error = True
-  finally:
-      db.session.close()
-  if error:
-      server_error(500)
-  
-  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-  # clicking that button delete it from the db then redirect the user to the homepage
-  return redirect(url_for('home'))
-#  Artists
-#  ----------------------------------------------------------------
-@app.route('/artists')
-def artists():
-  # TODO: replace with real data returned from querying the database
-  data = Artist.query.all()
-  return render_template('pages/artists.html', artists=data)
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-  # search for "band" should return "The Wild Sax Band".
-  search_term = request.form.get('search_term', '')
-  # see https://stackoverflow.com/questions/42579400/search-function-query-in-flask-sqlalchemy
-  artists = Artist.query.filter(Artist.name.ilike('%' + search_term + '%')).all()
-  data = []
-  for artist in artists:
-    data.append({
-      "id": artist.id,
-      "name": artist.name
-    })
-  response = {
-    "count": len(data),
-    "data": data
-  }
-  return render_template('pages/search_artists.html', results=response, search_term=search_term)
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-  # shows the artist page with the given artist_id
-   # TODO: replace with real artist data from the artist table, using artist_id
-  data = Artist.query.get(artist_id)
-  data.genres = data.genres.strip('}{').split(',')
-  data.upcoming_shows_count = data.num_upcoming_shows
-  data.past_shows_count = data.num_past_shows
-
-  return render_template('pages/show_artist.html', artist=data)
-
-#  Update
-#  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-  artist_data = Artist.query.get(artist_id)
-  artist_data.website_link = artist_data.website
-  artist={
-    "id": artist_data.id,
-    "name": artist_data.name,
-  }
-  # TODO: populate form with fields from artist with ID <artist_id>
-  # see https://stackoverflow.com/questions/23712986/pre-populate-a-wtforms-in-flask-with-data-from-a-sqlalchemy-object
-  form = ArtistForm(obj=artist_data)
-  return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-  # TODO: take values from the form submitted, and update existing
-  # artist record with ID <artist_id> using the new attributes
+def delete_many(model):
+  # Bulk delete for the venues and artists blueprints: ids as JSON
+  # ({"ids": [1, 2, 3]}) or as repeated `ids` form fields, at most
+  # BULK_DELETE_LIMIT per request. Responds with the number of rows deleted.
+  payload = request.get_json(silent=True)
+  if payload is None:
+    try:
+      ids = [int(id) for id in request.form.getlist('ids')]
+    except ValueError:
+      abort(400)
+  else:
+    # a JSON list of integers; a string would be read digit by digit
+    ids = payload.get('ids') if isinstance(payload, dict) else None
+    if not isinstance(ids, list) or not all(type(id) is int for id in ids):
+      abort(400)
+  if not ids or len(ids) > current_app.config['BULK_DELETE_LIMIT']:
+    abort(400)
   try:
-      artist = Artist.query.filter_by(id=artist_id).first()
-      form = ArtistForm(request.form)
-      artist.name = form.name.data
-      artist.city = form.city.data
-      artist.state = form.state.data
-      artist.phone = form.phone.data
-      artist.genres = form.genres.data
-      artist.seeking_venue = form.seeking_venue.data
-      artist.facebook_link = form.facebook_link.data
-      artist.website = form.website_link.data
-      artist.image_link = form.image_link.data
-      artist.seeking_description = form.seeking_description.data
-
-      db.session.commit()
-      flash('Artist ' + form.name.data + ' was successfully Updated!')
+    deleted, stale_pages = delete_owners(model, ids)
+    db.session.commit()
   except:
     db.session.rollback()
-    # TODO: on unsuccessful db update, flash an error instead.
-    flash('An error occurred. Artist ' + form.name.data + ' could not be updated.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    print(sys.exc_info())
+    raise
   finally:
     db.session.close()
+  page_cache.invalidate(*stale_pages)
+  return jsonify(deleted=deleted)
 
+#  API
+#  ----------------------------------------------------------------
 
-  return redirect(url_for('show_artist', artist_id=artist_id))
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-  venue_data = Venue.query.get(venue_id)
-  venue_data.website_link = venue_data.website
-  venue={
-    "id": venue_data.id,
-    "name": venue_data.name,
-  }
-  # TODO: populate form with values from venue with ID <venue_id>
-  # see https://stackoverflow.com/questions/23712986/pre-populate-a-wtforms-in-flask-with-data-from-a-sqlalchemy-object
-  form = VenueForm(obj=venue_data)
-  return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-  # TODO: take values from the form submitted, and update existing
-  # venue record with ID <venue_id> using the new attributes
+API_MODELS = {
+  'venues': Venue,
+  'artists': Artist,
+  'shows': Show,
+}
+
+def api_list(table):
+  # Streams the whole table as newline-delimited JSON, one object per row.
+  # Rows come from a server-side cursor in batches of API_STREAM_BATCH and
+  # are written out as they arrive, so memory use does not grow with the
+  # table. ?fields=id,name limits the columns; ?since= and ?until= take ISO
+  # 8601 datetimes and bound show start times.
+  model = API_MODELS[table]
+  columns = [column.name for column in model.__table__.columns]
+  fields = request.args.get('fields')
+  fields = fields.split(',') if fields else columns
+  if not set(fields) <= set(columns):
+    abort(400)
   try:
-      venue = Venue.query.filter_by(id=venue_id).first()
-      form = VenueForm(request.form)
-      venue.name = form.name.data
-      venue.city = form.city.data
-      venue.state = form.state.data
-      venue.phone = form.phone.data
-      venue.genres = form.genres.data
-      venue.seeking_talent = form.seeking_talent.data
-      venue.facebook_link = form.facebook_link.data
-      venue.website = form.website_link.data
-      venue.image_link = form.image_link.data
-      venue.seeking_description = form.seeking_description.data
-
-      db.session.commit()
-      flash('Venue ' + form.name.data + ' was successfully Updated!')
-  except:
-    db.session.rollback()
-    # TODO: on unsuccessful db update, flash an error instead.
-    flash('An error occurred. Venue ' + form.name.data + ' could not be updated.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-    print(sys.exc_info())
-  finally:
-    db.session.close()
-  return redirect(url_for('show_venue', venue_id=venue_id))
+    since = parse_datetime_arg('since')
+    until = parse_datetime_arg('until')
+  except ValueError:
+    abort(400)
 
-#  Create Artist
-#  ----------------------------------------------------------------
+  query = api_query(model, fields, since, until)\
+    .execution_options(stream_results=True)\
+    .yield_per(current_app.config['API_STREAM_BATCH'])
 
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-  form = ArtistForm()
-  return render_template('forms/new_artist.html', form=form)
+  def generate():
+    for row in query:
+      item = row._asdict()
+      if model is Artist and 'genres' in item:
+        item['genres'] = split_genres(item['genres'])
+      yield json.dumps(item, default=lambda value: value.isoformat()) + '\n'
 
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-    try:
-      # TODO: insert form data as a new Artist record in the db, instead
-      form = ArtistForm(request.form)
-      name = form.name.data
-      city = form.city.data
-      state = form.state.data
-      phone = form.phone.data
-      genres = form.genres.data
-      seeking_venue = form.seeking_venue.data
-      facebook_link = form.facebook_link.data
-      website = form.website_link.data
-      image_link = form.image_link.data
-      seeking_description = form.seeking_description.data
-
-      artist = Artist(name=name, city=city, state=state,
-                      phone=phone, genres=genres, facebook_link=facebook_link,
-                      website=website, image_link=image_link,
-                      seeking_venue=seeking_venue,
-                      seeking_description=seeking_description)
-      db.session.add(artist)
-      db.session.commit()
-      # TODO: modify data to be the data object returned from db insertion
-      if artist:
-        data = {
-        "name": artist.name
-        }
-      # on successful db insert, flash success
-      flash('Artist ' + data["name"] + ' was successfully listed!')
-    except:
-      db.session.rollback()
-      # TODO: on unsuccessful db insert, flash an error instead.
-      flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
-      # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-      print(sys.exc_info())
-    finally:
-      db.session.close()
-    return render_template('pages/home.html')
-
-
-#  Shows
-#  ----------------------------------------------------------------
+  return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-@app.route('/shows')
-def shows():
-  # displays list of shows at /shows
-    # TODO: replace with real venues data.
-  data = []
-  shows = Show.query.all()
-  for show in shows:
-    artist = Artist.query.get(show.artist_id)
-    venue = Venue.query.get(show.venue_id)
-    data.append({
-      "venue_id": show.venue_id,
-      "venue_name": venue.name,
-      "artist_id": show.artist_id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": show.start_time
-    })
-
-  return render_template('pages/shows.html', shows=data)
-
-@app.route('/shows/create')
-def create_shows():
-  # renders form. do not touch.
-  form = ShowForm()
-  return render_template('forms/new_show.html', form=form)
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-  # called to create new shows in the db, upon submitting new show listing form
-  # TODO: insert form data as a new Show record in the db, instead
-  try:
-    form = ShowForm(request.form)
-    artist_id = form.artist_id.data
-    venue_id = form.venue_id.data
-    start_time = form.start_time.data
-
-    show = Show(artist_id=artist_id,venue_id=venue_id,start_time=start_time)
-    db.session.add(show)
-    db.session.commit()
-    # on successful db insert, flash success
-    flash('Show was successfully listed!')
-  except:
-    db.session.rollback()
-    # TODO: on unsuccessful db insert, flash an error instead.
-    flash('An error occurred. Show could not be listed.')
-    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-  finally:
-    db.session.close()
-  return render_template('pages/home.html')
-
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
-# Default port:
+# Default port. The app comes from the importable `app` module, not from
+# this script's __main__ copy, so the blueprints see the same models.
 if __name__ == '__main__':
-    app.run()
+    from app import create_app
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,206 @@
+#----------------------------------------------------------------------------#
+# Artist controllers.
+#----------------------------------------------------------------------------#
+
+# Registered by create_app() in app.py; forms are imported like in venues.py.
+
+import sys
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+
+from app import (
+  db, matchmaker, page_cache, Artist, artist_page_key, artist_page_keys, artist_version_query,
+  artists_query, artists_version_query, booking_partners, delete_many, delete_owners, is_current,
+  not_modified, page_validators, search_query, server_error, split_genres, with_validators,
+)
+from routing import current_replica
+
+bp = Blueprint('artists', __name__)
+
+
+@bp.route('/artists')
+def artists():
+  # TODO: replace with real data returned from querying the database
+  now = datetime.now()
+  validators = page_validators(db.session.execute(artists_version_query(now)).scalar())
+  if is_current(validators):
+    return not_modified(validators)
+  data = artists_query(now).all()
+  return with_validators(render_template('pages/artists.html', artists=data), validators)
+
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  # same as delete_venue
+  error = False
+  deleted = 0
+  try:
+      deleted, stale_pages = delete_owners(Artist, [artist_id])
+      db.session.commit()
+      page_cache.invalidate(*stale_pages)
+  except:
+      db.session.rollback()
+      error = True
+  finally:
+      db.session.close()
+  if error:
+      return server_error(500)
+  if not deleted:
+      abort(404)
+  return redirect(url_for('index'))
+
+@bp.route('/artists/delete', methods=['POST'])
+def delete_artists():
+  return delete_many(Artist)
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists():
+  # Case-insensitive partial match on the artist name or "City, ST", ranked
+  # like search_venues.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term = request.form.get('search_term', '')
+  data = search_query(Artist, search_term, current_app.config['SEARCH_RESULTS_LIMIT']).all()
+  response = {
+    "count": len(data),
+    "data": data
+  }
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+   # TODO: replace with real artist data from the artist table, using artist_id
+  # cached and revalidated like show_venue
+  key = artist_page_key(artist_id)
+  page = page_cache.get(key)
+  if page is not None:
+    version = page_cache.version(key)
+  else:
+    version = db.session.execute(artist_version_query(artist_id, datetime.now())).scalar()
+  validators = page_validators(version)
+  if is_current(validators):
+    return not_modified(validators)
+  if page is None:
+    page = render_artist(Artist.query.get_or_404(artist_id), key, version,
+                         replica=current_replica(current_app) is not None)
+  return with_validators(page, validators)
+
+def render_artist(data, key, version=None, replica=False):
+  # load the shows before genres is overwritten for display, otherwise the
+  # listing query autoflushes the display value back into the row
+  data.upcoming_shows_count = data.num_upcoming_shows
+  data.past_shows_count = data.num_past_shows
+  data.genres = split_genres(data.genres)
+
+  page = render_template('pages/show_artist.html', artist=data)
+  page_cache.set(key, page, expires_at=data.next_show_time, version=version, replica=replica)
+  return page
+
+@bp.route('/artists/<int:artist_id>/matches')
+def artist_matches(artist_id):
+  # venues the artist could play, best match first (see matching.py)
+  artist = Artist.query.get_or_404(artist_id)
+  matches = matchmaker.matches('venues', split_genres(artist.genres), artist.city, artist.state,
+                               booking_partners(Artist, artist_id), current_app.config['MATCH_RESULTS'])
+  return render_template('pages/matches.html', owner=artist, kind='venues', matches=matches)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  artist_data = Artist.query.get(artist_id)
+  artist_data.website_link = artist_data.website
+  artist={
+    "id": artist_data.id,
+    "name": artist_data.name,
+  }
+  # TODO: populate form with fields from artist with ID <artist_id>
+  # see https://stackoverflow.com/questions/23712986/pre-populate-a-wtforms-in-flask-with-data-from-a-sqlalchemy-object
+  form = ArtistForm(obj=artist_data)
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  from forms import ArtistForm
+  try:
+      artist = Artist.query.filter_by(id=artist_id).first()
+      form = ArtistForm(request.form)
+      artist.name = form.name.data
+      artist.city = form.city.data
+      artist.state = form.state.data
+      artist.phone = form.phone.data
+      artist.genres = form.genres.data
+      artist.seeking_venue = form.seeking_venue.data
+      artist.facebook_link = form.facebook_link.data
+      artist.website = form.website_link.data
+      artist.image_link = form.image_link.data
+      artist.seeking_description = form.seeking_description.data
+
+      db.session.commit()
+      page_cache.invalidate(*artist_page_keys(artist_id))
+      flash('Artist ' + form.name.data + ' was successfully Updated!')
+  except:
+    db.session.rollback()
+    # TODO: on unsuccessful db update, flash an error instead.
+    flash('An error occurred. Artist ' + form.name.data + ' could not be updated.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    from forms import ArtistForm
+    try:
+      # TODO: insert form data as a new Artist record in the db, instead
+      form = ArtistForm(request.form)
+      name = form.name.data
+      city = form.city.data
+      state = form.state.data
+      phone = form.phone.data
+      genres = form.genres.data
+      seeking_venue = form.seeking_venue.data
+      facebook_link = form.facebook_link.data
+      website = form.website_link.data
+      image_link = form.image_link.data
+      seeking_description = form.seeking_description.data
+
+      artist = Artist(name=name, city=city, state=state,
+                      phone=phone, genres=genres, facebook_link=facebook_link,
+                      website=website, image_link=image_link,
+                      seeking_venue=seeking_venue,
+                      seeking_description=seeking_description)
+      db.session.add(artist)
+      db.session.commit()
+      # TODO: modify data to be the data object returned from db insertion
+      if artist:
+        data = {
+        "name": artist.name
+        }
+      # on successful db insert, flash success
+      flash('Artist ' + data["name"] + ' was successfully listed!')
+    except:
+      db.session.rollback()
+      # TODO: on unsuccessful db insert, flash an error instead.
+      flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
+      # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+      print(sys.exc_info())
+    finally:
+      db.session.close()
+    return render_template('pages/home.html')
@@ -0,0 +1,220 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#----------------------------------------------------------------------------#
+
+# Serves the read-heavy pages (/venues, /artists, /shows and the venue and
+# artist pages) with async views on an async SQLAlchemy engine, so a worker
+# waiting on the database keeps serving other clients instead of blocking a
+# whole process. Every other request (forms, search, the API, static files)
+# goes to the Flask app unchanged, run in a thread by WSGIMiddleware.
+#
+#   pip install -r requirements-asgi.txt
+#   uvicorn asgi:app --workers 4
+#
+# The async views build their statements with the query functions in app.py
+# and the blueprint modules, and render through the same templates and page
+# cache as the Flask views. Each view reads through one session, on one
+# replica, like a Flask request does.
+# Clients with a pending flash message, or reading their own writes from the
+# primary (see routing.py), are served by the Flask app.
+#
+# see https://docs.sqlalchemy.org/en/14/orm/extensions/asyncio.html
+
+import random
+import time
+from datetime import datetime
+
+from flask import render_template, request, session
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from werkzeug.exceptions import HTTPException, NotFound
+
+from app import (
+  create_app, compression, Artist, Venue, artist_page_key, artist_shows_query, artist_version_query,
+  artists_query, artists_version_query, is_current, not_modified, page_cache, page_validators,
+  shows_version_query, split_shows, venue_page_key, venue_shows_query, venue_version_query,
+  venues_version_query, with_validators,
+)
+from artists import render_artist
+from shows import render_shows, shows_page_request
+from venues import render_venue, render_venues, venues_page_query
+
+ASYNC_DRIVERS = {
+  'postgresql': 'postgresql+asyncpg',
+  'postgres': 'postgresql+asyncpg',
+  'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_uri(uri):
+  # the same database through its asyncio driver
+  scheme, rest = uri.split('://', 1)
+  return '%s://%s' % (ASYNC_DRIVERS.get(scheme.split('+')[0], scheme), rest)
+
+
+class AsyncReads(object):
+  def __init__(self, app):
+    self.app = app
+    self.wsgi = WSGIMiddleware(app)
+    self.engines = None
+    # whether the views read from replicas rather than the primary
+    self.replicas = bool(app.config['SQLALCHEMY_REPLICA_URIS'])
+
+  def create_engines(self):
+    # one engine per replica, or the primary when there are none; created
+    # lazily so they belong to the event loop of the worker serving them
+    config = self.app.config
+    uris = config['SQLALCHEMY_REPLICA_URIS'] or [config['SQLALCHEMY_DATABASE_URI']]
+    return [create_async_engine(async_uri(uri), **config['SQLALCHEMY_ENGINE_OPTIONS'])
+            for uri in uris]
+
+  def session(self):
+    if self.engines is None:
+      self.engines = self.create_engines()
+    return AsyncSession(random.choice(self.engines))
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] == 'lifespan':
+      return await self.lifespan(receive, send)
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+      return await self.wsgi(scope, receive, send)
+
+    page = None
+    incoming = Request(scope)
+    with self.app.test_request_context(
+        scope['path'], base_url=str(incoming.base_url),
+        query_string=scope['query_string'], headers=list(incoming.headers.items())):
+      view = VIEWS.get(request.endpoint)
+      if view is not None and request.routing_exception is None and not self.needs_flask():
+        try:
+          page = await view(self, **request.view_args)
+        except HTTPException:
+          # error pages come from the Flask app's handlers
+          page = None
+        else:
+          # after_request hooks don't run here; compress like the Flask views
+          page = compression.compress(self.app.make_response(page))
+
+    if page is None:
+      return await self.wsgi(scope, receive, send)
+    response = Response(page.get_data(), page.status_code)
+    # every header as the Flask response has it, repeated ones included
+    response.raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in page.headers.to_wsgi_list()]
+    await response(scope, receive, send)
+
+  def needs_flask(self):
+    # flashes are consumed by the Flask request that renders them, and reads
+    # right after a write have to see the primary
+    return '_flashes' in session or session.get('db_primary_until', 0) > time.time()
+
+  async def lifespan(self, receive, send):
+    while True:
+      message = await receive()
+      if message['type'] == 'lifespan.startup':
+        await send({'type': 'lifespan.startup.complete'})
+      elif message['type'] == 'lifespan.shutdown':
+        for engine in self.engines or []:
+          await engine.dispose()
+        await send({'type': 'lifespan.shutdown.complete'})
+        return
+
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+
+async def fetch(db_session, query):
+  return (await db_session.execute(query.statement)).all()
+
+
+async def validators_of(db_session, version_query):
+  # page_validators for the version the statement reads
+  return page_validators((await db_session.execute(version_query)).scalar())
+
+
+async def venues(reads):
+  async with reads.session() as db_session:
+    validators = await validators_of(db_session, venues_version_query(datetime.now()))
+    if is_current(validators):
+      return not_modified(validators)
+    query, per_page = venues_page_query()
+    rows = await fetch(db_session, query)
+  return with_validators(render_venues(rows, per_page), validators)
+
+
+async def show_venue(reads, venue_id):
+  key = venue_page_key(venue_id)
+  page = page_cache.get(key)
+  if page is not None:
+    validators = page_validators(page_cache.version(key))
+    return not_modified(validators) if is_current(validators) else with_validators(page, validators)
+  async with reads.session() as db_session:
+    now = datetime.now()
+    version = (await db_session.execute(venue_version_query(venue_id, now))).scalar()
+    validators = page_validators(version)
+    if is_current(validators):
+      return not_modified(validators)
+    venue = await db_session.get(Venue, venue_id)
+    if venue is None:
+      raise NotFound()
+    query = venue_shows_query(venue_id, now, reads.app.config['VENUE_PAST_SHOWS_LIMIT'])
+    rows = (await db_session.execute(query.statement)).all()
+  venue._show_listing = split_shows(rows, venue.total_shows)
+  return with_validators(render_venue(venue, key, version, reads.replicas), validators)
+
+
+async def artists(reads):
+  now = datetime.now()
+  async with reads.session() as db_session:
+    validators = await validators_of(db_session, artists_version_query(now))
+    if is_current(validators):
+      return not_modified(validators)
+    data = await fetch(db_session, artists_query(now))
+  return with_validators(render_template('pages/artists.html', artists=data), validators)
+
+
+async def show_artist(reads, artist_id):
+  key = artist_page_key(artist_id)
+  page = page_cache.get(key)
+  if page is not None:
+    validators = page_validators(page_cache.version(key))
+    return not_modified(validators) if is_current(validators) else with_validators(page, validators)
+  async with reads.session() as db_session:
+    now = datetime.now()
+    version = (await db_session.execute(artist_version_query(artist_id, now))).scalar()
+    validators = page_validators(version)
+    if is_current(validators):
+      return not_modified(validators)
+    artist = await db_session.get(Artist, artist_id)
+    if artist is None:
+      raise NotFound()
+    query = artist_shows_query(artist_id, now, reads.app.config['ARTIST_PAST_SHOWS_LIMIT'])
+    rows = (await db_session.execute(query.statement)).all()
+  artist._show_listing = split_shows(rows, artist.total_shows)
+  return with_validators(render_artist(artist, key, version, reads.replicas), validators)
+
+
+async def shows(reads):
+  async with reads.session() as db_session:
+    validators = await validators_of(db_session, shows_version_query(datetime.now()))
+    if is_current(validators):
+      return not_modified(validators)
+    query, per_page, upcoming_only = shows_page_request()
+    rows = await fetch(db_session, query)
+  return with_validators(render_shows(rows, per_page, upcoming_only), validators)
+
+
+# Flask endpoints served asynchronously
+VIEWS = {
+  'venues.venues': venues,
+  'venues.show_venue': show_venue,
+  'artists.artists': artists,
+  'artists.show_artist': show_artist,
+  'shows.shows': shows,
+}
+
+flask_app = create_app()
+app = AsyncReads(flask_app)
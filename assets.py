@@ -0,0 +1,267 @@
+#----------------------------------------------------------------------------#
+# Static asset pipeline.
+#----------------------------------------------------------------------------#
+
+# `flask assets build` concatenates and minifies the stylesheets and scripts
+# that layouts/main.html loads into the BUNDLES below, copies every other
+# file under static/, and writes each one to ASSETS_BUILD_DIR under a name
+# carrying a hash of its content ("css/site.3f9c1b2e7a40d5c6.css"), with a
+# gzipped copy next to the text files. manifest.json maps the original names
+# to the hashed ones.
+#
+# Templates link them through asset_url(), which takes the same arguments
+# as url_for() and returns the hashed URL for a built static file, and
+# asset_urls(), which returns the bundle's URL, or the URLs of its source
+# files while nothing is built:
+#
+#   <img src="{{ asset_url('static', filename='img/front-splash.jpg') }}">
+#   {% for url in asset_urls('css/site.css') %}<link rel="stylesheet" href="{{ url }}">{% endfor %}
+#
+# A hashed name never changes content, so ASSETS_URL_PATH answers with
+# "Cache-Control: public, max-age=31536000, immutable" and browsers don't ask
+# for it again. Builds only add files: pages cached before a deploy keep
+# pointing at files that still exist. Workers read the manifest on startup,
+# so restart them after a build.
+#
+# see https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Cache-Control#immutable
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+# bundle name -> source files under static/, in the order main.html loads them
+BUNDLES = {
+  'css/site.css': [
+    'css/bootstrap.min.css',
+    'css/layout.main.css',
+    'css/main.css',
+    'css/main.responsive.css',
+    'css/main.quickfix.css',
+  ],
+  # run before the page renders
+  'js/head.js': [
+    'js/libs/modernizr-2.8.2.min.js',
+    'js/libs/moment.min.js',
+  ],
+  # deferred, after jQuery
+  'js/site.js': [
+    'js/script.js',
+    'js/libs/bootstrap-3.1.1.min.js',
+    'js/plugins.js',
+  ],
+}
+
+MANIFEST = 'manifest.json'
+
+# worth sending gzipped; images and woff fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.ttf', '.otf', '.eot', '.txt'}
+
+CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+# /*! ... */ comments are license banners; they are kept word for word,
+# like strings
+CSS_BANNER = r'/\*!.*?\*/'
+CSS_COMMENTS = re.compile(r'(%s|%s)|/\*(?!!).*?\*/' % (CSS_STRING, CSS_BANNER), re.S)
+CSS_STRINGS = re.compile(r'(%s|%s)' % (CSS_STRING, CSS_BANNER), re.S)
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+class Assets(object):
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('ASSETS_BUILD_DIR', None)
+    app.config.setdefault('ASSETS_URL_PATH', '/assets')
+    app.config.setdefault('ASSETS_MAX_AGE', 31536000)
+    app.extensions['assets'] = load_manifest(app.config['ASSETS_BUILD_DIR'])
+    app.add_url_rule(app.config['ASSETS_URL_PATH'] + '/<path:filename>', 'assets', send_asset)
+    app.jinja_env.globals.update(asset_url=asset_url, asset_urls=asset_urls)
+
+
+def load_manifest(directory):
+  if not directory:
+    return {}
+  try:
+    with open(os.path.join(directory, MANIFEST)) as manifest:
+      return json.load(manifest)
+  except FileNotFoundError:
+    return {}
+
+
+#  Templates
+#  ----------------------------------------------------------------
+
+def asset_url(endpoint, **values):
+  # url_for(), except that built static files get their hashed URL
+  hashed = None
+  if endpoint == 'static':
+    hashed = current_app.extensions['assets'].get(values.get('filename'))
+  if hashed is None:
+    return url_for(endpoint, **values)
+  values['filename'] = hashed
+  return url_for('assets', **values)
+
+def asset_urls(bundle):
+  if bundle in current_app.extensions['assets']:
+    return [asset_url('static', filename=bundle)]
+  return [url_for('static', filename=name) for name in BUNDLES[bundle]]
+
+
+#  Serving
+#  ----------------------------------------------------------------
+
+def send_asset(filename):
+  # the gzipped copy goes to clients that accept it; either way the response
+  # may be cached for good
+  directory = current_app.config['ASSETS_BUILD_DIR']
+  if not directory or filename == MANIFEST:
+    raise NotFound()
+  compressed = safe_join(directory, filename + '.gz')
+  gzipped = (compressed is not None and request.accept_encodings['gzip'] > 0
+             and os.path.isfile(compressed))
+  response = send_from_directory(directory, filename + '.gz' if gzipped else filename,
+                                 mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                                 max_age=current_app.config['ASSETS_MAX_AGE'])
+  if gzipped:
+    response.content_encoding = 'gzip'
+  if compressed is not None and os.path.isfile(compressed):
+    response.vary.add('Accept-Encoding')
+  response.cache_control.immutable = True
+  return response
+
+
+#  Building
+#  ----------------------------------------------------------------
+
+def minify_css(source):
+  # drops comments and the whitespace around punctuation, leaving strings
+  # and /*! banners as they are. Spaces before ":" stay, they separate
+  # "a :hover" from "a:hover".
+  def strip(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+    chunk = re.sub(r':\s+', ':', chunk)
+    return chunk.replace(';}', '}')
+  source = CSS_COMMENTS.sub(lambda match: match.group(1) or '', source)
+  # split() puts the strings and banners at the odd positions
+  parts = CSS_STRINGS.split(source)
+  parts[::2] = [strip(part) for part in parts[::2]]
+  return ''.join(parts).strip()
+
+def minify_js(source):
+  # line-based, so it cannot break regular expressions or strings: drops
+  # whole-line // comments, indentation and blank lines. The libraries in
+  # static/js/libs come minified already.
+  lines = []
+  for line in source.splitlines():
+    line = line.strip()
+    if line and not line.startswith('//'):
+      lines.append(line)
+  return '\n'.join(lines)
+
+def hashed_name(name, content):
+  root, ext = posixpath.splitext(name)
+  return '%s.%s%s' % (root, hashlib.sha256(content).hexdigest()[:16], ext)
+
+def rewrite_css_urls(css, source, bundle, manifest, static_url_path):
+  # url()s in a stylesheet are relative to it; the bundle is served from
+  # elsewhere, so point them at the hashed copies or back at the static
+  # folder
+  def rewrite(match):
+    target = match.group(2)
+    if re.match(r'[a-z]+:|/|#', target):
+      return match.group(0)
+    path, suffix = re.match(r'([^?#]*)(.*)', target).groups()
+    name = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+    if name in manifest:
+      return 'url("%s%s")' % (posixpath.relpath(manifest[name], posixpath.dirname(bundle)), suffix)
+    return 'url("%s/%s%s")' % (static_url_path, name, suffix)
+  return CSS_URL.sub(rewrite, css)
+
+def write_asset(directory, name, content):
+  path = os.path.join(directory, *name.split('/'))
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  if not os.path.exists(path):
+    with open(path, 'wb') as output:
+      output.write(content)
+  if posixpath.splitext(name)[1] in COMPRESSIBLE:
+    compressed = gzip.compress(content, 9, mtime=0)
+    if len(compressed) < len(content) and not os.path.exists(path + '.gz'):
+      with open(path + '.gz', 'wb') as output:
+        output.write(compressed)
+
+def build_assets(static_folder, directory, static_url_path):
+  # single files first, so the bundles can refer to their hashed names
+  manifest = {}
+  for root, dirs, files in os.walk(static_folder):
+    dirs.sort()
+    for filename in sorted(files):
+      name = posixpath.relpath(os.path.join(root, filename).replace(os.sep, '/'),
+                               static_folder.replace(os.sep, '/'))
+      with open(os.path.join(root, filename), 'rb') as source:
+        content = source.read()
+      manifest[name] = hashed_name(name, content)
+      write_asset(directory, manifest[name], content)
+
+  for bundle, sources in BUNDLES.items():
+    parts = []
+    for source in sources:
+      with open(os.path.join(static_folder, *source.split('/')), encoding='utf-8') as text:
+        text = text.read()
+      if bundle.endswith('.css'):
+        parts.append(rewrite_css_urls(minify_css(text), source, bundle, manifest, static_url_path))
+      else:
+        parts.append(minify_js(text))
+    # a script may end without a semicolon or in a line comment
+    content = ('\n' if bundle.endswith('.css') else '\n;').join(parts).encode('utf-8')
+    manifest[bundle] = hashed_name(bundle, content)
+    write_asset(directory, manifest[bundle], content)
+
+  with open(os.path.join(directory, MANIFEST), 'w') as output:
+    json.dump(manifest, output, indent=2, sort_keys=True)
+  return manifest
+
+
+@click.group('assets')
+def assets_command():
+  """Build fingerprinted static assets."""
+
+
+@assets_command.command('build')
+@with_appcontext
+def build_command():
+  """Bundle, minify, hash and gzip the static files."""
+  directory = current_app.config['ASSETS_BUILD_DIR']
+  if not directory:
+    raise click.UsageError('ASSETS_BUILD_DIR is not set')
+  manifest = build_assets(current_app.static_folder, directory, current_app.static_url_path)
+  for bundle in BUNDLES:
+    path = os.path.join(directory, *manifest[bundle].split('/'))
+    sources = sum(os.path.getsize(os.path.join(current_app.static_folder, *source.split('/')))
+                  for source in BUNDLES[bundle])
+    gzipped = os.path.getsize(path + '.gz') if os.path.exists(path + '.gz') else os.path.getsize(path)
+    click.echo('%-14s %7d bytes from %d files, %7d minified, %7d gzipped' % (
+      bundle, sources, len(BUNDLES[bundle]), os.path.getsize(path), gzipped))
+  click.echo('wrote %d assets to %s' % (len(manifest), directory))
+
+
+@assets_command.command('clean')
+@with_appcontext
+def clean_command():
+  """Delete the built assets, so pages link the static files again."""
+  directory = current_app.config['ASSETS_BUILD_DIR']
+  if directory and os.path.isdir(directory):
+    shutil.rmtree(directory)
+  click.echo('removed %s' % directory)
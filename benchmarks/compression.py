@@ -0,0 +1,115 @@
+"""Response compression benchmark.
+
+Requests each read route and API export through the Flask test client
+against the configured database (seed it first with benchmarks/seed.py),
+once uncompressed and once per available encoding, and reports the bytes
+sent, the share saved and the CPU time compression costs per request:
+
+  python -m benchmarks.compression --requests 50
+  python -m benchmarks.compression --encoding gzip --level gzip=1 --level gzip=9
+
+"encode ms" is the CPU time of compressing the uncompressed body alone, the
+way compression.py does it; "request ms" is the CPU time of the whole
+request with and without the encoding, as a worker would spend it.
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.routes import app, routes
+from compression import ENCODERS
+
+API_ROUTES = [
+  ('api venues', 'GET', '/api/venues', None),
+  ('api artists', 'GET', '/api/artists', None),
+  ('api shows upcoming', 'GET', '/api/shows?since=%s' % time.strftime('%Y-%m-%dT%H:%M:%S'), None),
+]
+
+
+def cpu_ms(client, method, url, data, encoding, requests):
+  # median process time of a request, body read to the end
+  samples = []
+  for _ in range(requests):
+    started = time.process_time()
+    response = client.open(url, method=method, data=data, headers={'Accept-Encoding': encoding})
+    body = response.get_data()
+    samples.append((time.process_time() - started) * 1000)
+  return statistics.median(samples), response, body
+
+
+def encode_ms(encoding, level, chunks, flush_size, requests):
+  # median process time of compressing the body as compression.py does
+  samples = []
+  for _ in range(requests):
+    started = time.process_time()
+    encoder = ENCODERS[encoding](level)
+    pending = 0
+    for chunk in chunks:
+      encoder.compress(chunk)
+      pending += len(chunk)
+      if pending >= flush_size:
+        encoder.flush()
+        pending = 0
+    encoder.finish()
+    samples.append((time.process_time() - started) * 1000)
+  return statistics.median(samples)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--requests', type=int, default=20, help='requests per route and encoding')
+  parser.add_argument('--encoding', action='append', help='encoding to measure (repeatable); default all available')
+  parser.add_argument('--level', action='append', default=[], metavar='ENCODING=LEVEL',
+                      help='override a level from COMPRESSION_LEVELS (repeatable)')
+  parser.add_argument('--route', action='append', help='only routes whose name contains this')
+  args = parser.parse_args()
+
+  compression = app.extensions['compression']
+  encodings = args.encoding or compression.encodings
+  missing = set(encodings) - set(compression.encodings)
+  if missing:
+    parser.error('not available: %s' % ', '.join(sorted(missing)))
+  levels = dict(compression.levels)
+  for override in args.level:
+    encoding, level = override.split('=')
+    levels[encoding] = int(level)
+  compression.levels = levels
+
+  with app.app_context():
+    plan = [route for route in routes(False) + API_ROUTES
+            if not args.route or any(part in route[0] for part in args.route)]
+  client = app.test_client()
+
+  print('%-22s %-8s %10s %10s %7s %10s %13s' % (
+    'route', 'encoding', 'bytes', 'sent', 'saved', 'encode ms', 'request ms'))
+  totals = {encoding: [0, 0, 0.0] for encoding in encodings}
+  for name, method, url, data in plan:
+    client.open(url, method=method, data=data)
+    identity_ms, response, body = cpu_ms(client, method, url, data, 'identity', args.requests)
+    if response.status_code >= 400:
+      raise RuntimeError('%s %s returned %d' % (method, url, response.status_code))
+    # the body as the app yielded it; pages come in one piece and are
+    # compressed without flushing
+    chunks = list(response.response) or [body]
+    flush_size = compression.flush_size if 'Content-Length' not in response.headers else float('inf')
+    for encoding in encodings:
+      request_ms, compressed, sent = cpu_ms(client, method, url, data, encoding, args.requests)
+      cost = encode_ms(encoding, levels.get(encoding, 6), chunks, flush_size, args.requests)
+      print('%-22s %-8s %10d %10d %6.1f%% %10.2f %6.2f -> %-6.2f' % (
+        name, compressed.content_encoding or 'identity', len(body), len(sent),
+        (1 - len(sent) / len(body)) * 100 if body else 0, cost, identity_ms, request_ms))
+      totals[encoding][0] += len(body)
+      totals[encoding][1] += len(sent)
+      totals[encoding][2] += cost
+
+  print()
+  for encoding, (raw, sent, cost) in totals.items():
+    if raw:
+      print('%-8s level %-2d  %d of %d bytes saved (%.1f%%), %.2f ms of CPU per MB' % (
+        encoding, levels.get(encoding, 6), raw - sent, raw, (1 - sent / raw) * 100,
+        cost / (raw / 1e6)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,189 @@
+"""Concurrency benchmark: the Flask app under gunicorn against asgi.py under uvicorn.
+
+Starts each server against the configured database (seed it first with
+benchmarks/seed.py), then holds 100 to 1000 concurrent keep-alive clients
+against the read routes and reports throughput, p50/p95/p99 latency and
+errors per level:
+
+  python -m benchmarks.concurrency --clients 100 250 500 1000 --duration 20
+
+Both servers get the same number of processes (--workers). The sync server
+runs --threads threads per worker, so its concurrency is workers * threads;
+the async server takes every connection on its event loop. Set
+PAGE_CACHE_TTL=0 in the environment to measure database round trips rather
+than the page cache. The server commands can be replaced with --sync-cmd and
+--async-cmd, e.g. to try other worker counts.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from app import create_app, db, Show
+
+app = create_app()
+
+SYNC_CMD = 'gunicorn --bind 127.0.0.1:{port} --workers {workers} --threads {threads} app:create_app()'
+ASYNC_CMD = 'uvicorn --host 127.0.0.1 --port {port} --workers {workers} --log-level warning asgi:app'
+
+
+def paths():
+  # the read routes served by asgi.py, on the venue and artist with the most
+  # shows, as in benchmarks/routes.py
+  with app.app_context():
+    venue_id, = db.session.query(Show.venue_id).group_by(Show.venue_id)\
+      .order_by(db.func.count().desc()).first()
+    artist_id, = db.session.query(Show.artist_id).group_by(Show.artist_id)\
+      .order_by(db.func.count().desc()).first()
+  return ['/venues', '/venues/%d' % venue_id, '/artists',
+          '/artists/%d' % artist_id, '/shows', '/shows?upcoming=1']
+
+
+async def get(reader, writer, path):
+  # one keep-alive GET; returns the status code
+  writer.write(('GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n' % path).encode())
+  await writer.drain()
+  status = int((await reader.readline()).split()[1])
+  length = None
+  chunked = False
+  while True:
+    line = await reader.readline()
+    if line in (b'\r\n', b''):
+      break
+    name, _, value = line.decode('latin-1').partition(':')
+    name = name.strip().lower()
+    if name == 'content-length':
+      length = int(value)
+    elif name == 'transfer-encoding' and 'chunked' in value:
+      chunked = True
+  if chunked:
+    while True:
+      size = int((await reader.readline()).split(b';')[0], 16)
+      await reader.readexactly(size + 2)
+      if size == 0:
+        break
+  elif length is not None:
+    await reader.readexactly(length)
+  return status
+
+
+async def client(url, paths, deadline, latencies, errors, offset):
+  host, port = urlsplit(url).hostname, urlsplit(url).port
+  i = offset
+  reader = writer = None
+  while time.perf_counter() < deadline:
+    path = paths[i % len(paths)]
+    i += 1
+    started = time.perf_counter()
+    try:
+      if writer is None:
+        reader, writer = await asyncio.open_connection(host, port)
+      status = await get(reader, writer, path)
+    except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+      errors.append(path)
+      if writer is not None:
+        writer.close()
+      reader = writer = None
+      await asyncio.sleep(0.05)
+      continue
+    if status != 200:
+      errors.append(path)
+    latencies.append(time.perf_counter() - started)
+  if writer is not None:
+    writer.close()
+
+
+async def load(url, paths, clients, duration):
+  latencies, errors = [], []
+  deadline = time.perf_counter() + duration
+  await asyncio.gather(*[client(url, paths, deadline, latencies, errors, n)
+                         for n in range(clients)])
+  return latencies, errors
+
+
+def percentile(values, p):
+  return sorted(values)[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(latencies, errors, duration):
+  if not latencies:
+    return {'requests': 0, 'errors': len(errors)}
+  return {
+    'requests': len(latencies),
+    'errors': len(errors),
+    'rps': round(len(latencies) / duration, 1),
+    'p50_ms': round(statistics.median(latencies) * 1000, 2),
+    'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+    'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+  }
+
+
+def wait_for(url, timeout=30):
+  host, port = urlsplit(url).hostname, urlsplit(url).port
+  deadline = time.time() + timeout
+  while time.time() < deadline:
+    try:
+      socket.create_connection((host, port), timeout=1).close()
+      return
+    except OSError:
+      time.sleep(0.2)
+  raise RuntimeError('server at %s did not start' % url)
+
+
+def run_server(name, command, args, paths):
+  url = 'http://127.0.0.1:%d' % args.port
+  command = command.format(port=args.port, workers=args.workers, threads=args.threads)
+  print('%s: %s' % (name, command))
+  server = subprocess.Popen(command.split(), start_new_session=True)
+  try:
+    wait_for(url)
+    asyncio.run(load(url, paths, 10, 2))  # warm up connections and caches
+    results = {}
+    for clients in args.clients:
+      latencies, errors = asyncio.run(load(url, paths, clients, args.duration))
+      results[clients] = summarize(latencies, errors, args.duration)
+      print('  %5d clients  %s' % (clients, results[clients]))
+    return results
+  finally:
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--clients', type=int, nargs='+', default=[100, 250, 500, 1000])
+  parser.add_argument('--duration', type=float, default=20, help='seconds per concurrency level')
+  parser.add_argument('--workers', type=int, default=4, help='server processes')
+  parser.add_argument('--threads', type=int, default=8, help='threads per sync worker')
+  parser.add_argument('--port', type=int, default=8765)
+  parser.add_argument('--sync-cmd', default=SYNC_CMD)
+  parser.add_argument('--async-cmd', default=ASYNC_CMD)
+  parser.add_argument('--output', help='write results to this JSON file')
+  args = parser.parse_args()
+
+  targets = paths()
+  results = {
+    'sync': run_server('sync', args.sync_cmd, args, targets),
+    'async': run_server('async', args.async_cmd, args, targets),
+  }
+
+  print('\n%8s %12s %12s %12s %12s' % ('clients', 'sync rps', 'async rps', 'sync p99', 'async p99'))
+  for clients in args.clients:
+    sync, async_ = results['sync'][clients], results['async'][clients]
+    print('%8d %12s %12s %12s %12s' % (clients, sync.get('rps'), async_.get('rps'),
+                                       sync.get('p99_ms'), async_.get('p99_ms')))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
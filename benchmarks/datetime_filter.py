@@ -0,0 +1,61 @@
+"""Micro-benchmark for the `datetime` Jinja filter.
+
+Compares the original per-call babel formatting with DateTimeFormatter on a
+page worth of show start times:
+
+  python -m benchmarks.datetime_filter --values 60 --repeat 200
+"""
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+
+from formatting import DateTimeFormatter
+
+
+def legacy_format_datetime(value, format='medium'):
+  # the filter as it was before DateTimeFormatter
+  date = value
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format, locale='en')
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--values', type=int, default=60, help='start times per page')
+  parser.add_argument('--distinct', type=int, default=20, help='distinct start times per page')
+  parser.add_argument('--repeat', type=int, default=200, help='pages to format')
+  args = parser.parse_args()
+
+  rng = random.Random(0)
+  base = datetime.now().replace(minute=0, second=0, microsecond=0)
+  times = [base + timedelta(days=rng.randrange(args.distinct)) for _ in range(args.values)]
+  formatter = DateTimeFormatter()
+  assert [formatter(value, 'full') for value in times] == [legacy_format_datetime(value, 'full') for value in times]
+
+  def cold():
+    # a fresh formatter per page, so only the compiled patterns help
+    fresh = DateTimeFormatter()
+    for value in times:
+      fresh(value, 'full')
+
+  cases = [
+    ('legacy filter', lambda: [legacy_format_datetime(value, 'full') for value in times]),
+    ('formatter, cold value cache', cold),
+    ('formatter, per value', lambda: [formatter(value, 'full') for value in times]),
+  ]
+  legacy = None
+  for name, func in cases:
+    seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+    legacy = legacy or seconds
+    print('%-30s %9.1f us/page %7.1fx' % (name, seconds * 1e6, legacy / seconds))
+
+
+if __name__ == '__main__':
+  main()
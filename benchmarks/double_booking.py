@@ -0,0 +1,83 @@
+"""Concurrent double-booking check.
+
+Books the same venue and artist for overlapping slots from many threads at
+once, each through book_show() on its own connection, and checks that only
+one booking per round got through:
+
+  python -m benchmarks.double_booking --threads 32 --rounds 20
+
+Run it against a scratch PostgreSQL database with at least one venue and
+one artist (benchmarks/seed.py); the shows it books are deleted afterwards.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import create_app, db, book_show, Artist, Show, Venue
+
+app = create_app()
+
+
+def attempt(barrier, venue_id, artist_id, start_time, results):
+  with app.app_context():
+    barrier.wait()
+    try:
+      show, conflicts = book_show(venue_id, artist_id, start_time, 120)
+      db.session.commit()
+      results.append(show.id if show else None)
+    except Exception as error:
+      db.session.rollback()
+      results.append(error)
+    finally:
+      db.session.remove()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--threads', type=int, default=32, help='concurrent bookings per round')
+  parser.add_argument('--rounds', type=int, default=20)
+  args = parser.parse_args()
+
+  with app.app_context():
+    venue_id = db.session.query(db.func.min(Venue.id)).scalar()
+    artist_id = db.session.query(db.func.min(Artist.id)).scalar()
+  # far enough out not to meet any seeded show
+  first = datetime(datetime.now().year + 5, 1, 1, 20)
+  failures = 0
+  booked = []
+  started = time.perf_counter()
+  for n in range(args.rounds):
+    results = []
+    barrier = threading.Barrier(args.threads)
+    # every thread asks for a slot overlapping the others' by at least an hour
+    threads = [threading.Thread(target=attempt, args=(
+                 barrier, venue_id, artist_id, first + timedelta(days=n, minutes=i % 60), results))
+               for i in range(args.threads)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    ids = [result for result in results if isinstance(result, int)]
+    errors = [result for result in results if isinstance(result, Exception)]
+    booked.extend(ids)
+    if len(ids) != 1:
+      failures += 1
+    print('round %d: %d booked, %d rejected, %d errors%s' % (
+      n + 1, len(ids), results.count(None), len(errors), ' (%s)' % errors[0] if errors else ''))
+
+  elapsed = time.perf_counter() - started
+  with app.app_context():
+    # one at a time through the ORM, so the show counts follow
+    for show in Show.query.filter(Show.id.in_(booked)):
+      db.session.delete(show)
+    db.session.commit()
+  print('%d of %d rounds booked exactly one show (%.0f bookings/s)' % (
+    args.rounds - failures, args.rounds, args.rounds * args.threads / elapsed))
+  return 1 if failures else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
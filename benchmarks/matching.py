@@ -0,0 +1,61 @@
+"""Match index benchmark.
+
+Builds a match index of synthetic artists (no database needed) and times
+index builds, lookups and incremental updates:
+
+  python -m benchmarks.matching --candidates 100000 --lookups 200
+
+Candidates come from the same generator as benchmarks/seed.py, so genres
+and cities have realistic skew.
+"""
+
+import argparse
+import statistics
+import time
+
+from app import split_genres
+from benchmarks.seed import Generator
+from config import MATCH_WEIGHTS
+from matching import CandidateIndex
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--candidates', type=int, default=100000)
+  parser.add_argument('--lookups', type=int, default=200)
+  parser.add_argument('--updates', type=int, default=1000, help='rows changed in the incremental update')
+  parser.add_argument('--seed', type=int, default=42)
+  args = parser.parse_args()
+
+  generator = Generator(args.seed)
+
+  def row(n):
+    artist = generator.artist(n)
+    return (n, artist['name'], artist['city'], artist['state'], split_genres(artist['genres']),
+            artist['seeking_venue'], generator.random.randint(0, 200))
+
+  rows = [row(n) for n in range(args.candidates)]
+  started = time.perf_counter()
+  index = CandidateIndex()
+  index.update(rows)
+  print('built index of %d candidates in %.0f ms' % (len(index), (time.perf_counter() - started) * 1000))
+
+  venues = [generator.venue(n) for n in range(args.lookups)]
+  timings = []
+  for venue in venues:
+    started = time.perf_counter()
+    score = index.score(venue['genres'], venue['city'], venue['state'], [], MATCH_WEIGHTS)
+    index.top(score, 20)
+    timings.append((time.perf_counter() - started) * 1000)
+  timings.sort()
+  print('lookup: p50 %.2f ms, p95 %.2f ms, max %.2f ms' % (
+    statistics.median(timings), timings[int(len(timings) * 0.95)], timings[-1]))
+
+  changed = [row(generator.random.randrange(args.candidates)) for _ in range(args.updates)]
+  started = time.perf_counter()
+  index.update(changed, [r[0] for r in changed])
+  print('updated %d rows in %.1f ms' % (len(changed), (time.perf_counter() - started) * 1000))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,255 @@
+"""Per-route latency benchmark.
+
+Drives every route of the app through the Flask test client against the
+configured database (seed it first with benchmarks/seed.py) and reports
+p50/p95/p99 latency, SQL statements per request and peak Python memory:
+
+  python -m benchmarks.routes --requests 200 --output bench_results.json
+  python -m benchmarks.routes --compare bench_results.json
+
+Results are written as JSON keyed by route, tagged with the current git
+commit, so two runs can be compared with --compare. Write routes create
+and edit real rows and only run with --include-writes: each show is booked
+into a slot of its own, a year from now, and the shows are deleted again
+afterwards; each bulk delete removes a venue or artist made for it. The
+single-row DELETE routes are left out, they run the same delete_owners()
+as the bulk ones.
+
+Latencies come from one pass over each route and peak Python memory from
+another, with tracemalloc on, so tracing doesn't inflate the timings.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, db, Artist, Show, Venue
+
+app = create_app()
+
+
+class QueryCounter(object):
+  def __init__(self):
+    self.count = 0
+    event.listen(Engine, 'before_cursor_execute', self.on_execute)
+
+  def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+    self.count += 1
+
+
+# booked shows start here, SHOW_SLOT apart, clear of the seeded ones
+SHOW_SLOTS_FROM = datetime.now().replace(microsecond=0) + timedelta(days=365)
+SHOW_SLOT = timedelta(hours=3)
+
+
+def routes(include_writes):
+  # (name, method, url, form data) for every route, using the busiest venue
+  # and artist so the detail pages show their worst case. Form data may be
+  # a function of the request's number instead, for requests that need
+  # data of their own.
+  venue_id, = db.session.query(Show.venue_id).group_by(Show.venue_id)\
+    .order_by(db.func.count().desc()).first()
+  artist_id, = db.session.query(Show.artist_id).group_by(Show.artist_id)\
+    .order_by(db.func.count().desc()).first()
+  middle = db.session.query(Show.start_time, Show.id).order_by(Show.start_time, Show.id)\
+    .offset(db.session.query(db.func.count(Show.id)).scalar() // 2).first()
+  venue = Venue.query.get(venue_id)
+  artist = Artist.query.get(artist_id)
+  venue_form = {
+    'name': venue.name, 'city': venue.city, 'state': venue.state,
+    'address': venue.address, 'phone': venue.phone, 'genres': venue.genres,
+    'facebook_link': venue.facebook_link, 'image_link': venue.image_link,
+    'website_link': '', 'seeking_description': '',
+  }
+  artist_form = {
+    'name': artist.name, 'city': artist.city, 'state': artist.state,
+    'phone': artist.phone, 'genres': artist.genres.strip('}{').split(','),
+    'facebook_link': artist.facebook_link, 'image_link': artist.image_link,
+    'website_link': '', 'seeking_description': '',
+  }
+  db.session.remove()
+
+  read = [
+    ('index', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('show_venue', 'GET', '/venues/%d' % venue_id, None),
+    ('search_venues', 'POST', '/venues/search', {'search_term': 'Hall'}),
+    ('artists', 'GET', '/artists', None),
+    ('show_artist', 'GET', '/artists/%d' % artist_id, None),
+    ('search_artists', 'POST', '/artists/search', {'search_term': 'Band'}),
+    ('shows', 'GET', '/shows', None),
+    ('shows upcoming', 'GET', '/shows?upcoming=1', None),
+    ('shows deep page', 'GET', '/shows?after=%s&after_id=%d' % (middle.start_time.isoformat(), middle.id), None),
+    ('create_venue_form', 'GET', '/venues/create', None),
+    ('create_artist_form', 'GET', '/artists/create', None),
+    ('create_shows', 'GET', '/shows/create', None),
+    ('edit_venue', 'GET', '/venues/%d/edit' % venue_id, None),
+    ('edit_artist', 'GET', '/artists/%d/edit' % artist_id, None),
+    ('venue_matches', 'GET', '/venues/%d/matches' % venue_id, None),
+    ('artist_matches', 'GET', '/artists/%d/matches' % artist_id, None),
+    ('api venues', 'GET', '/api/venues', None),
+    ('api artists', 'GET', '/api/artists', None),
+    ('api shows upcoming', 'GET', '/api/shows?since=%s' % datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), None),
+    ('metrics', 'GET', '/metrics', None),
+  ]
+  write = [
+    ('create_venue_submission', 'POST', '/venues/create', venue_form),
+    ('create_artist_submission', 'POST', '/artists/create', artist_form),
+    ('create_show_submission', 'POST', '/shows/create', lambda n: {
+      'venue_id': venue_id, 'artist_id': artist_id,
+      'start_time': (SHOW_SLOTS_FROM + n * SHOW_SLOT).strftime('%Y-%m-%d %H:%M:%S'), 'duration': '120'}),
+    ('edit_venue_submission', 'POST', '/venues/%d/edit' % venue_id, venue_form),
+    ('edit_artist_submission', 'POST', '/artists/%d/edit' % artist_id, artist_form),
+    ('delete_venues', 'POST', '/venues/delete', lambda n: {'ids': [throwaway(Venue, n)]}),
+    ('delete_artists', 'POST', '/artists/delete', lambda n: {'ids': [throwaway(Artist, n)]}),
+  ]
+  return read + write if include_writes else read
+
+
+def throwaway(model, n):
+  # the id of a new venue or artist, for a delete request to remove
+  with app.app_context():
+    row = model(name='Benchmark %s %d' % (model.__tablename__, n), city='Nowhere', state='CA',
+                genres=['Other'] if model is Venue else '{Other}')
+    if model is Venue:
+      row.address = '1 Benchmark Road'
+    db.session.add(row)
+    db.session.commit()
+    return row.id
+
+
+def delete_booked_shows(data, requests):
+  # the shows create_show_submission booked, through the ORM so their stats
+  # rows are recounted
+  forms = [data(n) for n in range(requests)]
+  with app.app_context():
+    booked = Show.query.filter(
+      Show.venue_id == forms[0]['venue_id'], Show.artist_id == forms[0]['artist_id'],
+      Show.start_time.in_([datetime.strptime(form['start_time'], '%Y-%m-%d %H:%M:%S') for form in forms]))
+    for show in booked:
+      db.session.delete(show)
+    db.session.commit()
+
+
+def percentile(samples, pct):
+  return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def form_data(data, n):
+  return data(n) if callable(data) else data
+
+
+def request(client, method, url, data):
+  response = client.open(url, method=method, data=data)
+  # streamed responses are produced as they are read
+  response.get_data()
+  if response.status_code >= 400:
+    raise RuntimeError('%s %s returned %d' % (method, url, response.status_code))
+  return response
+
+
+def measure(client, counter, method, url, data, requests, numbers):
+  # `numbers` counts the route's requests across passes
+  latencies = []
+  queries = []
+  for n in numbers[:requests]:
+    payload = form_data(data, n)
+    counter.count = 0
+    start = time.perf_counter()
+    request(client, method, url, payload)
+    latencies.append((time.perf_counter() - start) * 1000)
+    queries.append(counter.count)
+
+  # memory in a pass of its own; tracing slows every allocation down
+  payloads = [form_data(data, n) for n in numbers[requests:]]
+  tracemalloc.start()
+  for payload in payloads:
+    request(client, method, url, payload)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return {
+    'url': url,
+    'method': method,
+    'requests': requests,
+    'p50_ms': percentile(latencies, 50),
+    'p95_ms': percentile(latencies, 95),
+    'p99_ms': percentile(latencies, 99),
+    'queries_per_request': statistics.mean(queries),
+    'peak_memory_kb': peak / 1024,
+  }
+
+
+def git_commit():
+  try:
+    return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def print_results(results, baseline=None):
+  print('%-26s %9s %9s %9s %8s %10s' % ('route', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'peak KB'))
+  for name, result in results.items():
+    line = '%-26s %9.2f %9.2f %9.2f %8.1f %10.0f' % (
+      name, result['p50_ms'], result['p95_ms'], result['p99_ms'],
+      result['queries_per_request'], result['peak_memory_kb'])
+    previous = (baseline or {}).get(name)
+    if previous:
+      line += '   p95 %+6.1f%%  queries %+.1f' % (
+        (result['p95_ms'] / previous['p95_ms'] - 1) * 100,
+        result['queries_per_request'] - previous['queries_per_request'])
+    print(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--requests', type=int, default=100, help='requests per route')
+  parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per route')
+  parser.add_argument('--memory-requests', type=int, default=10, help='requests per route traced for memory')
+  parser.add_argument('--include-writes', action='store_true')
+  parser.add_argument('--output', help='write results to this JSON file')
+  parser.add_argument('--compare', help='print the change against a previous results file')
+  args = parser.parse_args()
+
+  app.config['WTF_CSRF_ENABLED'] = False
+  counter = QueryCounter()
+  client = app.test_client()
+  results = {}
+  with app.app_context():
+    plan = routes(args.include_writes)
+  try:
+    for name, method, url, data in plan:
+      numbers = list(range(args.warmup + args.requests + args.memory_requests))
+      for n in numbers[:args.warmup]:
+        request(client, method, url, form_data(data, n))
+      results[name] = measure(client, counter, method, url, data, args.requests,
+                              numbers[args.warmup:])
+  finally:
+    for name, method, url, data in plan:
+      if name == 'create_show_submission':
+        delete_booked_shows(data, args.warmup + args.requests + args.memory_requests)
+
+  baseline = None
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)['routes']
+  print_results(results, baseline)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump({
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'routes': results,
+      }, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
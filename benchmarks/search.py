@@ -0,0 +1,87 @@
+"""Search benchmark.
+
+Compares the old unranked `name ILIKE '%term%'` venue search, planned the
+way it was before the trigram indexes existed, with search_query() on the
+indexed table. Needs PostgreSQL with the migrations applied:
+
+  python -m benchmarks.search --rows 1000000
+
+Rows are only ever added ("Bench Venue N" in generated cities) until the
+venues table holds --rows rows, so run it against a scratch database.
+"""
+
+import argparse
+import statistics
+import time
+
+from app import create_app, db, Venue, search_query
+
+app = create_app()
+
+TERMS = ['Hop', 'Music', 'Venue 4242', 'San Francisco, CA', 'zzz-no-match']
+
+
+def seed_venues(rows):
+  existing = db.session.query(db.func.count(Venue.id)).scalar()
+  if existing >= rows:
+    return
+  print('seeding %d venues...' % (rows - existing))
+  db.session.execute(db.text('''
+    INSERT INTO venues (name, city, state, address, seeking_talent)
+    SELECT 'Bench Venue ' || n,
+           (ARRAY['San Francisco', 'New York', 'Austin', 'Chicago', 'Seattle'])[1 + n % 5] || ' ' || (n % 997),
+           (ARRAY['CA', 'NY', 'TX', 'IL', 'WA'])[1 + n % 5],
+           n || ' Main St', false
+    FROM generate_series(:start, :stop) AS n
+  '''), {'start': existing + 1, 'stop': rows})
+  # the stats rows the ORM would have created with each venue
+  db.session.execute(db.text('''
+    INSERT INTO venue_stats (venue_id, upcoming_shows, past_shows, updated_at)
+    SELECT id, 0, 0, now() FROM venues
+    WHERE NOT EXISTS (SELECT 1 FROM venue_stats WHERE venue_stats.venue_id = venues.id)
+  '''))
+  db.session.commit()
+  db.session.execute(db.text('ANALYZE venues'))
+  db.session.execute(db.text('ANALYZE venue_stats'))
+  db.session.commit()
+
+
+def old_search(term):
+  # the pre-index query, with index scans disabled for this transaction so
+  # the planner behaves as it did before the trigram indexes existed
+  db.session.execute(db.text('SET LOCAL enable_bitmapscan = off'))
+  db.session.execute(db.text('SET LOCAL enable_indexscan = off'))
+  return Venue.query.filter(Venue.name.ilike('%' + term + '%')).all()
+
+
+def new_search(term):
+  return search_query(Venue, term, app.config['SEARCH_RESULTS_LIMIT']).all()
+
+
+def timed(func, term, repeat):
+  samples = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    func(term)
+    samples.append(time.perf_counter() - start)
+    db.session.rollback()
+  return statistics.median(samples) * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--rows', type=int, default=1000000)
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  with app.app_context():
+    seed_venues(args.rows)
+    print('%-22s %12s %12s %9s' % ('term', 'old (ms)', 'new (ms)', 'speedup'))
+    for term in TERMS:
+      old = timed(old_search, term, args.repeat)
+      new = timed(new_search, term, args.repeat)
+      print('%-22s %12.2f %12.2f %8.1fx' % (term, old, new, old / new))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,174 @@
+"""Synthetic data generator.
+
+Fills the database with venues, artists and shows at a chosen scale:
+
+  python -m benchmarks.seed --scale 100k --seed 42
+
+There is one venue per 20 shows and one artist per 10 shows. Cities are
+weighted roughly by the size of their live music scene. Genres follow a
+long tail. Most shows are in the past, start in the evening and cluster at
+weekends. The same --seed always produces the same data. Rows are appended,
+so run it against a scratch database.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import create_app, db, refresh_show_stats, Artist, Show, Venue
+from forms import VenueForm
+
+app = create_app()
+
+SCALES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+
+CITIES = [
+  ('New York', 'NY', 18), ('Los Angeles', 'CA', 14), ('Chicago', 'IL', 9),
+  ('Nashville', 'TN', 8), ('Austin', 'TX', 8), ('San Francisco', 'CA', 7),
+  ('Seattle', 'WA', 6), ('New Orleans', 'LA', 6), ('Atlanta', 'GA', 5),
+  ('Denver', 'CO', 4), ('Boston', 'MA', 4), ('Portland', 'OR', 4),
+  ('Philadelphia', 'PA', 3), ('Detroit', 'MI', 3), ('Minneapolis', 'MN', 2),
+  ('Miami', 'FL', 2), ('Memphis', 'TN', 2), ('Kansas City', 'MO', 1),
+]
+
+GENRE_WEIGHTS = {
+  'Rock n Roll': 14, 'Pop': 12, 'Hip-Hop': 11, 'Alternative': 9, 'Jazz': 7,
+  'Electronic': 7, 'R&B': 6, 'Country': 6, 'Folk': 5, 'Blues': 4, 'Soul': 4,
+  'Punk': 3, 'Heavy Metal': 3, 'Reggae': 2, 'Funk': 2, 'Classical': 2,
+  'Instrumental': 1, 'Musical Theatre': 1, 'Other': 1,
+}
+GENRES = [genre for genre, _ in VenueForm.genres.kwargs['choices']]
+
+WORDS = ['The', 'Blue', 'Velvet', 'Electric', 'Golden', 'Wild', 'Midnight',
+         'Neon', 'Iron', 'Silver', 'Lucky', 'Broken', 'Sonic', 'Red', 'Echo']
+VENUE_KINDS = ['Hall', 'Lounge', 'Room', 'Club', 'Theatre', 'Tavern', 'Garden']
+ARTIST_KINDS = ['Band', 'Collective', 'Trio', 'Orchestra', 'Project', 'Sound']
+
+CHUNK = 10000
+
+
+class Generator(object):
+  def __init__(self, seed):
+    self.random = random.Random(seed)
+    self.city_weights = [weight for _, _, weight in CITIES]
+    self.genre_weights = [GENRE_WEIGHTS.get(genre, 1) for genre in GENRES]
+
+  def name(self, kinds, n):
+    words = self.random.sample(WORDS, 2)
+    return '%s %s %s %d' % (words[0], words[1], self.random.choice(kinds), n)
+
+  def place(self):
+    city, state, _ = self.random.choices(CITIES, self.city_weights)[0]
+    return city, state
+
+  def genres(self):
+    count = self.random.choice([1, 1, 2, 2, 3])
+    return sorted(set(self.random.choices(GENRES, self.genre_weights, k=count)))
+
+  def start_time(self, now):
+    # 80% of shows are in the last three years, the rest in the next six
+    # months; doors open between 7pm and 11pm, and a third of shows get
+    # moved onto the weekend
+    if self.random.random() < 0.8:
+      day = now - timedelta(days=self.random.randint(1, 3 * 365))
+    else:
+      day = now + timedelta(days=self.random.randint(1, 180))
+    if self.random.random() < 0.33:
+      day += timedelta(days=(4 - day.weekday()) % 7 + self.random.randint(0, 1))
+    return day.replace(hour=self.random.randint(19, 23), minute=self.random.choice([0, 30]),
+                       second=0, microsecond=0)
+
+  def venue(self, n):
+    city, state = self.place()
+    return {
+      'name': self.name(VENUE_KINDS, n),
+      'city': city,
+      'state': state,
+      'address': '%d %s St' % (self.random.randint(1, 9999), self.random.choice(WORDS)),
+      'phone': '%03d-%03d-%04d' % (self.random.randint(200, 999), self.random.randint(0, 999), self.random.randint(0, 9999)),
+      'genres': self.genres(),
+      'facebook_link': 'https://www.facebook.com/venue%d' % n,
+      'image_link': 'https://picsum.photos/seed/venue%d/300/300' % n,
+      'seeking_talent': self.random.random() < 0.3,
+      'seeking_description': 'Looking for local acts.',
+    }
+
+  def artist(self, n):
+    city, state = self.place()
+    return {
+      'name': self.name(ARTIST_KINDS, n),
+      'city': city,
+      'state': state,
+      'phone': '%03d-%03d-%04d' % (self.random.randint(200, 999), self.random.randint(0, 999), self.random.randint(0, 9999)),
+      # stored the way the artist forms store a genre list in the text column
+      'genres': '{%s}' % ','.join(self.genres()),
+      'facebook_link': 'https://www.facebook.com/artist%d' % n,
+      'image_link': 'https://picsum.photos/seed/artist%d/300/300' % n,
+      'seeking_venue': self.random.random() < 0.4,
+      'seeking_description': 'Looking for shows.',
+    }
+
+  def show(self, venue_ids, artist_ids, now):
+    # venue_ids and artist_ids are (ids, cumulative popularity) pairs
+    return {
+      'venue_id': self.random.choices(venue_ids[0], cum_weights=venue_ids[1])[0],
+      'artist_id': self.random.choices(artist_ids[0], cum_weights=artist_ids[1])[0],
+      'start_time': self.start_time(now),
+    }
+
+
+def popularity(ids):
+  # Zipf-like cumulative weights, so a few venues and artists get most of
+  # the bookings
+  return ids, list(itertools.accumulate(1.0 / rank for rank in range(1, len(ids) + 1)))
+
+
+def insert(model, rows):
+  for start in range(0, len(rows), CHUNK):
+    db.session.execute(model.__table__.insert(), rows[start:start + CHUNK])
+  db.session.commit()
+
+
+def new_ids(model, count):
+  return [id for id, in db.session.query(model.id).order_by(model.id.desc()).limit(count)]
+
+
+def seed(num_shows, seed):
+  generator = Generator(seed)
+  now = datetime.now()
+  num_venues = max(num_shows // 20, 1)
+  num_artists = max(num_shows // 10, 1)
+
+  insert(Venue, [generator.venue(n) for n in range(num_venues)])
+  insert(Artist, [generator.artist(n) for n in range(num_artists)])
+  venue_ids = popularity(new_ids(Venue, num_venues))
+  artist_ids = popularity(new_ids(Artist, num_artists))
+  for start in range(0, num_shows, CHUNK):
+    count = min(CHUNK, num_shows - start)
+    insert(Show, [generator.show(venue_ids, artist_ids, now) for _ in range(count)])
+  # the core inserts above skip the ORM events that keep the show counts
+  refresh_show_stats(db.session.connection(), now)
+  db.session.commit()
+  return num_venues, num_artists
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--scale', choices=sorted(SCALES), default='10k',
+                      help='number of shows to create')
+  parser.add_argument('--shows', type=int, help='exact number of shows, overrides --scale')
+  parser.add_argument('--seed', type=int, default=42)
+  args = parser.parse_args()
+
+  num_shows = args.shows or SCALES[args.scale]
+  with app.app_context():
+    start = time.perf_counter()
+    num_venues, num_artists = seed(num_shows, args.seed)
+    print('created %d venues, %d artists and %d shows in %.1fs' % (
+      num_venues, num_artists, num_shows, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+  main()
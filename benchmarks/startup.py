@@ -0,0 +1,118 @@
+"""Worker startup benchmark.
+
+Starts a fresh interpreter per run that imports the app, builds it and
+serves one request through the test client, and reports the median time to
+that first response together with the slowest imports from
+`python -X importtime`:
+
+  python -m benchmarks.startup --runs 10
+  python -m benchmarks.startup --rev HEAD~1 --rev HEAD
+
+Each --rev is checked out into a temporary git worktree and measured the
+same way, so a change can be compared with the commit before it. The
+default path / needs no database; other paths need the configured database
+to be reachable.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# builds the app the way a worker does; trees from before create_app()
+# expose the app object itself
+PROBE = '''
+import time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app() if hasattr(module, 'create_app') else module.app
+created = time.perf_counter()
+status = application.test_client().get(%r).status_code
+done = time.perf_counter()
+print(status, imported - started, created - imported, done - created)
+'''
+
+IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+def probe(tree, path, importtime=False):
+  command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE % path]
+  started = time.perf_counter()
+  result = subprocess.run(command, cwd=tree, capture_output=True, text=True)
+  wall = time.perf_counter() - started
+  if result.returncode != 0:
+    raise RuntimeError('probe failed in %s:\n%s' % (tree, result.stderr[-2000:]))
+  status, imported, created, served = result.stdout.split()
+  return int(status), wall, float(imported), float(created), float(served), result.stderr
+
+
+def slowest_imports(stderr, count):
+  # top-level imports of the app module by cumulative time, in ms
+  imports = []
+  for line in stderr.splitlines():
+    match = IMPORTTIME.match(line)
+    if match and len(match.group(3)) == 3:
+      imports.append((int(match.group(2)) / 1000.0, match.group(4)))
+  return sorted(imports, reverse=True)[:count]
+
+
+def measure(name, tree, args):
+  runs = [probe(tree, args.path) for _ in range(args.runs)]
+  status = runs[0][0]
+  result = {
+    'status': status,
+    'first_request_ms': statistics.median(run[1] for run in runs) * 1000,
+    'import_ms': statistics.median(run[2] for run in runs) * 1000,
+    'create_app_ms': statistics.median(run[3] for run in runs) * 1000,
+    'first_response_ms': statistics.median(run[4] for run in runs) * 1000,
+  }
+  print('%s: GET %s -> %d' % (name, args.path, status))
+  print('  time to first request %8.1f ms  (import %.1f, create %.1f, first response %.1f)' % (
+    result['first_request_ms'], result['import_ms'], result['create_app_ms'], result['first_response_ms']))
+  print('  slowest imports:')
+  for ms, module in slowest_imports(probe(tree, args.path, importtime=True)[5], args.top):
+    print('    %8.1f ms  %s' % (ms, module))
+  return result
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per tree')
+  parser.add_argument('--path', default='/', help='the first request')
+  parser.add_argument('--rev', action='append', help='git revision to measure (repeatable); default the working tree')
+  parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+  args = parser.parse_args()
+
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  if not args.rev:
+    measure('working tree', root, args)
+    return 0
+
+  results = []
+  for rev in args.rev:
+    tree = tempfile.mkdtemp(prefix='fyyur-startup-')
+    subprocess.run(['git', 'worktree', 'add', '--detach', tree, rev], cwd=root, check=True,
+                   capture_output=True)
+    try:
+      results.append((rev, measure(rev, tree, args)))
+    finally:
+      subprocess.run(['git', 'worktree', 'remove', '--force', tree], cwd=root, capture_output=True)
+      shutil.rmtree(tree, ignore_errors=True)
+
+  if len(results) > 1:
+    base = results[0][1]['first_request_ms']
+    print()
+    for rev, result in results:
+      print('%-20s %8.1f ms  %+.0f%%' % (rev, result['first_request_ms'],
+                                        (result['first_request_ms'] / base - 1) * 100))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,180 @@
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+# Rendered pages keyed by the entity they show ("venue:1", "artist:4").
+# Entries expire after PAGE_CACHE_TTL seconds or at an explicit expiry time,
+# whichever comes first. Write handlers invalidate the keys they affect.
+#
+# The default "local" backend is a bounded in-process LRU. Each worker has
+# its own copy, so invalidation only reaches the worker that handled the
+# write. Use the "redis" backend (PAGE_CACHE_REDIS_URL) to share one cache,
+# and its invalidations, between workers.
+#
+# A read replica can lag behind the write that invalidated a page, and a
+# page rendered from it would go back into the cache stale for a whole TTL.
+# Invalidating a key therefore marks it for READ_YOUR_WRITES_SECONDS (the
+# lag routing.py allows for), and pages read from a replica are not cached
+# under a marked key; a page read from the primary always is.
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, get_flashed_messages
+
+
+class LocalCache(object):
+  def __init__(self, max_entries):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+
+  def get(self, key):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None:
+        return None
+      value, expires = entry
+      if expires <= time.monotonic():
+        del self.entries[key]
+        return None
+      self.entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, timeout):
+    with self.lock:
+      self.entries[key] = (value, time.monotonic() + timeout)
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+
+  def delete(self, *keys):
+    with self.lock:
+      for key in keys:
+        self.entries.pop(key, None)
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+
+
+class RedisCache(object):
+  # LRU eviction is redis' own job here: run it with
+  # maxmemory-policy allkeys-lru (or volatile-lru)
+  def __init__(self, url, prefix='fyyur:'):
+    import redis
+    self.client = redis.Redis.from_url(url)
+    self.prefix = prefix
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    return value.decode('utf-8') if value is not None else None
+
+  def set(self, key, value, timeout):
+    self.client.set(self.prefix + key, value.encode('utf-8'), px=max(int(timeout * 1000), 1))
+
+  def delete(self, *keys):
+    if keys:
+      self.client.delete(*[self.prefix + key for key in keys])
+
+  def clear(self):
+    keys = list(self.client.scan_iter(self.prefix + '*'))
+    if keys:
+      self.client.delete(*keys)
+
+
+class PageCacheState(object):
+  # an app's cache backend and TTL, in app.extensions['page_cache']
+  def __init__(self, backend, ttl, lag):
+    self.backend = backend
+    self.ttl = ttl
+    self.lag = lag
+
+
+class PageCache(object):
+  # one instance serves every app it is initialised on, each with its own
+  # backend, looked up through current_app
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('PAGE_CACHE_BACKEND', 'local')
+    app.config.setdefault('PAGE_CACHE_SIZE', 1000)
+    app.config.setdefault('PAGE_CACHE_TTL', 300)
+    app.config.setdefault('PAGE_CACHE_REDIS_URL', None)
+    app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+    backend = app.config['PAGE_CACHE_BACKEND']
+    if backend == 'local':
+      backend = LocalCache(app.config['PAGE_CACHE_SIZE'])
+    elif backend == 'redis':
+      backend = RedisCache(app.config['PAGE_CACHE_REDIS_URL'])
+    elif backend is not None:
+      raise ValueError('unknown PAGE_CACHE_BACKEND %r' % backend)
+    app.extensions['page_cache'] = PageCacheState(
+      backend, app.config['PAGE_CACHE_TTL'], app.config['READ_YOUR_WRITES_SECONDS'])
+
+  @property
+  def backend(self):
+    return current_app.extensions['page_cache'].backend
+
+  @property
+  def ttl(self):
+    return current_app.extensions['page_cache'].ttl
+
+  @property
+  def lag(self):
+    return current_app.extensions['page_cache'].lag
+
+  @property
+  def shared(self):
+    # whether changes reach every worker, and so can be made from the CLI
+    return isinstance(self.backend, RedisCache)
+
+  def get(self, key):
+    # a page rendered while flash messages are pending must be rendered
+    # fresh, or the messages would never be shown
+    backend = self.backend
+    if backend is None or get_flashed_messages():
+      return None
+    return backend.get(key)
+
+  def version(self, key):
+    # the version the cached page at `key` was rendered at, if set with one
+    backend = self.backend
+    if backend is None:
+      return None
+    version = backend.get(key + '@version')
+    return datetime.fromisoformat(version) if version is not None else None
+
+  def set(self, key, page, expires_at=None, version=None, replica=False):
+    # expires_at is a naive local datetime such as the start_time of the
+    # next upcoming show, after which the page would be stale. version is
+    # the page's version (see page_validators in app.py), kept alongside it.
+    # replica says the page was read from a replica.
+    backend = self.backend
+    if backend is None or get_flashed_messages():
+      return
+    if replica and backend.get(key + '@invalidated') is not None:
+      return
+    timeout = self.ttl
+    if expires_at is not None:
+      timeout = min(timeout, (expires_at - datetime.now()).total_seconds())
+    if timeout > 0:
+      if version is not None:
+        backend.set(key + '@version', version.isoformat(), timeout)
+      backend.set(key, page, timeout)
+
+  def invalidate(self, *keys):
+    backend = self.backend
+    if backend is not None:
+      backend.delete(*(keys + tuple(key + '@version' for key in keys)))
+      for key in keys:
+        backend.set(key + '@invalidated', '1', self.lag)
+
+  def clear(self):
+    backend = self.backend
+    if backend is not None:
+      backend.clear()
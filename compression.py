@@ -0,0 +1,189 @@
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+# Compresses HTML, JSON and other text responses with the encoding the
+# client prefers among COMPRESSION_ENCODINGS, in the server's order when the
+# client has no preference. gzip is always available; br and zstd are used
+# when the brotli or zstandard package is installed.
+#
+# Responses rendered in one piece are compressed in one go, and only once
+# they reach COMPRESSION_MIN_SIZE bytes. Streamed responses (the /api/*
+# exports) are compressed as the app yields them and never held in memory
+# whole; the compressor is flushed once COMPRESSION_FLUSH_SIZE bytes have
+# gone in, so a client gets each batch of rows as it is read rather than
+# one flush per row, which would undo most of the compression. Their size
+# is not known up front, so they are always compressed.
+#
+# The ETag of a compressed response is made weak, since its bytes differ
+# from the uncompressed one; page_validators in app.py compare ETags weakly,
+# so a revalidation matches either way.
+#
+# Files with a Content-Encoding already (the gzipped copies in assets.py)
+# and files sent straight from disk are left alone.
+#
+# see https://developer.mozilla.org/en-US/docs/Web/HTTP/Compression
+
+import zlib
+
+from flask import current_app, request
+
+
+class GzipEncoder(object):
+  def __init__(self, level):
+    # wbits 31 writes a gzip header and trailer around the deflate stream
+    self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+  def compress(self, data):
+    return self.compressor.compress(data)
+
+  def flush(self):
+    return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+  def finish(self):
+    return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(object):
+  def __init__(self, level):
+    import brotli
+    self.compressor = brotli.Compressor(quality=level)
+
+  def compress(self, data):
+    return self.compressor.process(data)
+
+  def flush(self):
+    return self.compressor.flush()
+
+  def finish(self):
+    return self.compressor.finish()
+
+
+class ZstdEncoder(object):
+  def __init__(self, level):
+    import zstandard
+    self.flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+  def compress(self, data):
+    return self.compressor.compress(data)
+
+  def flush(self):
+    return self.compressor.flush(self.flush_block)
+
+  def finish(self):
+    return self.compressor.flush()
+
+
+ENCODERS = {
+  'gzip': GzipEncoder,
+  'br': BrotliEncoder,
+  'zstd': ZstdEncoder,
+}
+
+
+def available_encodings(encodings):
+  # the configured encodings whose package is installed
+  available = []
+  for encoding in encodings:
+    try:
+      ENCODERS[encoding](1)
+    except ImportError:
+      continue
+    available.append(encoding)
+  return available
+
+
+class CompressionState(object):
+  # an app's compression settings, in app.extensions['compression']
+  def __init__(self, app):
+    self.encodings = available_encodings(app.config['COMPRESSION_ENCODINGS'])
+    self.levels = app.config['COMPRESSION_LEVELS']
+    self.min_size = app.config['COMPRESSION_MIN_SIZE']
+    self.flush_size = app.config['COMPRESSION_FLUSH_SIZE']
+    self.mimetypes = set(app.config['COMPRESSION_MIMETYPES'])
+
+
+class Compression(object):
+  # one instance serves every app it is initialised on; the settings of the
+  # current app are looked up per request
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('COMPRESSION_ENCODINGS', ['br', 'zstd', 'gzip'])
+    app.config.setdefault('COMPRESSION_LEVELS', {'gzip': 6, 'br': 4, 'zstd': 3})
+    app.config.setdefault('COMPRESSION_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESSION_FLUSH_SIZE', 16384)
+    app.config.setdefault('COMPRESSION_MIMETYPES', [
+      'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+      'application/json', 'application/x-ndjson', 'image/svg+xml',
+    ])
+    app.extensions['compression'] = CompressionState(app)
+    app.after_request(self.compress)
+
+  @property
+  def state(self):
+    return current_app.extensions['compression']
+
+  def negotiate(self, accept_encodings):
+    # the encoding with the highest quality in Accept-Encoding, or None
+    best, best_quality = None, 0
+    for encoding in self.state.encodings:
+      quality = accept_encodings[encoding]
+      if quality > best_quality:
+        best, best_quality = encoding, quality
+    return best
+
+  def encoder(self, encoding):
+    return ENCODERS[encoding](self.state.levels.get(encoding, 6))
+
+  def compress(self, response):
+    state = self.state
+    if (response.direct_passthrough or 'Content-Encoding' in response.headers
+        or response.mimetype not in state.mimetypes or response.cache_control.no_transform
+        or response.status_code < 200 or response.status_code in (204, 206)):
+      return response
+
+    streamed = response.is_streamed
+    if not streamed and response.status_code != 304 and len(response.get_data()) < state.min_size:
+      return response
+    response.vary.add('Accept-Encoding')
+    encoding = self.negotiate(request.accept_encodings)
+    if encoding is None:
+      return response
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+      response.set_etag(etag, weak=True)
+    if response.status_code == 304:
+      # no body, only the validators of the compressed response
+      return response
+
+    response.content_encoding = encoding
+    if streamed:
+      chunks = response.response
+      response.response = self.compress_stream(response.iter_encoded(), self.encoder(encoding),
+                                               state.flush_size)
+      if hasattr(chunks, 'close'):
+        response.call_on_close(chunks.close)
+      response.headers.pop('Content-Length', None)
+    else:
+      encoder = self.encoder(encoding)
+      response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+    return response
+
+  def compress_stream(self, chunks, encoder, flush_size):
+    # runs as the body is sent, after the app context may be gone, so it
+    # gets the flush size rather than looking it up
+    pending = 0
+    for chunk in chunks:
+      compressed = encoder.compress(chunk)
+      pending += len(chunk)
+      if pending >= flush_size:
+        compressed += encoder.flush()
+        pending = 0
+      if compressed:
+        yield compressed
+    yield encoder.finish()
@@ -1,5 +1,6 @@
 import os
-SECRET_KEY = os.urandom(32)
+# Set SECRET_KEY in production so every worker signs sessions the same way.
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -10,5 +11,95 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://postgres@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://postgres@localhost:5432/fyyur')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, per worker process. pre_ping replaces connections the
+# server dropped; recycle retires them before idle timeouts do.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+}
+if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    # sqlite file databases use a pool without a size
+    SQLALCHEMY_ENGINE_OPTIONS['pool_size'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    SQLALCHEMY_ENGINE_OPTIONS['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+
+# Read replicas, as a comma separated DATABASE_REPLICA_URLS. Reads made by
+# GET requests go to a replica; writes, and the reads of a client for
+# READ_YOUR_WRITES_SECONDS after it wrote, go to the primary. See the
+# README for trying this out locally with two PostgreSQL databases.
+SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+SQLALCHEMY_BINDS = dict(('replica_%d' % i, uri) for i, uri in enumerate(SQLALCHEMY_REPLICA_URIS))
+SQLALCHEMY_REPLICA_BINDS = sorted(SQLALCHEMY_BINDS)
+READ_YOUR_WRITES_SECONDS = 5
+
+# Venue and artist pages list at most this many of the most recent past
+# shows; the counts still cover all of them.
+VENUE_PAST_SHOWS_LIMIT = 50
+ARTIST_PAST_SHOWS_LIMIT = 50
+
+# Longest show that can be booked, in minutes. Overlap checks only look this
+# far back from a new show's start.
+MAX_SHOW_MINUTES = 720
+
+# Number of shows per page on /shows.
+SHOWS_PER_PAGE = 60
+
+# Number of (city, state) areas per page on /venues.
+VENUE_AREAS_PER_PAGE = 25
+
+# Maximum number of ranked results returned by the venue and artist search.
+SEARCH_RESULTS_LIMIT = 50
+
+# Statements slower than this are logged with the endpoint that ran them.
+SLOW_QUERY_THRESHOLD_MS = 100
+
+# Rendered venue and artist pages. PAGE_CACHE_BACKEND is 'local' (in-process
+# LRU, per worker), 'redis' (shared between workers, needs the redis
+# package and PAGE_CACHE_REDIS_URL) or None to disable caching.
+PAGE_CACHE_BACKEND = 'local'
+PAGE_CACHE_SIZE = 1000
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+PAGE_CACHE_REDIS_URL = os.environ.get('PAGE_CACHE_REDIS_URL')
+
+# Compiled templates, shared by every worker (see templating.py), and the
+# per-worker cache of rendered show and venue/artist tiles. Set
+# FRAGMENT_CACHE_SIZE to 0 to render every tile.
+TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR') or os.path.join(basedir, '.jinja_cache')
+FRAGMENT_CACHE_SIZE = 10000
+FRAGMENT_CACHE_TTL = 3600
+
+# Fingerprinted, gzipped static files written by `flask assets build` (see
+# assets.py) and served from ASSETS_URL_PATH with far-future cache headers.
+# Pages link the plain static files until a build exists.
+ASSETS_BUILD_DIR = os.environ.get('ASSETS_BUILD_DIR') or os.path.join(basedir, '.assets')
+ASSETS_URL_PATH = '/assets'
+ASSETS_MAX_AGE = 31536000
+
+# Response compression (see compression.py): encodings in order of
+# preference (br and zstd need the brotli and zstandard packages), their
+# levels, the smallest page worth compressing and how much of a streamed
+# response is buffered before it is flushed to the client.
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_FLUSH_SIZE = 16384
+
+# Most ids accepted by one POST /venues/delete or /artists/delete.
+BULK_DELETE_LIMIT = 1000
+
+# Rows fetched per round trip when streaming /api/* responses.
+API_STREAM_BATCH = 1000
+
+# Venue/artist matchmaking (see matching.py): results per page, seconds
+# before a worker rebuilds its match index, and the score weights.
+MATCH_RESULTS = 20
+MATCH_INDEX_TTL = 600
+MATCH_WEIGHTS = {
+    'genres': 0.45,
+    'location': 0.25,
+    'seeking': 0.1,
+    'activity': 0.1,
+    'history': 0.1,
+}
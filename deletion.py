@@ -0,0 +1,39 @@
+#----------------------------------------------------------------------------#
+# Bulk delete.
+#----------------------------------------------------------------------------#
+
+# `flask delete` removes venues or artists by id, with their shows, using
+# the same set-based delete as the delete endpoints:
+#
+#   flask delete venues 12 40 41
+#   flask delete artists --file artist_ids.txt --batch-size 500
+#
+# Each batch is one transaction, so a long list never holds its locks for
+# the whole run.
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('delete')
+@click.argument('table', type=click.Choice(['venues', 'artists']))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--file', 'ids_file', type=click.File(), help='file of ids, one per line')
+@click.option('--batch-size', default=1000, show_default=True, help='ids deleted per transaction')
+@with_appcontext
+def delete_command(table, ids, ids_file, batch_size):
+  """Delete venues or artists, and their shows, by id."""
+  from app import db, delete_owners, page_cache, Artist, Venue
+  ids = list(ids)
+  if ids_file is not None:
+    ids.extend(int(line) for line in ids_file if line.strip())
+  if not ids:
+    raise click.UsageError('no ids given')
+  model = Venue if table == 'venues' else Artist
+  total = 0
+  for start in range(0, len(ids), batch_size):
+    deleted, stale_pages = delete_owners(model, ids[start:start + batch_size])
+    db.session.commit()
+    page_cache.invalidate(*stale_pages)
+    total += deleted
+    click.echo('%s: %d of %d deleted' % (table, total, len(ids)))
@@ -0,0 +1,127 @@
+#----------------------------------------------------------------------------#
+# Snapshot export.
+#----------------------------------------------------------------------------#
+
+# `flask export` writes the venues, artists and shows tables to gzipped
+# NDJSON or CSV, all read from one REPEATABLE READ snapshot so shows never
+# point at venues or artists missing from the dump. Rows come off a
+# server-side cursor a batch at a time, so memory stays bounded whatever the
+# table size. With --parallel on PostgreSQL each table is written by its own
+# connection, and they all share the snapshot through pg_export_snapshot().
+#
+#   flask export --output-dir dump/ --format ndjson --parallel
+#   flask import --trusted --venues dump/venues.ndjson.gz \
+#     --artists dump/artists.ndjson.gz --shows dump/shows.ndjson.gz
+
+import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+TABLES = ('venues', 'artists', 'shows')
+
+
+def csv_value(value):
+  # the spellings read_rows() and Table.restore() read back
+  if value is None:
+    return ''
+  if isinstance(value, list):
+    return ','.join(value)
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return value
+
+
+def json_default(value):
+  return value.isoformat()
+
+
+def export_table(connection, table, path, format, batch_size):
+  # stream one table to `path` from a server-side cursor; returns the row count
+  result = connection.execution_options(stream_results=True)\
+    .execute(table.select().order_by(table.c.id))
+  columns = list(result.keys())
+  count = 0
+  with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+    writer = None
+    if format == 'csv':
+      writer = csv.writer(f)
+      writer.writerow(columns)
+    for rows in result.partitions(batch_size):
+      for row in rows:
+        if writer is not None:
+          writer.writerow([csv_value(value) for value in row])
+        else:
+          f.write(json.dumps(dict(zip(columns, row)), default=json_default) + '\n')
+      count += len(rows)
+  return count
+
+
+def snapshot_connection(engine, snapshot=None):
+  # a connection in a read-only REPEATABLE READ transaction, optionally
+  # joined to an exported snapshot. SET TRANSACTION SNAPSHOT has to be the
+  # first statement of the transaction.
+  postgres = engine.dialect.name == 'postgresql'
+  connection = engine.connect().execution_options(
+    isolation_level='REPEATABLE READ' if postgres else 'SERIALIZABLE')
+  transaction = connection.begin()
+  if snapshot is not None:
+    connection.exec_driver_sql("SET TRANSACTION SNAPSHOT '%s'" % snapshot)
+  if postgres:
+    connection.exec_driver_sql('SET TRANSACTION READ ONLY')
+  return connection, transaction
+
+
+@click.command('export')
+@click.option('--output-dir', default='.', type=click.Path(file_okay=False), show_default=True)
+@click.option('--format', 'format', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('--table', 'tables', type=click.Choice(TABLES), multiple=True, help='tables to export (default: all)')
+@click.option('--batch-size', default=5000, show_default=True, help='rows fetched per round trip')
+@click.option('--parallel', is_flag=True, help='write tables concurrently from a shared snapshot (PostgreSQL)')
+@with_appcontext
+def export_command(output_dir, format, tables, batch_size, parallel):
+  """Export venues, artists and shows from one consistent snapshot."""
+  from app import db
+  engine = db.engine
+  tables = tables or TABLES
+  if parallel and engine.dialect.name != 'postgresql':
+    raise click.UsageError('--parallel needs a PostgreSQL database')
+  os.makedirs(output_dir, exist_ok=True)
+  paths = {name: os.path.join(output_dir, '%s.%s.gz' % (name, format)) for name in tables}
+  metadata = db.Model.metadata
+  started = time.perf_counter()
+
+  connection, transaction = snapshot_connection(engine)
+  try:
+    if parallel:
+      snapshot = connection.exec_driver_sql('SELECT pg_export_snapshot()').scalar()
+
+      def work(name):
+        worker, worker_transaction = snapshot_connection(engine, snapshot)
+        try:
+          return export_table(worker, metadata.tables[name], paths[name], format, batch_size)
+        finally:
+          worker_transaction.rollback()
+          worker.close()
+
+      # the exporting transaction stays open until every worker has finished
+      with ThreadPoolExecutor(max_workers=len(tables)) as pool:
+        counts = dict(zip(tables, pool.map(work, tables)))
+    else:
+      counts = {name: export_table(connection, metadata.tables[name], paths[name], format, batch_size)
+                for name in tables}
+  finally:
+    transaction.rollback()
+    connection.close()
+
+  elapsed = time.perf_counter() - started
+  for name in tables:
+    click.echo('%s: %d rows -> %s' % (name, counts[name], paths[name]))
+  total = sum(counts.values())
+  click.echo('done: %d rows in %.1fs (%.0f rows/s)' % (total, elapsed, total / elapsed if elapsed else 0))
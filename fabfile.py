@@ -4,13 +4,26 @@ from fabric.contrib.console import confirm
 # prepare for deployment
 
 
-def test():
-    with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+def check_tests(result):
+    # the database tests skip themselves without TEST_DATABASE_URL, which
+    # pytest counts as a success; -rs lists the skip reasons to look for
+    print(result)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
+    if "TEST_DATABASE_URL is not set" in result and not confirm(
+        "The database tests were skipped, TEST_DATABASE_URL is not set. Continue?"
+    ):
+        abort("Aborted at user request.")
+
+
+def test():
+    with settings(warn_only=True):
+        result = local("python -m pytest -rs tests", capture=True)
+    check_tests(result)
+
+
+def bench(output="bench_results.json"):
+    local("python -m benchmarks.routes --output {}".format(output))
 
 
 def commit():
@@ -39,9 +52,10 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    # needs requirements-test.txt installed and TEST_DATABASE_URL set on the app
+    with settings(warn_only=True):
+        result = local("heroku run python -m pytest -rs tests", capture=True)
+    check_tests(result)
 
 
 def deploy():
@@ -0,0 +1,45 @@
+#----------------------------------------------------------------------------#
+# Date formatting.
+#----------------------------------------------------------------------------#
+
+# Backs the `datetime` Jinja filter. Each (pattern, locale) pair is parsed
+# into a babel DateTimePattern once and kept, and recently formatted values
+# are memoized, since list pages repeat the same few start times over and
+# over. Strings are only parsed when a string is what the filter was given.
+
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+NAMED_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+
+class DateTimeFormatter(object):
+  def __init__(self, locale='en', cache_size=4096):
+    self.locale = Locale.parse(locale)
+    self.patterns = {}
+    self.format_value = lru_cache(maxsize=cache_size)(self.format_value)
+
+  def compile(self, format):
+    # the babel pattern for a named format or a raw pattern string
+    pattern = self.patterns.get(format)
+    if pattern is None:
+      pattern = self.patterns[format] = babel.dates.parse_pattern(NAMED_FORMATS.get(format, format))
+    return pattern
+
+  def format_value(self, value, format):
+    # same output as babel.dates.format_datetime, which treats naive
+    # datetimes as UTC
+    if value.tzinfo is None:
+      value = value.replace(tzinfo=babel.dates.UTC)
+    return self.compile(format).apply(value, self.locale)
+
+  def __call__(self, value, format='medium'):
+    if isinstance(value, str):
+      value = dateutil.parser.parse(value)
+    return self.format_value(value, format)
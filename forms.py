@@ -13,7 +13,23 @@ class ShowForm(FlaskForm):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
-        default= datetime.today()
+        default=datetime.today
+    )
+    duration = SelectField(
+        'duration', validators=[DataRequired()],
+        coerce=int,
+        default=120,
+        choices=[
+            (30, '30 minutes'),
+            (60, '1 hour'),
+            (90, '1 hour 30 minutes'),
+            (120, '2 hours'),
+            (180, '3 hours'),
+            (240, '4 hours'),
+            (360, '6 hours'),
+            (480, '8 hours'),
+            (720, '12 hours'),
+        ]
     )
 
 class VenueForm(FlaskForm):
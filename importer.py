@@ -0,0 +1,377 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# `flask import` loads venues, artists and shows from CSV or NDJSON files
+# (optionally gzipped). Rows are checked with the same VenueForm, ArtistForm
+# and ShowForm rules as the create pages. Rows that already exist are
+# skipped, and so are shows whose venue or artist does not exist. Inserts go
+# out in chunks, one transaction per chunk, as an executemany or, with
+# --copy on PostgreSQL, a COPY.
+#
+#   flask import --venues venues.csv --artists artists.ndjson --shows shows.csv.gz
+#
+# Rows that carry an `id` keep it, so a `flask export` dump loads back with
+# its references intact. Use --trusted for such dumps: their rows are
+# restored as they are, with types converted but no form validation.
+
+import csv
+import gzip
+import io
+import json
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import ARRAY, Boolean, DateTime, Integer
+from werkzeug.datastructures import MultiDict
+
+TRUE_VALUES = ('1', 't', 'true', 'y', 'yes', 'on')
+
+
+def open_text(path):
+  if path.endswith('.gz'):
+    return gzip.open(path, 'rt', encoding='utf-8', newline='')
+  return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(path):
+  # dicts from a .csv or .ndjson/.jsonl file, gzipped or not
+  name = path[:-3] if path.endswith('.gz') else path
+  with open_text(path) as f:
+    if name.endswith('.csv'):
+      for row in csv.DictReader(f):
+        yield row
+    else:
+      for line in f:
+        if line.strip():
+          yield json.loads(line)
+
+
+def as_list(value):
+  # genres arrive as a JSON list, a CSV "Jazz,Soul" cell or a stored
+  # "{Jazz,Soul}" literal
+  if value is None or value == '':
+    return []
+  if isinstance(value, list):
+    return value
+  return [genre.strip() for genre in str(value).strip('}{').split(',') if genre.strip()]
+
+
+def as_flag(value):
+  return 'y' if str(value).strip().lower() in TRUE_VALUES else ''
+
+
+def text(value):
+  return '' if value is None else str(value)
+
+
+class Table(object):
+  # How one table is validated, de-duplicated and written. Subclasses name
+  # the model and form, map a raw row to form data and a validated form to
+  # the values inserted, and give the natural key used to spot duplicates.
+  name = None
+
+  def __init__(self, models, db):
+    self.db = db
+    self.model = models[self.name]
+
+  def formdata(self, raw):
+    raise NotImplementedError
+
+  def values(self, form):
+    raise NotImplementedError
+
+  def natural_key(self):
+    raise NotImplementedError
+
+  def validate(self, raw):
+    # (values, None) for a valid row, (None, errors) otherwise
+    # one form instance per table, re-processed for every row; building a
+    # form is several times more expensive than validating one
+    form = getattr(self, 'form', None)
+    if form is None:
+      form = self.form = self.form_class(formdata=None, meta={'csrf': False})
+    form.process(formdata=self.formdata(raw))
+    if not form.validate():
+      return None, form.errors
+    values = self.values(form)
+    if raw.get('id') not in (None, ''):
+      values['id'] = int(raw['id'])
+    return values, None
+
+  def restore(self, raw):
+    # a row from `flask export`, taken as it is apart from type conversion
+    values = {}
+    for column in self.model.__table__.columns:
+      if column.name not in raw:
+        continue
+      value = raw[column.name]
+      if value is None or value == '':
+        value = None
+      elif isinstance(column.type, ARRAY):
+        value = as_list(value)
+      elif isinstance(column.type, Boolean):
+        value = as_flag(value) == 'y'
+      elif isinstance(column.type, DateTime):
+        value = datetime.fromisoformat(value)
+      elif isinstance(column.type, Integer):
+        value = int(value)
+      values[column.name] = value
+    return values, None
+
+  def key_columns(self, rows):
+    if all('id' in row for row in rows):
+      return [self.model.id]
+    return self.natural_key()
+
+  def existing(self, rows):
+    # keys of the rows in this chunk that are already in the database
+    columns = self.key_columns(rows)
+    keys = {tuple(row[column.key] for column in columns) for row in rows}
+    query = self.db.session.query(*columns).filter(self.db.tuple_(*columns).in_(list(keys)))
+    return {tuple(found) for found in query}, columns
+
+  def resolve(self, rows):
+    # drop rows whose references do not exist; returns (rows, dropped)
+    return rows, 0
+
+
+class Venues(Table):
+  name = 'venues'
+
+  @property
+  def form_class(self):
+    from forms import VenueForm
+    return VenueForm
+
+  def formdata(self, raw):
+    data = MultiDict([(field, text(raw.get(field))) for field in (
+      'name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link', 'seeking_description')])
+    data.setlist('genres', as_list(raw.get('genres')))
+    data['website_link'] = text(raw.get('website', raw.get('website_link')))
+    data['seeking_talent'] = as_flag(raw.get('seeking_talent'))
+    return data
+
+  def values(self, form):
+    return {
+      'name': form.name.data, 'city': form.city.data, 'state': form.state.data,
+      'address': form.address.data, 'phone': form.phone.data, 'genres': form.genres.data,
+      'facebook_link': form.facebook_link.data, 'website': form.website_link.data,
+      'image_link': form.image_link.data, 'seeking_talent': form.seeking_talent.data,
+      'seeking_description': form.seeking_description.data,
+    }
+
+  def natural_key(self):
+    return [self.model.name, self.model.city, self.model.state]
+
+
+class Artists(Table):
+  name = 'artists'
+
+  @property
+  def form_class(self):
+    from forms import ArtistForm
+    return ArtistForm
+
+  def formdata(self, raw):
+    data = MultiDict([(field, text(raw.get(field))) for field in (
+      'name', 'city', 'state', 'phone', 'image_link', 'facebook_link', 'seeking_description')])
+    data.setlist('genres', as_list(raw.get('genres')))
+    data['website_link'] = text(raw.get('website', raw.get('website_link')))
+    data['seeking_venue'] = as_flag(raw.get('seeking_venue'))
+    return data
+
+  def values(self, form):
+    return {
+      'name': form.name.data, 'city': form.city.data, 'state': form.state.data,
+      'phone': form.phone.data,
+      # the same "{Jazz,Soul}" text the artist forms end up storing
+      'genres': '{%s}' % ','.join(form.genres.data),
+      'facebook_link': form.facebook_link.data, 'website': form.website_link.data,
+      'image_link': form.image_link.data, 'seeking_venue': form.seeking_venue.data,
+      'seeking_description': form.seeking_description.data,
+    }
+
+  def natural_key(self):
+    return [self.model.name, self.model.city, self.model.state]
+
+
+class Shows(Table):
+  # imported shows are not checked for double bookings the way book_show()
+  # checks shows created through the form
+  name = 'shows'
+
+  def __init__(self, models, db):
+    super(Shows, self).__init__(models, db)
+    self.venue = models['venues']
+    self.artist = models['artists']
+
+  @property
+  def form_class(self):
+    from forms import ShowForm
+    return ShowForm
+
+  def formdata(self, raw):
+    start_time = text(raw.get('start_time'))
+    try:
+      # ShowForm wants "%Y-%m-%d %H:%M:%S"; accept any ISO 8601 timestamp
+      start_time = datetime.fromisoformat(start_time).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+      pass
+    return MultiDict([
+      ('venue_id', text(raw.get('venue_id'))),
+      ('artist_id', text(raw.get('artist_id'))),
+      ('start_time', start_time),
+      ('duration', text(raw.get('duration')) or '120'),
+    ])
+
+  def validate(self, raw):
+    values, errors = super(Shows, self).validate(raw)
+    if values is None:
+      return values, errors
+    try:
+      values['venue_id'] = int(values['venue_id'])
+      values['artist_id'] = int(values['artist_id'])
+    except ValueError:
+      return None, {'venue_id/artist_id': ['must be integer ids']}
+    return self.check_duration(values)
+
+  def restore(self, raw):
+    # trusted rows are still held to the booking rules' duration limit
+    values, errors = super(Shows, self).restore(raw)
+    return self.check_duration(values)
+
+  def check_duration(self, values):
+    from app import check_duration
+    try:
+      check_duration(values.get('duration', 120))
+    except ValueError as error:
+      return None, {'duration': [str(error)]}
+    return values, None
+
+  def values(self, form):
+    return {'venue_id': form.venue_id.data, 'artist_id': form.artist_id.data,
+            'start_time': form.start_time.data, 'duration': form.duration.data}
+
+  def natural_key(self):
+    return [self.model.venue_id, self.model.artist_id, self.model.start_time]
+
+  def resolve(self, rows):
+    # one lookup per referenced table for the whole chunk
+    query = self.db.session.query
+    venue_ids = {id for id, in query(self.venue.id).filter(self.venue.id.in_({row['venue_id'] for row in rows}))}
+    artist_ids = {id for id, in query(self.artist.id).filter(self.artist.id.in_({row['artist_id'] for row in rows}))}
+    resolved = [row for row in rows if row['venue_id'] in venue_ids and row['artist_id'] in artist_ids]
+    return resolved, len(rows) - len(resolved)
+
+
+def copy_value(value):
+  # a value as PostgreSQL's COPY ... CSV expects it
+  if isinstance(value, list):
+    return '{%s}' % ','.join('"%s"' % item.replace('\\', '\\\\').replace('"', '\\"') for item in value)
+  if isinstance(value, datetime):
+    return value.isoformat(' ')
+  return value
+
+
+def write_chunk(db, table, rows, use_copy):
+  # both paths write the model's columns that the rows carry, so a
+  # restored updated_at survives either way
+  if use_copy:
+    columns = [column.name for column in table.model.__table__.columns if column.name in rows[0]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+      writer.writerow([copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (table.name, ', '.join(columns)), buffer)
+  else:
+    db.session.execute(table.model.__table__.insert(), rows)
+  db.session.commit()
+
+
+def reset_sequence(db, table):
+  # rows imported with explicit ids leave the serial sequence behind
+  if db.engine.dialect.name == 'postgresql':
+    db.session.execute(db.text(
+      "SELECT setval(pg_get_serial_sequence('{0}', 'id'), coalesce(max(id), 1)) FROM {0}".format(table.name)))
+    db.session.commit()
+
+
+def import_table(db, table, path, chunk_size, use_copy, trusted=False, report=click.echo):
+  stats = {'read': 0, 'inserted': 0, 'duplicate': 0, 'invalid': 0, 'unresolved': 0}
+  seen = set()
+  started = time.perf_counter()
+  with_ids = False
+
+  def flush(rows):
+    rows, unresolved = table.resolve(rows)
+    stats['unresolved'] += unresolved
+    if rows:
+      found, columns = table.existing(rows)
+      fresh = [row for row in rows if tuple(row[column.key] for column in columns) not in found]
+      stats['duplicate'] += len(rows) - len(fresh)
+      if fresh:
+        write_chunk(db, table, fresh, use_copy)
+        stats['inserted'] += len(fresh)
+    elapsed = time.perf_counter() - started
+    report('%s: %d read, %d inserted, %d duplicate, %d invalid, %d unresolved (%.0f rows/s)' % (
+      table.name, stats['read'], stats['inserted'], stats['duplicate'], stats['invalid'],
+      stats['unresolved'], stats['read'] / elapsed if elapsed else 0))
+
+  chunk = []
+  for line, raw in enumerate(read_rows(path), start=1):
+    stats['read'] += 1
+    values, errors = table.restore(raw) if trusted else table.validate(raw)
+    if values is None:
+      stats['invalid'] += 1
+      if stats['invalid'] <= 10:
+        report('%s:%d: skipped, %s' % (path, line, errors))
+      continue
+    with_ids = with_ids or 'id' in values
+    # duplicates inside the file itself
+    key = values.get('id') or tuple(values[column.key] for column in table.natural_key())
+    if key in seen:
+      stats['duplicate'] += 1
+      continue
+    seen.add(key)
+    chunk.append(values)
+    if len(chunk) >= chunk_size:
+      flush(chunk)
+      chunk = []
+  if chunk or not stats['read']:
+    flush(chunk)
+  if with_ids:
+    reset_sequence(db, table)
+  return stats
+
+
+@click.command('import')
+@click.option('--venues', 'venues_path', type=click.Path(exists=True, dir_okay=False), help='venues .csv or .ndjson file')
+@click.option('--artists', 'artists_path', type=click.Path(exists=True, dir_okay=False), help='artists .csv or .ndjson file')
+@click.option('--shows', 'shows_path', type=click.Path(exists=True, dir_okay=False), help='shows .csv or .ndjson file')
+@click.option('--chunk-size', default=5000, show_default=True, help='rows per transaction')
+@click.option('--copy', 'use_copy', is_flag=True, help='write with PostgreSQL COPY instead of executemany')
+@click.option('--trusted', is_flag=True, help='restore a flask export dump without form validation')
+@with_appcontext
+def import_command(venues_path, artists_path, shows_path, chunk_size, use_copy, trusted):
+  """Bulk import venues, artists and shows from CSV or NDJSON files."""
+  from app import db, refresh_show_stats, Artist, Show, Venue
+  models = {'venues': Venue, 'artists': Artist, 'shows': Show}
+  if use_copy and db.engine.dialect.name != 'postgresql':
+    raise click.UsageError('--copy needs a PostgreSQL database')
+  started = time.perf_counter()
+  total = 0
+  # venues and artists first so the shows can resolve against them
+  for table_class, path in ((Venues, venues_path), (Artists, artists_path), (Shows, shows_path)):
+    if path:
+      stats = import_table(db, table_class(models, db), path, chunk_size, use_copy, trusted)
+      total += stats['read']
+  # the show counts are maintained by ORM events, which bulk writes skip
+  with db.engine.begin() as connection:
+    refresh_show_stats(connection, datetime.now())
+  elapsed = time.perf_counter() - started
+  click.echo('done: %d rows in %.1fs (%.0f rows/s)' % (total, elapsed, total / elapsed if elapsed else 0))
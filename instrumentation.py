@@ -0,0 +1,138 @@
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+# Counts the statements each request runs, their total time and the slowest
+# one, by listening to every SQLAlchemy engine. In debug mode the numbers go
+# out as X-DB-* response headers. Every request also feeds per-endpoint
+# histograms that /metrics serves in the Prometheus text format. Statements
+# slower than SLOW_QUERY_THRESHOLD_MS are logged in normalized form along
+# with the endpoint that ran them.
+
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_whitespace = re.compile(r'\s+')
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|\?|:\w+")
+_in_lists = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_sql(statement):
+  # collapse whitespace and replace literals and bind parameters with "?",
+  # so the same query always logs the same way whatever its arguments
+  statement = _whitespace.sub(' ', statement).strip()
+  statement = _literals.sub('?', statement)
+  return _in_lists.sub('(...)', statement)
+
+
+class Histogram(object):
+  def __init__(self, buckets):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0
+    self.count = 0
+
+  def observe(self, value):
+    self.counts[bisect_left(self.buckets, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def render(self, name, endpoint):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+      cumulative += count
+      lines.append('%s_bucket{endpoint="%s",le="%s"} %d' % (name, endpoint, bound, cumulative))
+    lines.append('%s_sum{endpoint="%s"} %s' % (name, endpoint, self.sum))
+    lines.append('%s_count{endpoint="%s"} %d' % (name, endpoint, self.count))
+    return lines
+
+
+class QueryMetricsState(object):
+  # an app's per-endpoint histograms, in app.extensions['query_metrics']
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.endpoints = {}
+
+
+class QueryMetrics(object):
+  # one instance serves every app it is initialised on; the engine listeners
+  # are shared and the histograms kept per app
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 100)
+    app.extensions['query_metrics'] = QueryMetricsState()
+    if not event.contains(Engine, 'before_cursor_execute', self.before_cursor_execute):
+      event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+      event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+    app.before_request(self.start_request)
+    app.after_request(self.finish_request)
+    app.add_url_rule('/metrics', 'metrics', self.metrics)
+
+  # Engine events
+  # see https://docs.sqlalchemy.org/en/14/faq/performance.html#query-profiling
+
+  def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+  def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    elapsed = (time.perf_counter() - conn.info['query_start_time'].pop()) * 1000
+    if not has_request_context() or 'db_stats' not in g:
+      return
+    stats = g.db_stats
+    stats['queries'] += 1
+    stats['time_ms'] += elapsed
+    if elapsed > stats['slowest_ms']:
+      stats['slowest_ms'] = elapsed
+    if elapsed >= current_app.config['SLOW_QUERY_THRESHOLD_MS']:
+      current_app.logger.warning('slow query (%.1f ms) in %s: %s',
+                                 elapsed, request.endpoint, normalize_sql(statement))
+
+  # Request hooks
+
+  def start_request(self):
+    g.db_stats = {'queries': 0, 'time_ms': 0.0, 'slowest_ms': 0.0,
+                  'started': time.perf_counter()}
+
+  def finish_request(self, response):
+    stats = g.pop('db_stats', None)
+    if stats is None or request.endpoint in (None, 'metrics', 'static'):
+      return response
+    elapsed = (time.perf_counter() - stats['started']) * 1000
+    state = current_app.extensions['query_metrics']
+    with state.lock:
+      histograms = state.endpoints.get(request.endpoint)
+      if histograms is None:
+        histograms = state.endpoints[request.endpoint] = (
+          Histogram(TIME_BUCKETS_MS), Histogram(QUERY_BUCKETS), Histogram(TIME_BUCKETS_MS))
+      histograms[0].observe(elapsed)
+      histograms[1].observe(stats['queries'])
+      histograms[2].observe(stats['time_ms'])
+    if current_app.debug:
+      response.headers['X-DB-Queries'] = str(stats['queries'])
+      response.headers['X-DB-Time-Ms'] = '%.2f' % stats['time_ms']
+      response.headers['X-DB-Slowest-Ms'] = '%.2f' % stats['slowest_ms']
+    return response
+
+  def metrics(self):
+    lines = []
+    names = ('fyyur_request_duration_ms', 'fyyur_request_queries', 'fyyur_request_db_time_ms')
+    state = current_app.extensions['query_metrics']
+    with state.lock:
+      for index, name in enumerate(names):
+        lines.append('# TYPE %s histogram' % name)
+        for endpoint, histograms in sorted(state.endpoints.items()):
+          lines.extend(histograms[index].render(name, endpoint))
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,231 @@
+#----------------------------------------------------------------------------#
+# Venue and artist matchmaking.
+#----------------------------------------------------------------------------#
+
+# Ranks the artists a venue could book, or the venues an artist could play,
+# by a weighted sum of MATCH_WEIGHTS components, each between 0 and 1:
+#
+#   genres    Jaccard overlap of the two genre lists
+#   location  1 in the same city and state, 0.5 in the same state
+#   seeking   the candidate is seeking a venue / seeking talent
+#   activity  the candidate's show count, log scaled against the busiest
+#   history   the two have shows together already
+#
+# Each side is held in memory as numpy arrays with an inverted index from
+# genre to array positions, so a lookup is a handful of array operations
+# over every candidate instead of a Python loop. Inserts, edits and deletes
+# made through the ORM mark their rows stale and only those rows are
+# reloaded at the next lookup. Each worker holds its own index; writes made
+# elsewhere (other workers, bulk imports) show up when it is rebuilt after
+# MATCH_INDEX_TTL seconds.
+
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+Match = namedtuple('Match', 'id name city state shared_genres score')
+
+
+def normalize(value):
+  return (value or '').strip().lower()
+
+
+def load_numpy():
+  # numpy is imported by the first index built rather than with this
+  # module, so workers that never serve a match page don't pay for it
+  import numpy
+  return numpy
+
+
+class CandidateIndex(object):
+  # every venue or every artist as parallel arrays, one position per row
+  def __init__(self):
+    self.np = np = load_numpy()
+    self.positions = {}
+    self.names = []
+    self.places = []
+    self.genres = []
+    self.ids = np.zeros(0, dtype=np.int64)
+    self.city = np.zeros(0, dtype=np.int32)
+    self.state = np.zeros(0, dtype=np.int32)
+    self.genre_count = np.zeros(0, dtype=np.float32)
+    self.seeking = np.zeros(0, dtype=np.float32)
+    self.shows = np.zeros(0, dtype=np.float32)
+    self.active = np.zeros(0, dtype=bool)
+    self.codes = {}
+    # genre -> set of positions, and the same as an array once asked for
+    self.by_genre = {}
+    self.genre_arrays = {}
+
+  def __len__(self):
+    return int(self.active.sum())
+
+  def code(self, value):
+    return self.codes.setdefault(normalize(value), len(self.codes))
+
+  def genre_positions(self, genre):
+    positions = self.genre_arrays.get(genre)
+    if positions is None:
+      positions = self.np.fromiter(self.by_genre.get(genre, ()), dtype=self.np.int64)
+      self.genre_arrays[genre] = positions
+    return positions
+
+  def update(self, rows, ids=None):
+    # Adds or replaces (id, name, city, state, genres, seeking, shows) rows.
+    # Any of `ids` without a row is removed.
+    rows = list(rows)
+    new = [row[0] for row in rows if row[0] not in self.positions]
+    if new:
+      self.grow(new)
+    for row in rows:
+      self.set(self.positions[row[0]], row)
+    for id in set(ids or ()) - set(row[0] for row in rows):
+      if id in self.positions:
+        position = self.positions[id]
+        self.set_genres(position, frozenset())
+        self.active[position] = False
+
+  def grow(self, ids):
+    np = self.np
+    start = len(self.ids)
+    for offset, id in enumerate(ids):
+      self.positions[id] = start + offset
+    self.names.extend([None] * len(ids))
+    self.places.extend([None] * len(ids))
+    self.genres.extend([frozenset()] * len(ids))
+    for name in ('ids', 'city', 'state', 'genre_count', 'seeking', 'shows', 'active'):
+      array = getattr(self, name)
+      setattr(self, name, np.concatenate([array, np.zeros(len(ids), dtype=array.dtype)]))
+    self.ids[start:] = ids
+
+  def set(self, position, row):
+    id, name, city, state, genres, seeking, shows = row
+    self.names[position] = name
+    self.places[position] = (city, state)
+    self.city[position] = self.code(city)
+    self.state[position] = self.code(state)
+    self.seeking[position] = 1.0 if seeking else 0.0
+    self.shows[position] = shows or 0
+    self.active[position] = True
+    self.set_genres(position, frozenset(normalize(genre) for genre in genres or () if normalize(genre)))
+
+  def set_genres(self, position, genres):
+    for genre in self.genres[position] ^ genres:
+      self.genre_arrays.pop(genre, None)
+    for genre in self.genres[position] - genres:
+      self.by_genre[genre].discard(position)
+    for genre in genres - self.genres[position]:
+      self.by_genre.setdefault(genre, set()).add(position)
+    self.genres[position] = genres
+    self.genre_count[position] = len(genres)
+
+  def score(self, genres, city, state, history, weights):
+    # the weighted score of every position; inactive positions get -inf
+    np = self.np
+    count = len(self.ids)
+    genres = set(normalize(genre) for genre in genres if normalize(genre))
+    overlap = np.zeros(count, dtype=np.float32)
+    for genre in genres:
+      overlap[self.genre_positions(genre)] += 1
+    union = len(genres) + self.genre_count - overlap
+    genre_score = np.divide(overlap, union, out=np.zeros(count, dtype=np.float32), where=union > 0)
+    same_state = self.state == self.codes.get(normalize(state), -1)
+    same_city = same_state & (self.city == self.codes.get(normalize(city), -1))
+    location = 0.5 * same_state + 0.5 * same_city
+    busiest = float(np.log1p(self.shows.max())) if count else 0.0
+    activity = np.log1p(self.shows) / busiest if busiest else np.zeros(count, dtype=np.float32)
+
+    score = weights['genres'] * genre_score \
+      + weights['location'] * location \
+      + weights['seeking'] * self.seeking \
+      + weights['activity'] * activity
+    played = [self.positions[id] for id in history if id in self.positions]
+    if played:
+      score[played] += weights['history']
+    score[~self.active] = -np.inf
+    return score
+
+  def top(self, score, limit):
+    # positions of the `limit` best positive scores, best first
+    np = self.np
+    limit = min(limit, int((score > 0).sum()))
+    if limit <= 0:
+      return []
+    best = np.argpartition(-score, limit - 1)[:limit]
+    return best[np.argsort(-score[best], kind='stable')]
+
+
+class MatchmakerState(object):
+  # an app's indexes and the rows changed since they were loaded, in
+  # app.extensions['matchmaker']
+  def __init__(self, ttl, weights):
+    self.indexes = {}
+    self.stale = {}
+    self.lock = threading.Lock()
+    self.ttl = ttl
+    self.weights = weights
+
+
+class Matchmaker(object):
+  # one instance serves every app it is initialised on, each with indexes of
+  # its own, looked up through current_app
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('MATCH_RESULTS', 20)
+    app.config.setdefault('MATCH_INDEX_TTL', 600)
+    app.config.setdefault('MATCH_WEIGHTS', {
+      'genres': 0.45, 'location': 0.25, 'seeking': 0.1, 'activity': 0.1, 'history': 0.1})
+    app.extensions['matchmaker'] = MatchmakerState(
+      app.config['MATCH_INDEX_TTL'], app.config['MATCH_WEIGHTS'])
+
+  @property
+  def state(self):
+    return current_app.extensions['matchmaker']
+
+  @property
+  def indexes(self):
+    return self.state.indexes
+
+  @property
+  def stale(self):
+    return self.state.stale
+
+  def touch(self, table, id):
+    # mark a venue or artist row as changed; it is reloaded on next use
+    state = self.state
+    with state.lock:
+      state.stale.setdefault(table, set()).add(id)
+
+  def index(self, state, table):
+    # the up to date index of 'venues' or 'artists'; the caller holds the lock
+    from app import candidate_rows
+    index, built = state.indexes.get(table, (None, 0))
+    if index is None or time.monotonic() - built > state.ttl:
+      state.stale.pop(table, None)
+      index = CandidateIndex()
+      index.update(candidate_rows(table))
+      state.indexes[table] = (index, time.monotonic())
+    elif state.stale.get(table):
+      ids = state.stale.pop(table)
+      index.update(candidate_rows(table, ids), ids)
+    return index
+
+  def matches(self, table, genres, city, state, history=(), limit=20):
+    # the best `limit` rows of `table` for an owner with these genres and
+    # location; `history` holds the ids of rows it has shows with
+    app_state = self.state
+    with app_state.lock:
+      index = self.index(app_state, table)
+      score = index.score(genres or [], city, state, history, app_state.weights)
+      wanted = dict((normalize(genre), genre) for genre in genres or [])
+      return [Match(
+          int(index.ids[position]), index.names[position],
+          index.places[position][0], index.places[position][1],
+          [wanted[genre] for genre in sorted(index.genres[position] & set(wanted))],
+          round(float(score[position]), 3))
+        for position in index.top(score, limit)]
@@ -0,0 +1,29 @@
+"""cascade show deletes
+
+Revision ID: 3d8f6a1c5e27
+Revises: 7c2b5e9d31f4
+Create Date: 2026-10-18 19:12:36.084455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8f6a1c5e27'
+down_revision = '7c2b5e9d31f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # deleting a venue or artist deletes its shows in the database
+    for column, table in (('venue_id', 'venues'), ('artist_id', 'artists')):
+        op.drop_constraint('shows_%s_fkey' % column, 'shows', type_='foreignkey')
+        op.create_foreign_key('shows_%s_fkey' % column, 'shows', table, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for column, table in (('venue_id', 'venues'), ('artist_id', 'artists')):
+        op.drop_constraint('shows_%s_fkey' % column, 'shows', type_='foreignkey')
+        op.create_foreign_key('shows_%s_fkey' % column, 'shows', table, [column], ['id'])
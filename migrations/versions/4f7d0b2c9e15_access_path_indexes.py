@@ -0,0 +1,33 @@
+"""access path indexes
+
+Revision ID: 4f7d0b2c9e15
+Revises: 9c3e2f1a7b64
+Create Date: 2026-10-18 10:03:51.640217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7d0b2c9e15'
+down_revision = '9c3e2f1a7b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # show listings filter on the owner and split/sort on start_time
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False)
+    # keyset pagination on /shows
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'], unique=False)
+    # /venues groups and pages areas in (state, city) order
+    op.create_index('ix_venues_state_city', 'venues', ['state', 'city'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venues_state_city', table_name='venues')
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
@@ -0,0 +1,26 @@
+"""show duration
+
+Revision ID: 7c2b5e9d31f4
+Revises: e5a9c1d74b08
+Create Date: 2026-10-18 17:41:19.553270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2b5e9d31f4'
+down_revision = 'e5a9c1d74b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing shows are taken to last two hours; a constant default is
+    # added without rewriting the partitions
+    op.add_column('shows', sa.Column('duration', sa.Integer(), server_default='120', nullable=False))
+
+
+def downgrade():
+    op.drop_column('shows', 'duration')
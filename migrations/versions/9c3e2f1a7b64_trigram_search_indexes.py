@@ -0,0 +1,36 @@
+"""trigram search indexes
+
+Revision ID: 9c3e2f1a7b64
+Revises: 5a1b4c8e38aa
+Create Date: 2026-10-18 09:12:04.118322
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e2f1a7b64'
+down_revision = '5a1b4c8e38aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GIN trigram indexes serve the case-insensitive substring search
+    # (ILIKE '%term%') on names and on the "City, ST" location expression.
+    # The location expression must match location_of() in app.py exactly.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venues', 'artists'):
+        op.execute(
+            'CREATE INDEX ix_{0}_name_trgm ON {0} '
+            'USING gin (name gin_trgm_ops)'.format(table))
+        op.execute(
+            'CREATE INDEX ix_{0}_location_trgm ON {0} '
+            "USING gin ((city || ', ' || state) gin_trgm_ops)".format(table))
+
+
+def downgrade():
+    for table in ('venues', 'artists'):
+        op.drop_index('ix_{0}_location_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{0}_name_trgm'.format(table), table_name=table)
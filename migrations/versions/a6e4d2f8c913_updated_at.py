@@ -0,0 +1,38 @@
+"""updated_at columns and deletions
+
+Revision ID: a6e4d2f8c913
+Revises: 3d8f6a1c5e27
+Create Date: 2026-10-18 19:53:08.271946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e4d2f8c913'
+down_revision = '3d8f6a1c5e27'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists', 'shows', 'venue_stats', 'artist_stats')
+
+
+def upgrade():
+    # now() is stable, so existing rows all get the time of the migration
+    # without the tables (or the shows partitions) being rewritten
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.create_index('ix_{0}_updated_at'.format(table), table, ['updated_at'], unique=False)
+    op.create_table('deletions',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('deletions')
+    for table in TABLES:
+        op.drop_index('ix_{0}_updated_at'.format(table), table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,57 @@
+"""venue and artist show stats
+
+Revision ID: b81d3e6f2a90
+Revises: 4f7d0b2c9e15
+Create Date: 2026-10-18 14:22:07.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81d3e6f2a90'
+down_revision = '4f7d0b2c9e15'
+branch_labels = None
+depends_on = None
+
+# counts as of now, the same numbers `flask stats refresh` writes
+POPULATE = """
+INSERT INTO {table} ({key}, upcoming_shows, past_shows, next_show_time)
+SELECT {owners}.id,
+       COALESCE(SUM(CASE WHEN shows.start_time > LOCALTIMESTAMP THEN 1 ELSE 0 END), 0),
+       COALESCE(SUM(CASE WHEN shows.start_time <= LOCALTIMESTAMP THEN 1 ELSE 0 END), 0),
+       MIN(CASE WHEN shows.start_time > LOCALTIMESTAMP THEN shows.start_time END)
+FROM {owners} LEFT OUTER JOIN shows ON shows.{key} = {owners}.id
+GROUP BY {owners}.id
+"""
+
+
+def upgrade():
+    op.create_table('venue_stats',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('upcoming_shows', sa.Integer(), nullable=False),
+    sa.Column('past_shows', sa.Integer(), nullable=False),
+    sa.Column('next_show_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id')
+    )
+    op.create_index(op.f('ix_venue_stats_next_show_time'), 'venue_stats', ['next_show_time'], unique=False)
+    op.create_table('artist_stats',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('upcoming_shows', sa.Integer(), nullable=False),
+    sa.Column('past_shows', sa.Integer(), nullable=False),
+    sa.Column('next_show_time', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id')
+    )
+    op.create_index(op.f('ix_artist_stats_next_show_time'), 'artist_stats', ['next_show_time'], unique=False)
+    op.execute(POPULATE.format(table='venue_stats', key='venue_id', owners='venues'))
+    op.execute(POPULATE.format(table='artist_stats', key='artist_id', owners='artists'))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_artist_stats_next_show_time'), table_name='artist_stats')
+    op.drop_table('artist_stats')
+    op.drop_index(op.f('ix_venue_stats_next_show_time'), table_name='venue_stats')
+    op.drop_table('venue_stats')
@@ -0,0 +1,30 @@
+"""venue area index
+
+Revision ID: c47e1b9a2d63
+Revises: a6e4d2f8c913
+Create Date: 2026-10-18 20:31:47.205918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e1b9a2d63'
+down_revision = 'a6e4d2f8c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /venues lists venues without a city or state under an empty area, so
+    # it groups and pages on coalesce(..., ''); the expressions must match
+    # area_of() in app.py exactly
+    op.drop_index('ix_venues_state_city', table_name='venues')
+    op.create_index('ix_venues_state_city', 'venues',
+                    [sa.text("coalesce(state, '')"), sa.text("coalesce(city, '')")], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venues_state_city', table_name='venues')
+    op.create_index('ix_venues_state_city', 'venues', ['state', 'city'], unique=False)
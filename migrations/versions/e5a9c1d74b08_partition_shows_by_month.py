@@ -0,0 +1,86 @@
+"""partition shows by month
+
+Revision ID: e5a9c1d74b08
+Revises: b81d3e6f2a90
+Create Date: 2026-10-18 16:05:44.902113
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c1d74b08'
+down_revision = 'b81d3e6f2a90'
+branch_labels = None
+depends_on = None
+
+# months of partitions created past the current one; `flask partitions
+# create` keeps the horizon moving after this
+MONTHS_AHEAD = 12
+
+INDEXES = (
+    ('ix_shows_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_shows_start_time_id', ['start_time', 'id']),
+)
+
+
+def add_months(month, count):
+    months = month.year * 12 + month.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def create_shows_table(name, partitioned):
+    # the shows columns; a partitioned table's primary key has to include
+    # the partition key
+    op.execute(
+        'CREATE TABLE {0} ('
+        "id integer NOT NULL DEFAULT nextval('shows_id_seq'::regclass), "
+        'venue_id integer NOT NULL, '
+        'artist_id integer NOT NULL, '
+        'start_time timestamp without time zone NOT NULL, '
+        'CONSTRAINT shows_venue_id_fkey FOREIGN KEY (venue_id) REFERENCES venues (id), '
+        'CONSTRAINT shows_artist_id_fkey FOREIGN KEY (artist_id) REFERENCES artists (id), '
+        'CONSTRAINT {0}_pkey PRIMARY KEY ({1})){2}'.format(
+            name, 'id, start_time' if partitioned else 'id',
+            ' PARTITION BY RANGE (start_time)' if partitioned else ''))
+
+
+def replace_shows_table(name):
+    # move the rows into `name`, then swap it in under the shows name
+    op.execute('INSERT INTO {0} (id, venue_id, artist_id, start_time) '
+               'SELECT id, venue_id, artist_id, start_time FROM shows'.format(name))
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY {0}.id'.format(name))
+    op.drop_table('shows')
+    op.rename_table(name, 'shows')
+    op.execute('ALTER TABLE shows RENAME CONSTRAINT {0}_pkey TO shows_pkey'.format(name))
+    for index, columns in INDEXES:
+        op.create_index(index, 'shows', columns, unique=False)
+
+
+def upgrade():
+    # One partition per calendar month of start_time, named shows_pYYYY_MM,
+    # from the month of the oldest show to MONTHS_AHEAD months from now.
+    # shows_default catches anything past the last month until `flask
+    # partitions create` moves it into its own partition.
+    create_shows_table('shows_partitioned', partitioned=True)
+    op.execute('CREATE TABLE shows_default PARTITION OF shows_partitioned DEFAULT')
+    this_month = date.today().replace(day=1)
+    oldest = op.get_bind().execute(sa.text('SELECT min(start_time) FROM shows')).scalar()
+    month = oldest.date().replace(day=1) if oldest else this_month
+    while month <= add_months(this_month, MONTHS_AHEAD):
+        op.execute(
+            "CREATE TABLE shows_p{0:%Y_%m} PARTITION OF shows_partitioned "
+            "FOR VALUES FROM ('{0}') TO ('{1}')".format(month, add_months(month, 1)))
+        month = add_months(month, 1)
+    replace_shows_table('shows_partitioned')
+
+
+def downgrade():
+    # archived partitions detached by `flask partitions archive` are not
+    # brought back
+    create_shows_table('shows_unpartitioned', partitioned=False)
+    replace_shows_table('shows_unpartitioned')
@@ -0,0 +1,135 @@
+#----------------------------------------------------------------------------#
+# Shows partitions.
+#----------------------------------------------------------------------------#
+
+# On PostgreSQL the shows table is range partitioned by calendar month of
+# start_time, one table per month named shows_pYYYY_MM, plus shows_default
+# for shows booked beyond the last month. Two commands maintain them:
+#
+#   flask partitions create --ahead 12 [--from 2023-06]
+#     makes sure the next 12 months, and every month since June 2023 when
+#     --from is given, have partitions, moving any of their shows out of
+#     shows_default. Run it on a schedule, e.g. daily from cron; --from is
+#     for past months, e.g. after importing old shows.
+#
+#   flask partitions archive --before 2024-01 [--drop]
+#     detaches the partitions of every month before January 2024 and moves
+#     them to the archive schema (or drops them). Archived shows no longer
+#     appear in the show counts, nor on pages rendered afterwards. Pages in
+#     a shared (redis) page cache are cleared; a worker's local cache can't
+#     be reached from here, and keeps its pages until PAGE_CACHE_TTL runs
+#     out.
+#
+# see https://www.postgresql.org/docs/current/ddl-partitioning.html
+
+import re
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+PARTITION_NAME = re.compile(r'^shows_p(\d{4})_(\d{2})$')
+ARCHIVE_SCHEMA = 'archive'
+
+
+def add_months(month, count):
+  months = month.year * 12 + month.month - 1 + count
+  return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month):
+  return 'shows_p%s' % month.strftime('%Y_%m')
+
+
+def partitions(connection):
+  # {first day of month: partition name} for the monthly partitions of shows
+  names = connection.execute(text(
+    'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+    "WHERE i.inhparent = 'shows'::regclass")).scalars()
+  months = {}
+  for name in names:
+    match = PARTITION_NAME.match(name)
+    if match:
+      months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+  return months
+
+
+def create_partition(connection, month):
+  # Creates the month's table, moves its shows out of shows_default and
+  # attaches it. Attaching checks shows_default for rows of that month, so
+  # they have to be gone first.
+  name = partition_name(month)
+  bounds = {'lower': month, 'upper': add_months(month, 1)}
+  connection.execute(text('CREATE TABLE %s (LIKE shows INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % name))
+  moved = connection.execute(text(
+    'WITH moved AS (DELETE FROM shows_default '
+    'WHERE start_time >= :lower AND start_time < :upper RETURNING *) '
+    'INSERT INTO %s SELECT * FROM moved' % name), bounds).rowcount
+  connection.execute(text(
+    "ALTER TABLE shows ATTACH PARTITION %s FOR VALUES FROM ('%s') TO ('%s')"
+    % (name, bounds['lower'], bounds['upper'])))
+  return name, moved
+
+
+def require_postgresql(db):
+  if db.engine.dialect.name != 'postgresql':
+    raise click.UsageError('shows is only partitioned on PostgreSQL')
+
+
+@click.group('partitions')
+def partitions_command():
+  """Create and archive the monthly partitions of shows."""
+
+
+@partitions_command.command('create')
+@click.option('--ahead', default=12, show_default=True, help='months after the current one')
+@click.option('--from', 'first_month', type=click.DateTime(['%Y-%m']),
+              help='first month to create, as YYYY-MM; defaults to the current one')
+@with_appcontext
+def create_command(ahead, first_month):
+  """Create the partitions of the coming months, and of past ones with --from."""
+  from app import db
+  require_postgresql(db)
+  this_month = date.today().replace(day=1)
+  first_month = min(first_month.date(), this_month) if first_month else this_month
+  behind = (this_month.year - first_month.year) * 12 + this_month.month - first_month.month
+  with db.engine.connect() as connection:
+    existing = partitions(connection)
+    for offset in range(-behind, ahead + 1):
+      month = add_months(this_month, offset)
+      if month in existing:
+        continue
+      # one transaction per month keeps the lock on shows_default short
+      with connection.begin():
+        name, moved = create_partition(connection, month)
+      click.echo('created %s (%d shows moved from shows_default)' % (name, moved))
+
+
+@partitions_command.command('archive')
+@click.option('--before', required=True, type=click.DateTime(['%Y-%m']), help='first month to keep, as YYYY-MM')
+@click.option('--drop', is_flag=True, help='drop the partitions instead of moving them to the archive schema')
+@with_appcontext
+def archive_command(before, drop):
+  """Detach the partitions of every month before --before."""
+  from app import db, page_cache, refresh_show_stats
+  require_postgresql(db)
+  before = before.date()
+  if before > date.today().replace(day=1):
+    raise click.BadParameter('only months that are over can be archived', param_hint='--before')
+  with db.engine.begin() as connection:
+    old = [(month, name) for month, name in sorted(partitions(connection).items()) if month < before]
+    if not drop:
+      connection.execute(text('CREATE SCHEMA IF NOT EXISTS %s' % ARCHIVE_SCHEMA))
+    for month, name in old:
+      connection.execute(text('ALTER TABLE shows DETACH PARTITION %s' % name))
+      if drop:
+        connection.execute(text('DROP TABLE %s' % name))
+      else:
+        connection.execute(text('ALTER TABLE %s SET SCHEMA %s' % (name, ARCHIVE_SCHEMA)))
+      click.echo('%s %s' % ('dropped' if drop else 'archived', name))
+    # the archived shows leave the past counts
+    if old:
+      refresh_show_stats(connection, datetime.now())
+  if old and page_cache.shared:
+    page_cache.clear()
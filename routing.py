@@ -0,0 +1,74 @@
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#----------------------------------------------------------------------------#
+
+# Sends the reads of GET and HEAD requests to one of the replica binds named
+# in SQLALCHEMY_REPLICA_BINDS. Everything else goes to the primary: flushes,
+# other request methods, and work done outside a request (CLI commands,
+# migrations). Each request picks one replica and sticks to it.
+#
+# Read-your-writes: a request that flushes changes, or runs an INSERT,
+# UPDATE or DELETE through the session (query.delete(), bulk updates),
+# marks the client's session, and that client's reads go to the primary for the next
+# READ_YOUR_WRITES_SECONDS. That covers the redirect after a form submit
+# and replica lag.
+#
+# see https://techspot.zzzeek.org/2012/01/11/django-style-database-routers-in-sqlalchemy/
+
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(SignallingSession):
+  def get_bind(self, mapper=None, clause=None):
+    replica = None if self._flushing else current_replica(self.app)
+    if replica is None:
+      return SignallingSession.get_bind(self, mapper, clause)
+    return get_state(self.app).db.get_engine(self.app, bind=replica)
+
+
+def current_replica(app):
+  # the replica bind this request reads from, or None for the primary
+  replicas = app.config['SQLALCHEMY_REPLICA_BINDS']
+  if not replicas or not has_request_context() or request.method not in READ_METHODS:
+    return None
+  if 'db_replica' not in g:
+    primary_until = session.get('db_primary_until', 0)
+    g.db_replica = None if primary_until > time.time() else random.choice(replicas)
+  return g.db_replica
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+  def init_app(self, app):
+    app.config.setdefault('SQLALCHEMY_REPLICA_BINDS', [])
+    app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+    SQLAlchemy.init_app(self, app)
+
+    @app.after_request
+    def stick_to_primary(response):
+      if g.pop('db_wrote', False):
+        session['db_primary_until'] = time.time() + app.config['READ_YOUR_WRITES_SECONDS']
+      return response
+
+  def create_session(self, options):
+    factory = orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    @event.listens_for(factory, 'after_flush')
+    def remember_write(session, flush_context):
+      if has_request_context():
+        g.db_wrote = True
+
+    # bulk statements write without flushing
+    @event.listens_for(factory, 'do_orm_execute')
+    def remember_bulk_write(orm_execute_state):
+      if has_request_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                                    or orm_execute_state.is_delete):
+        g.db_wrote = True
+
+    return factory
@@ -0,0 +1,101 @@
+#----------------------------------------------------------------------------#
+# Show controllers.
+#----------------------------------------------------------------------------#
+
+# Registered by create_app() in app.py; forms are imported like in venues.py.
+
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, flash, render_template, request, url_for
+
+from app import (
+  db, page_cache, artist_page_key, book_show, conflict_message, is_current, not_modified,
+  page_validators, parse_datetime_arg, shows_page_query, shows_version_query, venue_page_key,
+  with_validators,
+)
+
+bp = Blueprint('shows', __name__)
+
+
+@bp.route('/shows')
+def shows():
+  # displays list of shows at /shows, one page at a time.
+  validators = page_validators(db.session.execute(shows_version_query(datetime.now())).scalar())
+  if is_current(validators):
+    return not_modified(validators)
+  query, per_page, upcoming_only = shows_page_request()
+  return with_validators(render_shows(query.all(), per_page, upcoming_only), validators)
+
+def shows_page_request():
+  # Pages are keyset paginated on (start_time, id): the next page starts
+  # strictly after the last row of this one, so every page costs the same
+  # index range scan however deep into the table it is. One row more than
+  # a page is fetched to tell whether there is a next page.
+  try:
+    since = parse_datetime_arg('since')
+    until = parse_datetime_arg('until')
+    after = parse_datetime_arg('after')
+    after_id = request.args.get('after_id', type=int)
+  except ValueError:
+    abort(400)
+  upcoming_only = request.args.get('upcoming') == '1'
+  if upcoming_only:
+    now = datetime.now()
+    since = max(since, now) if since else now
+
+  per_page = current_app.config['SHOWS_PER_PAGE']
+  cursor = (after, after_id) if after and after_id is not None else None
+  return shows_page_query(cursor, since, until).limit(per_page + 1), per_page, upcoming_only
+
+def render_shows(data, per_page, upcoming_only):
+  next_url = None
+  if len(data) > per_page:
+    data = data[:per_page]
+    last = data[-1]
+    next_url = url_for('shows.shows', after=last.start_time.isoformat(), after_id=last.id,
+                       upcoming=request.args.get('upcoming'),
+                       since=request.args.get('since'), until=request.args.get('until'))
+
+  return render_template('pages/shows.html', shows=data, next_url=next_url,
+                         upcoming_only=upcoming_only)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+  from forms import ShowForm
+  form = ShowForm(request.form)
+  if not form.validate():
+    flash('Show could not be listed: please correct the errors below.')
+    return render_template('forms/new_show.html', form=form), 400
+  try:
+    artist_id = int(form.artist_id.data)
+    venue_id = int(form.venue_id.data)
+    start_time = form.start_time.data
+    duration = form.duration.data
+
+    show, conflicts = book_show(venue_id, artist_id, start_time, duration)
+    if conflicts:
+      db.session.rollback()
+      form.start_time.errors = [conflict_message(conflict, venue_id) for conflict in conflicts]
+      flash('Show could not be listed: the venue or the artist is already booked at that time.')
+      return render_template('forms/new_show.html', form=form), 409
+    db.session.commit()
+    page_cache.invalidate(venue_page_key(show.venue_id), artist_page_key(show.artist_id))
+    # on successful db insert, flash success
+    flash('Show was successfully listed!')
+  except:
+    db.session.rollback()
+    # TODO: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Show could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
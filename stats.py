@@ -0,0 +1,43 @@
+#----------------------------------------------------------------------------#
+# Show statistics.
+#----------------------------------------------------------------------------#
+
+# The venue_stats and artist_stats rows are updated as shows are created and
+# deleted through the ORM. Time moves shows from upcoming to past on its own,
+# so `flask stats roll` should run on a schedule to recount the rows whose
+# next show has started, e.g. from cron:
+#
+#   */5 * * * * cd /srv/fyyur && flask stats roll
+#
+# `flask stats refresh` rebuilds every row from shows; `flask import` runs
+# it after loading, since its bulk inserts bypass the ORM.
+
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.group('stats')
+def stats_command():
+  """Maintain the per-venue and per-artist show counts."""
+
+
+@stats_command.command('roll')
+@with_appcontext
+def roll_command():
+  """Recount the stats of venues and artists whose next show has started."""
+  from app import db, roll_show_stats
+  with db.engine.begin() as connection:
+    rolled = roll_show_stats(connection, datetime.now())
+  click.echo('rolled %d rows' % rolled)
+
+
+@stats_command.command('refresh')
+@with_appcontext
+def refresh_command():
+  """Rebuild the stats of every venue and artist from shows."""
+  from app import db, refresh_show_stats
+  with db.engine.begin() as connection:
+    refreshed = refresh_show_stats(connection, datetime.now())
+  click.echo('refreshed %d rows' % refreshed)
@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# Template caches.
+#----------------------------------------------------------------------------#
+
+# Compiled templates are written to TEMPLATE_BYTECODE_CACHE_DIR, so a new
+# worker loads them instead of parsing and compiling every template again.
+# Entries are keyed by template name and source checksum; an edited template
+# is recompiled on its next load. `flask templates compile` fills the cache
+# ahead of a deploy.
+#
+# The {% cache %} tag keeps a rendered fragment for FRAGMENT_CACHE_TTL
+# seconds under the values it is given:
+#
+#   {% cache 'artist-tile', artist.id, artist.name %} ... {% endcache %}
+#
+# The values make up the whole key, so next to the id they have to cover
+# everything the fragment shows that can change. Like the local page cache,
+# each worker holds its own fragments.
+#
+# see https://jinja.palletsprojects.com/en/3.1.x/api/#bytecode-cache
+# see https://jinja.palletsprojects.com/en/3.1.x/extensions/#example-extensions
+
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import LocalCache
+
+
+class FragmentCacheExtension(Extension):
+  tags = {'cache'}
+
+  def __init__(self, environment):
+    super(FragmentCacheExtension, self).__init__(environment)
+    environment.extend(fragment_cache=None, fragment_cache_ttl=0)
+
+  def parse(self, parser):
+    lineno = next(parser.stream).lineno
+    key = [parser.parse_expression()]
+    while parser.stream.skip_if('comma'):
+      key.append(parser.parse_expression())
+    body = parser.parse_statements(['name:endcache'], drop_needle=True)
+    return nodes.CallBlock(
+      self.call_method('_render', [nodes.Tuple(key, 'load')]), [], [], body).set_lineno(lineno)
+
+  def _render(self, key, caller):
+    cache = self.environment.fragment_cache
+    if cache is None:
+      return caller()
+    fragment = cache.get(key)
+    if fragment is None:
+      fragment = caller()
+      cache.set(key, fragment, self.environment.fragment_cache_ttl)
+    return Markup(fragment)
+
+
+class TemplateCaches(object):
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('TEMPLATE_BYTECODE_CACHE_DIR', None)
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', 10000)
+    app.config.setdefault('FRAGMENT_CACHE_TTL', 3600)
+    directory = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+      app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config['FRAGMENT_CACHE_SIZE'] and app.config['FRAGMENT_CACHE_TTL'] > 0:
+      app.jinja_env.fragment_cache = LocalCache(app.config['FRAGMENT_CACHE_SIZE'])
+      app.jinja_env.fragment_cache_ttl = app.config['FRAGMENT_CACHE_TTL']
+
+
+@click.group('templates')
+def templates_command():
+  """Manage the compiled template cache."""
+
+
+@templates_command.command('compile')
+@with_appcontext
+def compile_command():
+  """Compile every template into the bytecode cache."""
+  environment = current_app.jinja_env
+  if environment.bytecode_cache is None:
+    raise click.UsageError('TEMPLATE_BYTECODE_CACHE_DIR is not set')
+  names = environment.list_templates()
+  for name in names:
+    environment.get_template(name)
+  click.echo('compiled %d templates' % len(names))
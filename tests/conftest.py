@@ -0,0 +1,132 @@
+#----------------------------------------------------------------------------#
+# Test fixtures.
+#----------------------------------------------------------------------------#
+
+# The tests run against PostgreSQL, like the app: the models use ARRAY
+# columns and several tests read the planner's choices. They use the
+# database named by TEST_DATABASE_URL, whose tables they drop and recreate,
+# and are skipped when it is not set:
+#
+#   createdb fyyur_test
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test python -m pytest tests
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+def make_app(**overrides):
+  # an app on the test database, with config.py's settings otherwise
+  import config
+  from app import create_app
+  settings = dict((name, getattr(config, name)) for name in dir(config) if name.isupper())
+  settings.update(
+    SQLALCHEMY_DATABASE_URI=TEST_DATABASE_URL,
+    SQLALCHEMY_BINDS={},
+    SQLALCHEMY_REPLICA_URIS=[],
+    SQLALCHEMY_REPLICA_BINDS=[],
+    TESTING=True,
+    WTF_CSRF_ENABLED=False,
+    TEMPLATE_BYTECODE_CACHE_DIR=None,
+    ASSETS_BUILD_DIR=None,
+  )
+  settings.update(overrides)
+  return create_app(type('TestConfig', (object,), settings))
+
+
+@pytest.fixture(scope='session')
+def app():
+  if not TEST_DATABASE_URL:
+    pytest.skip('TEST_DATABASE_URL is not set')
+  from app import db
+  app = make_app()
+  with app.app_context():
+    db.drop_all()
+    db.create_all()
+  return app
+
+
+def empty_tables(app):
+  from app import db
+  with app.app_context():
+    tables = ', '.join(table.name for table in db.metadata.sorted_tables)
+    db.session.execute(db.text('TRUNCATE %s RESTART IDENTITY CASCADE' % tables))
+    db.session.commit()
+    db.session.remove()
+
+
+@pytest.fixture(autouse=True)
+def clean(request):
+  # every test starts from empty tables and caches, except the ones reading
+  # the module-wide `seeded` data
+  if 'app' not in request.fixturenames:
+    yield
+    return
+  app = request.getfixturevalue('app')
+  from app import db, matchmaker, page_cache
+  if 'seeded' not in request.fixturenames:
+    empty_tables(app)
+  with app.app_context():
+    page_cache.clear()
+    matchmaker.indexes.clear()
+    matchmaker.stale.clear()
+    if app.jinja_env.fragment_cache is not None:
+      app.jinja_env.fragment_cache.clear()
+    yield
+    db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+
+class StatementCounter(object):
+  # statements run on an engine while counting
+  def __init__(self, engine):
+    self.engine = engine
+    self.statements = []
+
+  def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+    self.statements.append(statement)
+
+  def __enter__(self):
+    event.listen(self.engine, 'before_cursor_execute', self.on_execute)
+    return self
+
+  def __exit__(self, *exc_info):
+    event.remove(self.engine, 'before_cursor_execute', self.on_execute)
+
+
+def add_venue(name='The Musical Hop', city='San Francisco', state='CA', **values):
+  from app import db, Venue
+  venue = Venue(name=name, city=city, state=state, address='1015 Folsom Street',
+                genres=['Jazz', 'Reggae'], **values)
+  db.session.add(venue)
+  db.session.commit()
+  return venue.id
+
+
+def add_artist(name='Guns N Petals', city='San Francisco', state='CA', **values):
+  from app import db, Artist
+  artist = Artist(name=name, city=city, state=state, genres='{Rock n Roll}', **values)
+  db.session.add(artist)
+  db.session.commit()
+  return artist.id
+
+
+def add_shows(venue_id, artist_id, count, start=None, step=timedelta(days=1), duration=120):
+  # `count` shows through the ORM, so the stats rows are kept, `step` apart
+  from app import db, Show
+  start = start or datetime.now() - step * (count // 2)
+  for n in range(count):
+    db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start + step * n,
+                        duration=duration))
+  db.session.commit()
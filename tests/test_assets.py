@@ -0,0 +1,11 @@
+from assets import minify_css
+
+
+def test_minify_css_drops_comments_and_whitespace():
+  assert minify_css('/* nav */\na  >  b {\n  color : red ;\n}\n') == 'a>b{color :red}'
+
+
+def test_minify_css_keeps_license_banners_and_strings():
+  banner = "/*! Bootstrap v3.4.1 | it's  MIT ; see LICENSE */"
+  source = banner + '\n/* gone */ a:after { content: "/* kept */" ; }'
+  assert minify_css(source) == banner + ' a:after{content:"/* kept */"}'
@@ -0,0 +1,104 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import add_artist, add_shows, add_venue
+
+START = datetime(2030, 6, 1, 20, 0)
+
+
+def submit(client, venue_id, artist_id, start_time, duration=120):
+  return client.post('/shows/create', data={
+    'venue_id': venue_id, 'artist_id': artist_id,
+    'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'), 'duration': duration})
+
+
+def show_count():
+  from app import Show
+  return Show.query.count()
+
+
+@pytest.mark.parametrize('start', [START, START + timedelta(minutes=60), START - timedelta(minutes=60)])
+def test_overlapping_show_is_refused(app, client, start):
+  venue_id, artist_id = add_venue(), add_artist()
+  other_artist_id = add_artist(name='Matt Quevedo')
+  add_shows(venue_id, artist_id, 1, start=START)
+  assert submit(client, venue_id, other_artist_id, start).status_code == 409
+  assert show_count() == 1
+
+
+def test_artist_cannot_play_two_venues_at_once(app, client):
+  venue_id, artist_id = add_venue(), add_artist()
+  other_venue_id = add_venue(name='The Dueling Pianos Bar')
+  add_shows(venue_id, artist_id, 1, start=START)
+  assert submit(client, other_venue_id, artist_id, START + timedelta(minutes=30)).status_code == 409
+  assert show_count() == 1
+
+
+@pytest.mark.parametrize('start', [START + timedelta(minutes=120), START - timedelta(minutes=90)])
+def test_adjacent_show_is_booked(app, client, start):
+  # the existing show runs 20:00 to 22:00; the new one ends or starts at
+  # its edge
+  venue_id, artist_id = add_venue(), add_artist()
+  add_shows(venue_id, artist_id, 1, start=START)
+  assert submit(client, venue_id, artist_id, start, duration=90).status_code == 200
+  assert show_count() == 2
+
+
+@pytest.mark.parametrize('duration', [0, -60, 721, 100000, 'long'])
+def test_invalid_duration_is_refused(app, client, duration):
+  venue_id, artist_id = add_venue(), add_artist()
+  assert submit(client, venue_id, artist_id, START, duration).status_code == 400
+  assert show_count() == 0
+
+
+@pytest.mark.parametrize('duration', [0, -60, 721])
+def test_book_show_refuses_invalid_duration(app, duration):
+  from app import book_show
+  venue_id, artist_id = add_venue(), add_artist()
+  with pytest.raises(ValueError):
+    book_show(venue_id, artist_id, START, duration)
+
+
+def test_concurrent_bookings_of_one_slot(app):
+  # Each booking holds its locks for a while before committing; without
+  # them both would pass the conflict check before either commits.
+  from app import db, book_show
+  venue_id = add_venue()
+  artist_ids = [add_artist(name='Artist %d' % n) for n in range(4)]
+  db.session.remove()
+  ready = threading.Barrier(len(artist_ids))
+  booked = []
+
+  def book(artist_id):
+    with app.app_context():
+      ready.wait()
+      try:
+        show, conflicts = book_show(venue_id, artist_id, START, 120)
+        time.sleep(0.2)
+        db.session.commit()
+        booked.append(show is not None)
+      finally:
+        db.session.remove()
+
+  threads = [threading.Thread(target=book, args=(artist_id,)) for artist_id in artist_ids]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert sorted(booked) == [False] * (len(artist_ids) - 1) + [True]
+  assert show_count() == 1
+
+
+@pytest.mark.parametrize('trusted', [False, True])
+def test_import_refuses_invalid_duration(app, tmp_path, trusted):
+  from test_importer import import_shows
+  venue_id, artist_id = add_venue(), add_artist()
+  stats = import_shows(tmp_path, [
+    {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2030-06-01T20:00:00', 'duration': 0},
+    {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2030-06-02T20:00:00', 'duration': 1440},
+    {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2030-06-03T20:00:00', 'duration': 90},
+  ], use_copy=False, trusted=trusted)
+  assert (stats['invalid'], stats['inserted']) == (2, 1)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from conftest import add_artist, add_venue
+
+
+def venue_ids():
+  from app import Venue
+  return {id for id, in Venue.query.with_entities(Venue.id)}
+
+
+@pytest.fixture
+def venues(app):
+  return [add_venue(name='Venue %d' % n) for n in range(3)]
+
+
+def test_deletes_the_listed_venues(client, venues):
+  response = client.post('/venues/delete', json={'ids': venues[:2]})
+  assert response.status_code == 200 and response.get_json() == {'deleted': 2}
+  assert venue_ids() == {venues[2]}
+
+
+def test_deletes_form_ids(client, venues):
+  assert client.post('/venues/delete', data={'ids': [str(venues[0])]}).status_code == 200
+  assert venue_ids() == set(venues[1:])
+
+
+@pytest.mark.parametrize('payload', [
+  {'ids': '123'},
+  {'ids': 1},
+  {'ids': [True]},
+  {'ids': ['1']},
+  {'ids': [1.5]},
+  {'ids': []},
+  {},
+  [1, 2],
+  'x',
+  None,
+])
+def test_refuses_malformed_ids(client, venues, payload):
+  response = client.post('/venues/delete', data=json.dumps(payload), content_type='application/json')
+  assert response.status_code == 400
+  assert venue_ids() == set(venues)
+
+
+def test_refuses_more_ids_than_the_limit(app, client, venues):
+  ids = list(range(1, app.config['BULK_DELETE_LIMIT'] + 2))
+  assert client.post('/venues/delete', json={'ids': ids}).status_code == 400
+  assert venue_ids() == set(venues)
+
+
+def test_artists_refuse_a_string_of_ids(app, client):
+  artist_id = add_artist()
+  assert client.post('/artists/delete', json={'ids': str(artist_id)}).status_code == 400
@@ -0,0 +1,21 @@
+from conftest import add_venue, make_app
+
+
+def test_a_second_app_leaves_the_first_alone(app, client):
+  # the extensions are module-level instances initialised on every app
+  from app import db, page_cache, venue_page_key
+  other = make_app(PAGE_CACHE_BACKEND=None, COMPRESSION_ENCODINGS=[])
+  venue_id = add_venue()
+  response = client.get('/venues/%d' % venue_id, headers={'Accept-Encoding': 'gzip'})
+  assert response.content_encoding == 'gzip'
+  assert page_cache.backend.get(venue_page_key(venue_id)) is not None
+
+  db.session.remove()
+  with other.app_context():
+    other_client = other.test_client()
+    response = other_client.get('/venues/%d' % venue_id, headers={'Accept-Encoding': 'gzip'})
+    assert response.content_encoding is None
+    assert page_cache.backend is None
+    # its own histograms, holding only its own request
+    metrics = other_client.get('/metrics').get_data(as_text=True)
+    assert 'fyyur_request_queries_count{endpoint="venues.show_venue"} 1\n' in metrics
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import add_artist, add_venue
+
+UPDATED_AT = datetime(2020, 1, 2, 3, 4, 5)
+
+
+def import_shows(tmp_path, rows, use_copy, trusted):
+  from app import db, Artist, Show, Venue
+  from importer import Shows, import_table
+  path = tmp_path / 'shows.ndjson'
+  path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+  models = {'venues': Venue, 'artists': Artist, 'shows': Show}
+  return import_table(db, Shows(models, db), str(path), 100, use_copy, trusted, report=lambda line: None)
+
+
+@pytest.mark.parametrize('use_copy', [False, True])
+def test_trusted_restore_keeps_updated_at(app, tmp_path, use_copy):
+  from app import Show
+  venue_id, artist_id = add_venue(), add_artist()
+  import_shows(tmp_path, [{
+    'id': 7, 'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2021-05-01T20:00:00',
+    'duration': 90, 'updated_at': UPDATED_AT.isoformat(),
+  }], use_copy, trusted=True)
+  show = Show.query.get(7)
+  assert (show.duration, show.updated_at) == (90, UPDATED_AT)
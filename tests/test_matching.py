@@ -0,0 +1,48 @@
+from conftest import add_artist, add_venue
+
+
+def stale_venues():
+  from app import matchmaker
+  return matchmaker.stale.get('venues', set())
+
+
+def test_changes_reach_the_match_index_on_commit(app):
+  from app import db, Venue
+  venue_id = add_venue()
+  assert stale_venues() == {venue_id}
+  stale_venues().clear()
+  Venue.query.get(venue_id).name = 'The Musical Hop II'
+  db.session.flush()
+  # a lookup now would reload the row as committed, without the new name
+  assert stale_venues() == set()
+  db.session.commit()
+  assert stale_venues() == {venue_id}
+
+
+def test_rolled_back_changes_leave_the_match_index_alone(app):
+  from app import db, Venue
+  venue_id = add_venue()
+  stale_venues().clear()
+  Venue.query.get(venue_id).name = 'The Musical Hop II'
+  db.session.flush()
+  db.session.rollback()
+  db.session.commit()
+  assert stale_venues() == set()
+
+
+def test_bulk_deletes_reach_the_match_index_on_commit(app):
+  from app import db, Venue, delete_owners
+  venue_id = add_venue()
+  stale_venues().clear()
+  delete_owners(Venue, [venue_id])
+  assert stale_venues() == set()
+  db.session.commit()
+  assert stale_venues() == {venue_id}
+
+
+def test_match_page_lists_artists_added_after_the_index_was_built(app, client):
+  venue_id = add_venue()
+  add_artist()
+  assert b'Guns N Petals' in client.get('/venues/%d/matches' % venue_id).data
+  add_artist(name='The Wild Sax Band')
+  assert b'The Wild Sax Band' in client.get('/venues/%d/matches' % venue_id).data
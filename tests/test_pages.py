@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import add_venue
+
+
+@pytest.mark.parametrize('url', ['/venues/999', '/artists/999'])
+def test_missing_page_is_not_found(app, client, url):
+  # the async views in asgi.py hand these to the Flask app as well
+  assert client.get(url).status_code == 404
+
+
+def test_venues_without_an_area_are_listed(app, client):
+  from app import venue_areas_query
+  add_venue()
+  add_venue(name='Nowhere Hall', city=None, state=None)
+  add_venue(name='Springfield Hall', city='Springfield', state=None)
+  now = datetime.now()
+  areas = [[(row.name, row.state, row.city) for row in venue_areas_query(now, after, 1)]
+           for after in (None, ('', ''), ('', 'Springfield'))]
+  assert areas == [[('Nowhere Hall', '', '')], [('Springfield Hall', '', 'Springfield')],
+                   [('The Musical Hop', 'CA', 'San Francisco')]]
+  page = client.get('/venues').get_data(as_text=True)
+  assert 'Nowhere Hall' in page and 'Springfield Hall' in page
@@ -0,0 +1,77 @@
+# `flask partitions create` on a shows table partitioned like the partition
+# migration leaves it. create_all() makes an unpartitioned one, so these
+# tests build theirs in a schema of its own, first on the app's search_path.
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from conftest import make_app
+
+SCHEMA = 'partitioned'
+
+
+@pytest.fixture
+def partitioned_app(app):
+  from app import db
+  with app.app_context():
+    db.session.execute(text('DROP SCHEMA IF EXISTS %s CASCADE' % SCHEMA))
+    db.session.execute(text('CREATE SCHEMA %s' % SCHEMA))
+    db.session.execute(text(
+      'CREATE TABLE {0}.shows (LIKE public.shows INCLUDING DEFAULTS, PRIMARY KEY (id, start_time)) '
+      'PARTITION BY RANGE (start_time)'.format(SCHEMA)))
+    db.session.execute(text('CREATE TABLE {0}.shows_default PARTITION OF {0}.shows DEFAULT'.format(SCHEMA)))
+    db.session.commit()
+    db.session.remove()
+  yield make_app(SQLALCHEMY_ENGINE_OPTIONS={
+    'connect_args': {'options': '-csearch_path=%s,public' % SCHEMA}})
+  with app.app_context():
+    db.session.execute(text('DROP SCHEMA %s CASCADE' % SCHEMA))
+    db.session.commit()
+    db.session.remove()
+
+
+def add_show(connection, start_time):
+  connection.execute(text(
+    'INSERT INTO shows (venue_id, artist_id, start_time, duration, updated_at) '
+    'VALUES (1, 1, :start_time, 120, now())'), {'start_time': start_time})
+
+
+def shows_by_table(connection):
+  # {partition: the month of each of its shows, in start_time order}
+  rows = connection.execute(text(
+    'SELECT c.relname, s.start_time FROM shows s JOIN pg_class c ON c.oid = s.tableoid '
+    'ORDER BY s.start_time'))
+  tables = {}
+  for table, start_time in rows:
+    tables.setdefault(table, []).append(start_time.date().replace(day=1))
+  return tables
+
+
+def test_create_routes_shows_into_past_and_future_partitions(partitioned_app):
+  from app import db
+  from partitions import add_months, create_command, partition_name, partitions
+  this_month = date.today().replace(day=1)
+  past, future, beyond = add_months(this_month, -3), add_months(this_month, 2), add_months(this_month, 6)
+  runner = partitioned_app.test_cli_runner()
+  with partitioned_app.app_context():
+    with db.engine.begin() as connection:
+      for month in (past, future, beyond):
+        add_show(connection, datetime(month.year, month.month, 10, 20))
+      assert shows_by_table(connection) == {'shows_default': [past, future, beyond]}
+
+    result = runner.invoke(create_command, ['--ahead', '2', '--from', past.strftime('%Y-%m')])
+    assert result.exit_code == 0, result.output
+    assert 'created %s (1 shows moved from shows_default)' % partition_name(past) in result.output
+    with db.engine.begin() as connection:
+      assert sorted(partitions(connection)) == [add_months(this_month, offset) for offset in range(-3, 3)]
+      # a show booked afterwards goes straight into its month
+      add_show(connection, datetime(this_month.year, this_month.month, 1))
+      assert shows_by_table(connection) == {
+        partition_name(past): [past], partition_name(this_month): [this_month],
+        partition_name(future): [future], 'shows_default': [beyond]}
+
+    # every month is there already
+    result = runner.invoke(create_command, ['--ahead', '2', '--from', past.strftime('%Y-%m')])
+    assert (result.exit_code, result.output) == (0, '')
@@ -0,0 +1,162 @@
+#----------------------------------------------------------------------------#
+# Query plans.
+#----------------------------------------------------------------------------#
+
+# EXPLAINs the statements behind the pages on a database the size of a busy
+# site, and checks each one still reads the index it was written for rather
+# than scanning a large table. A query that stops matching its index shows
+# up here long before it shows up as a slow page.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import empty_tables
+
+VENUES = 20000
+ARTISTS = 20000
+SHOWS = 300000
+
+# tables too large to scan for a single page
+LARGE_TABLES = {'venues', 'artists', 'shows'}
+
+
+@pytest.fixture(scope='module')
+def seeded(app):
+  # shows spread two years either side of now over every venue and artist,
+  # with their stats rows, and fresh planner statistics
+  from app import db, refresh_show_stats
+  empty_tables(app)
+  with app.app_context():
+    db.session.execute(db.text(
+      "INSERT INTO venues (name, city, state, address, genres, updated_at) "
+      "SELECT 'Venue ' || n, 'City ' || (n % 500), 'S' || (n % 50), n || ' Main Street', "
+      "'{Jazz}', now() FROM generate_series(1, :venues) AS n"), {'venues': VENUES})
+    db.session.execute(db.text(
+      "INSERT INTO artists (name, city, state, genres, updated_at) "
+      "SELECT 'Artist ' || n, 'City ' || (n % 500), 'S' || (n % 50), '{Rock n Roll}', now() "
+      "FROM generate_series(1, :artists) AS n"), {'artists': ARTISTS})
+    db.session.execute(db.text(
+      "INSERT INTO shows (venue_id, artist_id, start_time, duration, updated_at) "
+      "SELECT 1 + n % :venues, 1 + (n::bigint * 7919) % :artists, "
+      "now() - interval '2 years' + (n * interval '4 years') / :shows, 120, now() "
+      "FROM generate_series(1, :shows) AS n"),
+      {'venues': VENUES, 'artists': ARTISTS, 'shows': SHOWS})
+    refresh_show_stats(db.session.connection(), datetime.now())
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    db.session.remove()
+  yield
+  # the per test clean fixture empties the tables again
+
+
+@pytest.fixture
+def trigram_indexes(seeded):
+  # the GIN indexes of the trigram migration, which create_all doesn't know
+  from app import db
+  try:
+    with db.session.begin_nested():
+      db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+  except Exception:
+    pytest.skip('pg_trgm is not available')
+  for table in ('venues', 'artists'):
+    db.session.execute(db.text(
+      'CREATE INDEX IF NOT EXISTS ix_{0}_name_trgm ON {0} '
+      'USING gin (name gin_trgm_ops)'.format(table)))
+    db.session.execute(db.text(
+      'CREATE INDEX IF NOT EXISTS ix_{0}_location_trgm ON {0} '
+      "USING gin ((city || ', ' || state) gin_trgm_ops)".format(table)))
+  db.session.execute(db.text('ANALYZE venues, artists'))
+
+
+def explain(statement):
+  from app import db
+  if hasattr(statement, 'statement'):
+    statement = statement.statement
+  compiled = statement.compile(dialect=db.engine.dialect)
+  result = db.session.connection().exec_driver_sql(
+    'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+  return result.scalar()[0]['Plan']
+
+
+def nodes(plan):
+  yield plan
+  for child in plan.get('Plans', []):
+    yield from nodes(child)
+
+
+def seq_scans(plan):
+  return {node['Relation Name'] for node in nodes(plan) if node['Node Type'] == 'Seq Scan'}
+
+
+def indexes(plan):
+  return {node['Index Name'] for node in nodes(plan) if 'Index Name' in node}
+
+
+def queries(app):
+  # the statements as the views build them, by name
+  from app import (db, Show, artist_shows_query, artist_version_query, artists_query,
+                   artists_version_query, booking_candidates_query, shows_page_query,
+                   shows_version_query, venue_areas_query, venue_shows_query,
+                   venue_version_query, venues_version_query)
+  now = datetime.now()
+  middle = db.session.query(Show.start_time, Show.id)\
+    .order_by(Show.start_time, Show.id).offset(SHOWS // 2).first()
+  per_page = app.config['SHOWS_PER_PAGE'] + 1
+  slot = now + timedelta(days=3)
+  return {
+    'show_venue': venue_shows_query(VENUES // 2, now, app.config['VENUE_PAST_SHOWS_LIMIT']),
+    'show_artist': artist_shows_query(ARTISTS // 2, now, app.config['ARTIST_PAST_SHOWS_LIMIT']),
+    'venues': venue_areas_query(now, None, app.config['VENUE_AREAS_PER_PAGE']),
+    'artists': artists_query(now),
+    'shows': shows_page_query().limit(per_page),
+    'shows upcoming': shows_page_query(since=now).limit(per_page),
+    'shows deep page': shows_page_query(tuple(middle)).limit(per_page),
+    'venue version': venue_version_query(VENUES // 2, now),
+    'artist version': artist_version_query(ARTISTS // 2, now),
+    'venues version': venues_version_query(now),
+    'artists version': artists_version_query(now),
+    'shows version': shows_version_query(now),
+    'booking conflicts': booking_candidates_query(
+      VENUES // 2, ARTISTS // 2, slot, slot + timedelta(hours=2)),
+  }
+
+
+# query name -> indexes its plan must use
+EXPECTED_INDEXES = {
+  'show_venue': {'ix_shows_venue_id_start_time'},
+  'show_artist': {'ix_shows_artist_id_start_time'},
+  'venues': {'ix_venues_state_city', 'ix_shows_venue_id_start_time'},
+  'artists': {'ix_shows_artist_id_start_time'},
+  'shows': {'ix_shows_start_time_id'},
+  'shows upcoming': {'ix_shows_start_time_id'},
+  'shows deep page': {'ix_shows_start_time_id'},
+  'venue version': {'venues_pkey', 'ix_shows_venue_id_start_time'},
+  'artist version': {'artists_pkey', 'ix_shows_artist_id_start_time'},
+  'venues version': {'ix_venues_updated_at', 'ix_venue_stats_updated_at', 'ix_shows_start_time_id'},
+  'artists version': {'ix_artists_updated_at', 'ix_artist_stats_updated_at', 'ix_shows_start_time_id'},
+  'shows version': {'ix_shows_updated_at', 'ix_venues_updated_at', 'ix_artists_updated_at',
+                    'ix_venue_stats_updated_at', 'ix_artist_stats_updated_at',
+                    'ix_shows_start_time_id'},
+  'booking conflicts': {'ix_shows_venue_id_start_time', 'ix_shows_artist_id_start_time'},
+}
+
+# the /artists page lists every artist, so reading all of artists is its job
+FULL_SCANS = {'artists': {'artists'}}
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_INDEXES))
+def test_plan_uses_its_indexes(app, seeded, name):
+  plan = explain(queries(app)[name])
+  assert EXPECTED_INDEXES[name] <= indexes(plan)
+  assert not seq_scans(plan) & (LARGE_TABLES - FULL_SCANS.get(name, set()))
+
+
+@pytest.mark.parametrize('model', ['Venue', 'Artist'])
+def test_search_plan_uses_trigram_indexes(app, trigram_indexes, model):
+  import app as fyyur
+  plan = explain(fyyur.search_query(getattr(fyyur, model), 'Venue 12', app.config['SEARCH_RESULTS_LIMIT']))
+  table = getattr(fyyur, model).__tablename__
+  assert {'ix_%s_name_trgm' % table, 'ix_%s_location_trgm' % table} <= indexes(plan)
+  assert not seq_scans(plan) & LARGE_TABLES
@@ -0,0 +1,89 @@
+import pytest
+
+from conftest import TEST_DATABASE_URL, StatementCounter, add_venue, make_app
+
+
+EDIT = {'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA',
+        'address': '1015 Folsom Street', 'phone': '123-123-1234', 'genres': ['Jazz']}
+
+
+@pytest.fixture(scope='module')
+def module_replica_app(app):
+  # the test database again as a replica bind, on an engine of its own, so
+  # the statements show which side served them
+  return make_app(SQLALCHEMY_BINDS={'replica_0': TEST_DATABASE_URL},
+                  SQLALCHEMY_REPLICA_BINDS=['replica_0'])
+
+
+@pytest.fixture
+def replica_app(module_replica_app):
+  # it has a page cache of its own, which the clean fixture doesn't empty
+  from app import page_cache
+  with module_replica_app.app_context():
+    page_cache.clear()
+  return module_replica_app
+
+
+def cached(replica_app, key):
+  from app import page_cache
+  with replica_app.app_context():
+    return page_cache.backend.get(key) is not None
+
+
+def served_by(replica_app, client, method, url, **kwargs):
+  # (statements on the primary, statements on the replica) of one request
+  from app import db
+  # requests must open sessions of their own on the replica app
+  db.session.remove()
+  primary = db.get_engine(replica_app)
+  replica = db.get_engine(replica_app, bind='replica_0')
+  with StatementCounter(primary) as on_primary, StatementCounter(replica) as on_replica:
+    response = client.open(url, method=method, **kwargs)
+  assert response.status_code < 400
+  return len(on_primary.statements), len(on_replica.statements)
+
+
+def test_get_reads_from_the_replica(app, replica_app):
+  venue_id = add_venue()
+  primary, replica = served_by(replica_app, replica_app.test_client(), 'GET', '/venues/%d' % venue_id)
+  assert primary == 0 and replica > 0
+
+
+def test_reads_stay_on_the_primary_after_a_flush(app, replica_app):
+  venue_id = add_venue()
+  client = replica_app.test_client()
+  served_by(replica_app, client, 'POST', '/venues/%d/edit' % venue_id, data=EDIT)
+  primary, replica = served_by(replica_app, client, 'GET', '/venues/%d' % venue_id)
+  assert primary > 0 and replica == 0
+
+
+def test_reads_stay_on_the_primary_after_a_bulk_delete(app, replica_app):
+  # query.delete() writes without a flush
+  venue_id, other_id = add_venue(), add_venue(name='Park Square Live Music & Coffee')
+  client = replica_app.test_client()
+  served_by(replica_app, client, 'POST', '/venues/delete', json={'ids': [venue_id]})
+  primary, replica = served_by(replica_app, client, 'GET', '/venues/%d' % other_id)
+  assert primary > 0 and replica == 0
+
+
+def test_replica_reads_are_cached(app, replica_app):
+  from app import venue_page_key
+  venue_id = add_venue()
+  served_by(replica_app, replica_app.test_client(), 'GET', '/venues/%d' % venue_id)
+  assert cached(replica_app, venue_page_key(venue_id))
+
+
+def test_replica_reads_do_not_refill_an_invalidated_page(app, replica_app):
+  # the replica may not have the edit yet, so another client's read of it
+  # right after must not go back into the cache
+  from app import venue_page_key
+  venue_id = add_venue()
+  editor = replica_app.test_client()
+  served_by(replica_app, editor, 'POST', '/venues/%d/edit' % venue_id, data=EDIT)
+  served_by(replica_app, replica_app.test_client(), 'GET', '/venues/%d' % venue_id)
+  assert not cached(replica_app, venue_page_key(venue_id))
+  # the editor reads from the primary, which has it; its first page shows
+  # the flash message of the edit and is never cached
+  served_by(replica_app, editor, 'GET', '/venues/%d' % venue_id)
+  served_by(replica_app, editor, 'GET', '/venues/%d' % venue_id)
+  assert cached(replica_app, venue_page_key(venue_id))
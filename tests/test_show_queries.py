@@ -0,0 +1,43 @@
+# The venue and artist pages read their row, their version and both show
+# lists in a fixed number of statements, however many shows there are.
+
+import pytest
+
+from conftest import StatementCounter, add_artist, add_shows, add_venue
+
+PAGE_STATEMENTS = 3
+
+
+def page_statements(client, path):
+  from app import db
+  with StatementCounter(db.engine) as counter:
+    response = client.get(path)
+  assert response.status_code == 200
+  return counter.statements
+
+
+@pytest.mark.parametrize('shows', [0, 1, 40])
+def test_venue_page_statements(client, shows):
+  venue_id = add_venue()
+  artist_id = add_artist()
+  add_shows(venue_id, artist_id, shows)
+  assert len(page_statements(client, '/venues/%d' % venue_id)) == PAGE_STATEMENTS
+
+
+@pytest.mark.parametrize('shows', [0, 1, 40])
+def test_artist_page_statements(client, shows):
+  venue_id = add_venue()
+  artist_id = add_artist()
+  add_shows(venue_id, artist_id, shows)
+  assert len(page_statements(client, '/artists/%d' % artist_id)) == PAGE_STATEMENTS
+
+
+def test_pages_list_every_show_once(client):
+  # 20 past and 20 upcoming shows, each listed once on both pages
+  venue_id = add_venue()
+  artist_id = add_artist(name='The Wild Sax Band')
+  add_shows(venue_id, artist_id, 40)
+  venue_page = client.get('/venues/%d' % venue_id).get_data(as_text=True)
+  artist_page = client.get('/artists/%d' % artist_id).get_data(as_text=True)
+  assert venue_page.count('The Wild Sax Band') == 40
+  assert artist_page.count('The Musical Hop') == 40
@@ -0,0 +1,244 @@
+#----------------------------------------------------------------------------#
+# Venue controllers.
+#----------------------------------------------------------------------------#
+
+# Registered by create_app() in app.py. Views that render a form import it
+# when called, so WTForms is only loaded once a worker serves a form.
+
+import sys
+from datetime import datetime
+from itertools import groupby
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+
+from app import (
+  db, matchmaker, page_cache, Venue, booking_partners, delete_many, delete_owners, is_current,
+  not_modified, page_validators, search_query, server_error, venue_areas_query, venue_page_key,
+  venue_page_keys, venue_version_query, venues_version_query, with_validators,
+)
+from routing import current_replica
+
+bp = Blueprint('venues', __name__)
+
+
+@bp.route('/venues')
+def venues():
+  validators = page_validators(db.session.execute(venues_version_query(datetime.now())).scalar())
+  if is_current(validators):
+    return not_modified(validators)
+  query, per_page = venues_page_query()
+  return with_validators(render_venues(query.all(), per_page), validators)
+
+def venues_page_query():
+  # Venues grouped by area together with each venue's upcoming show count,
+  # read in one grouped statement. Areas are keyset paginated on
+  # (state, city) so the page never renders every venue in the country.
+  after = (request.args.get('after_state'), request.args.get('after_city'))
+  if None in after:
+    after = None
+  per_page = current_app.config['VENUE_AREAS_PER_PAGE']
+  return venue_areas_query(datetime.now(), after, per_page), per_page
+
+def render_venues(rows, per_page):
+  data = []
+  for (city, state), venues_in_city in groupby(rows, key=lambda row: (row.city, row.state)):
+    data.append({
+      "city": city,
+      "state": state,
+      "venues": list(venues_in_city)
+      })
+
+  next_url = None
+  if len(data) == per_page:
+    next_url = url_for('venues.venues', after_state=data[-1]['state'], after_city=data[-1]['city'])
+
+  return render_template('pages/venues.html', areas=data, next_url=next_url);
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+  # Case-insensitive partial match on the venue name or its "City, ST"
+  # location, served by trigram indexes and ranked by match quality.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term = request.form.get('search_term', '')
+  data = search_query(Venue, search_term, current_app.config['SEARCH_RESULTS_LIMIT']).all()
+  response = {
+    "count": len(data),
+    "data": data
+  }
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@bp.route('/venues/<int:venue_id>', methods=['GET'])
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id
+  # the rendered page is cached until a write touches the venue or its next
+  # upcoming show starts, whichever comes first. A cached page is
+  # revalidated against the version it was rendered at.
+  key = venue_page_key(venue_id)
+  page = page_cache.get(key)
+  if page is not None:
+    version = page_cache.version(key)
+  else:
+    version = db.session.execute(venue_version_query(venue_id, datetime.now())).scalar()
+  validators = page_validators(version)
+  if is_current(validators):
+    return not_modified(validators)
+  if page is None:
+    page = render_venue(Venue.query.get_or_404(venue_id), key, version,
+                        replica=current_replica(current_app) is not None)
+  return with_validators(page, validators)
+
+def render_venue(data, key, version=None, replica=False):
+  data.upcoming_shows_count = data.num_upcoming_shows
+  data.past_shows_count = data.num_past_shows
+  page = render_template('pages/show_venue.html', venue=data)
+  page_cache.set(key, page, expires_at=data.next_show_time, version=version, replica=replica)
+  return page
+
+@bp.route('/venues/<int:venue_id>/matches')
+def venue_matches(venue_id):
+  # artists the venue could book, best match first (see matching.py)
+  venue = Venue.query.get_or_404(venue_id)
+  matches = matchmaker.matches('artists', venue.genres, venue.city, venue.state,
+                               booking_partners(Venue, venue_id), current_app.config['MATCH_RESULTS'])
+  return render_template('pages/matches.html', owner=venue, kind='artists', matches=matches)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  from forms import VenueForm
+  try:
+    # TODO: insert form data as a new Venue record in the db, instead
+    form = VenueForm(request.form)
+    name = form.name.data
+    city = form.city.data
+    state = form.state.data
+    address = form.address.data
+    phone = form.phone.data
+    genres = form.genres.data
+    seeking_talent = form.seeking_talent.data
+    facebook_link = form.facebook_link.data
+    website = form.website_link.data
+    image_link = form.image_link.data
+    seeking_description = form.seeking_description.data
+
+    venue = Venue(name=name, city=city, state=state, address=address,
+                    phone=phone, genres=genres, facebook_link=facebook_link,
+                    website=website, image_link=image_link,
+                    seeking_talent=seeking_talent,
+                    seeking_description=seeking_description)
+    db.session.add(venue)
+    db.session.commit()
+    # TODO: modify data to be the data object returned from db insertion
+    if venue:
+      data = {
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_description,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+      }
+    # on successful db insert, flash success
+    flash('Venue ' + data.name + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    # TODO: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Venue ' + form.name.data + ' could not be listed.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+
+  return render_template('pages/home.html')
+
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  error = False
+  deleted = 0
+  try:
+      deleted, stale_pages = delete_owners(Venue, [venue_id])
+      db.session.commit()
+      page_cache.invalidate(*stale_pages)
+  except:
+      db.session.rollback()
+      error = True
+  finally:
+      db.session.close()
+  if error:
+      return server_error(500)
+  if not deleted:
+      abort(404)
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return redirect(url_for('index'))
+
+@bp.route('/venues/delete', methods=['POST'])
+def delete_venues():
+  return delete_many(Venue)
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  venue_data = Venue.query.get(venue_id)
+  venue_data.website_link = venue_data.website
+  venue={
+    "id": venue_data.id,
+    "name": venue_data.name,
+  }
+  # TODO: populate form with values from venue with ID <venue_id>
+  # see https://stackoverflow.com/questions/23712986/pre-populate-a-wtforms-in-flask-with-data-from-a-sqlalchemy-object
+  form = VenueForm(obj=venue_data)
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  from forms import VenueForm
+  try:
+      venue = Venue.query.filter_by(id=venue_id).first()
+      form = VenueForm(request.form)
+      venue.name = form.name.data
+      venue.city = form.city.data
+      venue.state = form.state.data
+      venue.phone = form.phone.data
+      venue.genres = form.genres.data
+      venue.seeking_talent = form.seeking_talent.data
+      venue.facebook_link = form.facebook_link.data
+      venue.website = form.website_link.data
+      venue.image_link = form.image_link.data
+      venue.seeking_description = form.seeking_description.data
+
+      db.session.commit()
+      page_cache.invalidate(*venue_page_keys(venue_id))
+      flash('Venue ' + form.name.data + ' was successfully Updated!')
+  except:
+    db.session.rollback()
+    # TODO: on unsuccessful db update, flash an error instead.
+    flash('An error occurred. Venue ' + form.name.data + ' could not be updated.')
+    # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))